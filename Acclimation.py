@@ -27,8 +27,11 @@ from flexsea import fxEnums as fxe
 import config
 import bertec_communication_thread
 import Gait_State_EstimatorThread
+import ThermalSupervisorThread
 
 from ExoClass import ExoObject
+from command_mailbox import gui_commands
+from session_startup import SessionStartup
 from SoftRTloop import FlexibleTimer
 from utils import MovingAverageFilter
 
@@ -71,17 +74,9 @@ def ACCLIMATION_MAIN(fxs, side_1, dev_id_1, side_2, dev_id_2, torque_settings, t
             exo_left = ExoObject(fxs, side=side_2, dev_id = dev_id_2, stream_freq=1000, data_log=False, debug_logging_level=3)
             exo_right = ExoObject(fxs, side=side_1, dev_id = dev_id_1, stream_freq=1000, data_log=False, debug_logging_level=3)
 
-        input('Hit ANY KEY to allow belts to spool for BOTH exos')
-		
-  		# Command bias current to spool the belts
-        exo_left.spool_belt()
-        exo_right.spool_belt()
-		
-        input('Hit ANY KEY to START ZEROING procedure for BOTH exos')
-  
-        # Determine Motor & Ankle Encoder Offsets. Zero the exos every time you start this code
-        exo_left.zeroProcedure()
-        exo_right.zeroProcedure()
+        # Spool the belts & determine Motor & Ankle Encoder Offsets on both exos at once
+        if not SessionStartup([exo_left, exo_right]).run().ok:
+            raise ExitMainLoopException("Session startup failed, exiting.")
       
         input('Hit ANY KEY to send start ACTIVE commands to BOTH exos')
 		
@@ -97,7 +92,7 @@ def ACCLIMATION_MAIN(fxs, side_1, dev_id_1, side_2, dev_id_2, torque_settings, t
             try:
                 # every 10 strides (10 sec), increment the commanded torque
                 for torque in torque_settings:
-                    config.GUI_commanded_torque = torque
+                    gui_commands.post(torque)
                     print("GUI_commanded_torque: ", config.GUI_commanded_torque)
                     
                     start_time = time()
@@ -106,6 +101,9 @@ def ACCLIMATION_MAIN(fxs, side_1, dev_id_1, side_2, dev_id_2, torque_settings, t
                         exo_left.iterate()
                         exo_right.iterate()
 
+                        if config.EXIT_MAIN_LOOP_FLAG:
+                            raise ExitMainLoopException("Exit flag set, exiting main loop.")
+
                     print("Finished with: {}".format(torque))
 
                 print("Acclimation Finished")
@@ -170,6 +168,11 @@ if __name__ == '__main__':
             Bertec.daemon = True
             Bertec.start()
             print('Bertec Streaming started')
+
+        # Thread:5 -- Thermal Supervision (torque scale & shutoff read by ExoObject.iterate)
+        Thermal = ThermalSupervisorThread.ThermalSupervisor(quit_event=quit_event, device_ids={side_1: dev_id_1, side_2: dev_id_2})
+        Thermal.daemon = True
+        Thermal.start()
         
         # generate list of torques to iterate through        
         min_torque = 0.0
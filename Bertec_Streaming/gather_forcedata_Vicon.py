@@ -28,6 +28,10 @@ try:
     while True:
         collection_time = time.time()
         z_forces = [f*-1 for f in vicon.get_latest_device_values(["RightForcePlate", "LeftForcePlate"], ["Force"], ["Fz"])] #this is done on the Vicon computer 
+        sdk_latency = vicon.get_streaming_latency()
+
+        # time the force plate sampled this frame (the Pi estimates its clock offset against this stamp)
+        sample_time = collection_time - sdk_latency
 
         z_filt_right = right_fp_filter.update(z_forces[0], collection_time)
         z_filt_left = left_fp_filter.update(z_forces[1], collection_time)
@@ -36,10 +40,12 @@ try:
         pub.publish('time', '%f' %collection_time)
         pub.publish('fz_right','% f' %z_filt_right)
         pub.publish('fz_left', '%f' %z_filt_left)
+        # forces stamped with their sample time in one message (exo controller's Bertec thread)
+        pub.publish('fz_stamped', '%f,%f,%f' %(sample_time, z_filt_right, z_filt_left))
 
         # Clock the Frequency of the loop
         end_time = time.time()
-        bertec_period_tracker.update(end_time-prev_time, vicon.get_streaming_latency())
+        bertec_period_tracker.update(end_time-prev_time, sdk_latency)
         prev_time = end_time
 
         count += 1
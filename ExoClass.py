@@ -12,19 +12,30 @@ import os, math, sched
 from time import sleep, time, strftime, perf_counter
 import numpy as np
 import traceback
+from operator import attrgetter
 from typing import List, Tuple
 from scipy import interpolate
 from flexsea.device import Device
 from assistance_generator import AssistanceGenerator
-from thermal import ThermalModel
+from thermal import ThermalModel, resolve_thermal_params
+from utils import RunningStats
+from actuation import ActuationPipeline
+import transmission
+from command_mailbox import gui_commands
+from calibration_store import load_calibration, update_calibration, recent_zero_offsets
 import config
 
+thisdir = os.path.dirname(os.path.abspath(__file__))
+
 class ExoObject:
     def __init__(self, side, device):
         # Necessary Inputs for Exo Class
         self.side = side
         self.device = device
         
+        # Calibrations stored for this device (TR, lookup tables, zero offsets, thermal params)
+        self.calibration = load_calibration(self.device.id)
+        
         # Zeroes from homing procedure
         self.motorAngleOffset_deg = None
         self.ankleAngleOffset_deg = None
@@ -34,8 +45,11 @@ class ExoObject:
         self.TR_curve_coeffs = None
         self.max_dorsi_offset = None        # from TR_characterizer (max dorsiflexion angle)
         
-        # Set Transmission Ratio and Motor-Angle Curve Coefficients	from pre-performed calibration
-        self.load_TR_curve_coeffs()
+        # Lookup tables indexed by raw ankle encoder count (built from the TR calibration)
+        self.TR_table = None
+        self.motor_angle_table = None
+        self.current_per_torque_table = None
+        self.actuation = None
         
         # Set Side multiplier and TR Coeffs
         # CHECK THESE BY MAKING SURE THE BELTS ARE NOT SPOOLING BACK ON THE LIP OF THE METAL SPOOL (CAUSES BREAKAGE)
@@ -46,17 +60,31 @@ class ExoObject:
             self.exo_left_or_right_sideMultiplier = -1#1   # spool belt/rotate CW for right exo
             self.ank_enc_sign = config.ANK_ENC_SIGN_RIGHT_EXO
         
+        # Per-side config slots, bound once so the control step doesn't branch on the side
+        self.read_stance_inputs = attrgetter('heel_strike_time_' + side, 'heel_strike_count_' + side, 'stride_period_bertec_' + side, 
+                                             'stance_time_' + side, 'in_swing_bertec_' + side, 'ankle_enc_count_' + side)
+        self.read_thermal_state = attrgetter('thermal_torque_scale_' + side, 'thermal_shutoff_' + side)  # from ThermalSupervisorThread
+        self.read_ank_enc_count = attrgetter('ankle_enc_count_' + side)
+        self.read_gait_periods = attrgetter('stride_period_bertec_' + side, 'stance_time_' + side)
+        self.read_thermal_forecast_inputs = attrgetter('temperature_' + side, 'winding_temperature_' + side)
+        self.time_since_heel_strike_attr = 'time_since_heel_strike_' + side
+        self.desired_spline_torque_attr = 'desired_spline_torque_' + side
+        
+        # GUI command & thermal scale latched at each heel strike (no peak torque changes mid-stride)
+        self.latched_heel_strike_count = -1
+        self.latched_command_version = -1
+        self.latched_peak_torque = 0.0
+        self.prewarmed_schedule_version = 0
+        
         # Instantiate the four point spline algorithm
         self.bias_current:int = 750
         self.assistance_generator = AssistanceGenerator(bias_current=self.bias_current)
         
-        # Instantiate Thermal Model and specify thermal limits
-        self.thermalModel = ThermalModel(temp_limit_windings=100,soft_border_C_windings=10,temp_limit_case=70,soft_border_C_case=10)
-        self.case_temperature = 0
+        # Instantiate Thermal Model (with this device's identified parameters, if any, same as the ThermalSupervisor) and specify thermal limits
+        self.thermalModel = ThermalModel(params=resolve_thermal_params(self.device.id), temp_limit_windings=100,soft_border_C_windings=10,temp_limit_case=70,soft_border_C_case=10)
         self.winding_temperature = 0
         self.max_case_temperature = 80
         self.max_winding_temperature = 115
-        self.frequency = 175 #(in OSL Lib: 500)
         self.exo_safety_shutoff_flag = False
 
         # Unit Conversions (from Dephy Website, Units Section: https://dephy.com/start/#programmable_safety_features)
@@ -71,6 +99,10 @@ class ExoObject:
         self.L_phase = 0.5 * 138 * 10e-6  # henrys
         self.CURRENT_THRESHOLD = config.MAX_ALLOWABLE_CURRENT  # mA
         
+        # Set Transmission Ratio and Motor-Angle Curve Coefficients	from pre-performed calibration
+        # (after the ankle encoder sign & motor parameters, which are baked into the lookup tables)
+        self.load_TR_curve_coeffs()
+        
     def set_spline_timing_params(self, spline_timing_params):
         """ 
         Args:
@@ -89,96 +121,113 @@ class ExoObject:
         sleep(0.5)
         print("Belt spooled for: ", self.device.id)
         
-    def zeroProcedure(self) -> Tuple[float, float]:
-        """This function holds a current of 1000 mA for 1 second and collects ankle angle.
-        If the ankle angle hasn't changed during this time, this is the zero. Otherwise, the 1 second hold repeats.
+    def zeroProcedure(self, frequency:float=100, min_hold_time:float=0.25, ankle_angle_tol:float=0.05, motor_angle_tol:float=0.5, 
+                      ankle_motion_range:float=0.5, timeout:float=10) -> Tuple[float, float]:
+        """This function holds a current of 1000 mA and samples motor & ankle angles at a fixed rate.
+        Running means/variances (Welford) of both angles are accumulated while the wearer is still. Motion 
+        (motor/ankle velocity, or the ankle angle spreading over the recent window) restarts the statistics, and the
+        zero is taken once the wearer has been still for min_hold_time and both means have settled (standard error within tolerance).
         Subject should stand still while this is running.
+        
+        Args:
+                frequency (float): sampling rate (Hz)
+                min_hold_time (float): minimum still time before the zero can be taken (s)
+                ankle_angle_tol, motor_angle_tol (float): standard error of the mean angles needed (deg)
+                ankle_motion_range (float): ankle angle range within the recent window counted as motion (deg)
+                timeout (float): give up after this many seconds (raises TimeoutError)
 
         returns:
                 motorAngleOffset_deg (float): motor angle offset in degrees
                 ankleAngleOffset_deg (float): ankle angle offset in degrees
         """
-        filename = "/home/pi/Exoboot-Controller-VAS/Autogen_zeroing_coeff_files/offsets_Exo{}.csv".format(self.side.capitalize())
+        filename = os.path.join(thisdir, "Autogen_zeroing_coeff_files", "offsets_Exo{}.csv".format(self.side.capitalize()))
+        read_zeroing_inputs = attrgetter('motor_angle_' + self.side, 'ankle_angle_' + self.side, 
+                                         'motor_velocity_' + self.side, 'ankle_velocity_' + self.side)
 
-        # conduct zeroing/homing procedure and log offsets
-        with open(filename, "w") as file:
-            print("Starting ankle zeroing/homing procedure for: \n", self.side)
+        # conduct zeroing/homing procedure
+        print("Starting ankle zeroing/homing procedure for: \n", self.side)
+        
+        pullCurrent = 1000  # mA
+        holdCurrent = pullCurrent * self.exo_left_or_right_sideMultiplier
+        self.device.command_motor_current(holdCurrent)
+        
+        period = 1 / frequency
+        min_samples = max(int(min_hold_time * frequency), 2)
+        motor_angle_stats = RunningStats()
+        ankle_angle_stats = RunningStats()
+        recent_ankle_angles = np.empty(min_samples)    # ring buffer for the motion detector
+        retries = 0
+        
+        startTime = perf_counter()
+        next_time = startTime
+        while True:
+            current_mot_angle, current_ank_angle, current_mot_vel, current_ank_vel = read_zeroing_inputs(config)  # Dephy multiplies ank velocity by 10 (rad/s)
             
-            pullCurrent = 1000  # mA
-            iterations = 0
-            holdingCurrent = True
-            holdCurrent = pullCurrent * self.exo_left_or_right_sideMultiplier
-            run_time_total = 1  # seconds
-            moveVec = np.array([])
-            motorAngleVec = np.array([])
-            ankleAngleVec = np.array([])
-            startTime = time()
-
-            while holdingCurrent:
-                print("in zeroing loop")
-                iterations += 1
-                currentTime = time()
-                timeSec = currentTime - startTime
-
-                # fxu.clear_terminal()
-                if self.side == 'left':
-                    current_mot_angle = config.motor_angle_left
-                    current_ank_angle = config.ankle_angle_left
-
-                    current_ank_vel = config.ankle_velocity_left  # Dephy multiplies ank velocity by 10 (rad/s)
-                    current_mot_vel = config.motor_velocity_left
-                else:
-                    current_mot_angle = config.motor_angle_right
-                    current_ank_angle = config.ankle_angle_right 
-
-                    current_ank_vel = config.ankle_velocity_right  # Dephy multiplies ank velocity by 10 (rad/s)
-                    current_mot_vel = config.motor_velocity_right
-
-                self.device.command_motor_current(holdCurrent)
-                
-                print("Ankle Angle: {} deg...".format(current_ank_angle))
-
-                # determines whether wearer has moved
-                if (abs(current_mot_vel)) > 100 or (abs(current_ank_vel) > 1):
-                    moveVec = np.append(moveVec, True)
-                else:
-                    moveVec = np.append(moveVec, False)
-
-                motorAngleVec = np.append(motorAngleVec, current_mot_angle)
-                ankleAngleVec = np.append(ankleAngleVec, current_ank_angle)
-
-                # if the ankle angle hasn't changed during the hold time, determine offsets and exit loop
-                if (timeSec) >= run_time_total:
-                    if not np.any(moveVec):  # if none moved
-                        self.motorAngleOffset_deg = np.mean(motorAngleVec)
-                        self.ankleAngleOffset_deg = np.mean(ankleAngleVec)
-                        if(self.side == 'left'):
-                            config.ankle_offset_left = self.ankleAngleOffset_deg
-                            config.motor_angle_offset_left = self.motorAngleOffset_deg
-                        elif(self.side == 'right'):
-                            config.ankle_offset_right = self.ankleAngleOffset_deg
-                            config.motor_angle_offset_right = self.motorAngleOffset_deg
-                        holdingCurrent = False
-
-                    else:
-                        print("retrying")
-                        moveVec = np.array([])
-                        motorAngleVec = np.array([])
-                        ankleAngleVec = np.array([])
-                        startTime = time()
-                        iterations = 0
+            # determines whether wearer has moved
+            recent_ankle_angles[ankle_angle_stats.count % min_samples] = current_ank_angle
+            moved = (abs(current_mot_vel) > 100) or (abs(current_ank_vel) > 1)
+            if ankle_angle_stats.count >= min_samples:
+                moved = moved or (np.ptp(recent_ankle_angles) > ankle_motion_range)
+            
+            if moved:
+                if ankle_angle_stats.count > 0:
+                    retries += 1
+                    print("motion detected, retrying ({})".format(retries))
+                motor_angle_stats.reset()
+                ankle_angle_stats.reset()
+            else:
+                motor_angle_stats.update(current_mot_angle)
+                ankle_angle_stats.update(current_ank_angle)
+            
+            # zero is taken once the wearer has been still long enough & the means have settled
+            if (ankle_angle_stats.count >= min_samples and ankle_angle_stats.standard_error() <= ankle_angle_tol 
+                    and motor_angle_stats.standard_error() <= motor_angle_tol):
+                break
+            
+            if perf_counter() - startTime > timeout:
+                self.device.command_motor_current(0)
+                raise TimeoutError("Zeroing {} exo did not settle within {} s".format(self.side, timeout))
+            
+            # fixed rate sampling
+            next_time += period
+            sleep(max(next_time - perf_counter(), 0))
+        
+        self.set_zero_offsets(motor_angle_stats.mean, ankle_angle_stats.mean)
                         
-            # ramp down
-            print("Turning off Zero-ing Procedure Current Control...")
-            print("Motor Angle offset: {} deg\n".format((self.motorAngleOffset_deg)))
-            print("Ankle Angle offset: {} deg\n".format((self.ankleAngleOffset_deg)))
+        # ramp down
+        print("Turning off Zero-ing Procedure Current Control...")
+        print("Zeroed in {:.2f} s ({} samples)".format(perf_counter() - startTime, ankle_angle_stats.count))
+        print("Motor Angle offset: {} deg\n".format((self.motorAngleOffset_deg)))
+        print("Ankle Angle offset: {} deg\n".format((self.ankleAngleOffset_deg)))
 
+        # log offsets
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, "w") as file:
             writer = csv.writer(file, delimiter=",")
             writer.writerow([self.motorAngleOffset_deg, self.ankleAngleOffset_deg])
-            file.close()
-            
-            self.device.command_motor_current(0)
-            sleep(0.5)
+        self.calibration = update_calibration(self.device.id, motor_angle_offset=self.motorAngleOffset_deg, 
+                                              ankle_angle_offset=self.ankleAngleOffset_deg, zero_time=time())
+        
+        self.device.command_motor_current(0)
+        sleep(0.5)
+        
+        return self.motorAngleOffset_deg, self.ankleAngleOffset_deg
+     
+    def set_zero_offsets(self, motorAngleOffset_deg, ankleAngleOffset_deg):
+        self.motorAngleOffset_deg = motorAngleOffset_deg
+        self.ankleAngleOffset_deg = ankleAngleOffset_deg
+        setattr(config, 'ankle_offset_' + self.side, self.ankleAngleOffset_deg)
+        setattr(config, 'motor_angle_offset_' + self.side, self.motorAngleOffset_deg)
+    
+    def restore_or_zero(self, max_age:float=config.zero_offsets_max_age, timeout:float=10) -> Tuple[float, float]:
+        """Reuses the stored zero offsets if they are younger than max_age seconds, otherwise runs zeroProcedure."""
+        offsets = recent_zero_offsets(self.calibration, max_age)
+        if offsets is None:
+            return self.zeroProcedure(timeout=timeout)
+        
+        self.set_zero_offsets(*offsets)
+        print("Reusing {} exo zero offsets from {:.0f} s ago".format(self.side, time() - float(self.calibration['zero_time'])))
+        return offsets
      
     def load_TR_curve_coeffs(self):
         """Sets Transmission Ratio coefficients from a logged file. 
@@ -186,10 +235,12 @@ class ExoObject:
         After TR recalibration, the logged file will have different values.
         TR recalibration procedure should be re-done after belt 
         replacement/exo reassembly (script: TR_characterization_test.py).
+        The curves are then materialized into lookup tables indexed by raw ankle encoder count, 
+        which are reused from the calibration store when the calibration hasn't changed.
         """
-        # Open and read the CSV file
+        # Open and read the CSV file (falls back on the coefficients in the calibration store)
+        tr_coefs_filename = os.path.join(thisdir, "Transmission_Ratio_Characterization", "default_TR_coefs_{}.csv".format(self.side))
         try:  
-            tr_coefs_filename = "Transmission_Ratio_Characterization/default_TR_coefs_{}.csv".format(self.side)
             with open(tr_coefs_filename, mode='r') as file:
                 csv_reader = csv.reader(file)
                 coefs_ankle_vs_motor = next(csv_reader)  # Read the first row, which is the motor_angle_curve_coeffs
@@ -200,43 +251,67 @@ class ExoObject:
                 self.TR_curve_coeffs = [float(x) for x in coefs_TR]
                 self.motor_angle_curve_coeffs = [float(y) for y in coefs_ankle_vs_motor]
                 self.max_dorsi_offset = float(max_dorsiflexed_ang[0])
+        except (OSError, StopIteration, ValueError) as e:
+            if 'TR_curve_coeffs' not in self.calibration:
+                print("No TR calibration for the {} exo ({}). I hope you are doing TR characterization".format(self.side, e))
+                return 0
+            print("Using the stored TR calibration for the {} exo ({})".format(self.side, e))
+            self.TR_curve_coeffs = self.calibration['TR_curve_coeffs'].tolist()
+            self.motor_angle_curve_coeffs = self.calibration['motor_angle_curve_coeffs'].tolist()
+            self.max_dorsi_offset = float(self.calibration['max_dorsi_offset'])
 
-            if self.side == "left":
-                config.max_dorsiflexed_ang_left = self.max_dorsi_offset
-            elif self.side == "right":
-                config.max_dorsiflexed_ang_right = self.max_dorsi_offset
-        except:
-            print("I hope you are doing TR characterization")
-            return 0
+        setattr(config, 'max_dorsiflexed_ang_' + self.side, self.max_dorsi_offset)
+        
+        if not self.restore_TR_lookup_tables():
+            self.build_TR_lookup_tables()
+            self.calibration = update_calibration(self.device.id, **self.TR_calibration_fields(), 
+                                                  TR_table=self.TR_table, motor_angle_table=self.motor_angle_table, 
+                                                  current_per_torque_table=self.current_per_torque_table)
         
         return self.TR_curve_coeffs
-                
-    def get_TR_for_ank_ang(self, curr_ank_angle):
-        N = np.polyval(self.TR_curve_coeffs, curr_ank_angle)  # Instantaneous transmission ratio
+    
+    def TR_calibration_fields(self) -> dict:
+        """Everything the TR lookup tables are built from."""
+        return {'TR_curve_coeffs': np.asarray(self.TR_curve_coeffs, dtype=float), 
+                'motor_angle_curve_coeffs': np.asarray(self.motor_angle_curve_coeffs, dtype=float),
+                'max_dorsi_offset': self.max_dorsi_offset, 'ank_enc_sign': self.ank_enc_sign, 
+                'efficiency': self.efficiency, 'Kt': self.Kt}
+    
+    def restore_TR_lookup_tables(self) -> bool:
+        """Reuses the lookup tables from the calibration store if they were built from the same calibration."""
+        if 'TR_table' not in self.calibration:
+            return False
+        for name, value in self.TR_calibration_fields().items():
+            stored = self.calibration.get(name)
+            if stored is None or np.shape(stored) != np.shape(value) or not np.array_equal(stored, value):
+                return False
         
-        # Safety check to prevent current limit spikes past the allowable limit 
-        # (ideally should not be limited to 10 and should go below)
-        N = max(N, 10)
-            
-        if self.side == "left":
-            config.N_left = N
-        elif self.side == "right":
-            config.N_right = N
-            
-        return N
-
+        self.TR_table = self.calibration['TR_table']
+        self.motor_angle_table = self.calibration['motor_angle_table']
+        self.current_per_torque_table = self.calibration['current_per_torque_table']
+        self.bind_actuation()
+        return True
+                
+    def build_TR_lookup_tables(self):
+        """Evaluates the TR & motor-angle curves for every raw ankle encoder count.
+        The ankle encoder sign, max dorsiflexion offset and TR clamp are applied here, once.
+        """
+        self.TR_table, self.motor_angle_table, self.current_per_torque_table = transmission.build_lookup_tables(
+            self.TR_curve_coeffs, self.motor_angle_curve_coeffs, self.ank_enc_sign, self.max_dorsi_offset, self.efficiency, self.Kt)
+        self.bind_actuation()
+    
+    def bind_actuation(self):
+        # torque -> vetted, signed current for this side
+        self.actuation = ActuationPipeline(self.side, self.exo_left_or_right_sideMultiplier, self.TR_table, 
+                                           self.current_per_torque_table, self.bias_current)
+    
+    def get_TR_for_ank_count(self, ank_enc_count):
+        return self.actuation.log_TR(ank_enc_count)  # Instantaneous transmission ratio (clamped)
+    
     def desired_torque_2_current(self, desired_spline_torque):
         # convert desired torque to desired current
-        if self.side == "left":
-            curr_ank_angle = config.ankle_angle_left
-        elif self.side == "right":
-            curr_ank_angle = config.ankle_angle_right
-        
-        N = self.get_TR_for_ank_ang(curr_ank_angle)
-            
-        des_current = desired_spline_torque / (N * self.efficiency * self.Kt)   # output in mA
-        
-        return int(des_current)
+        ank_enc_count = self.read_ank_enc_count(config)
+        return self.actuation.torque_to_current(desired_spline_torque, ank_enc_count)   # output in mA
 
     def max_current_safety_checker(self, commanded_current):
         """Safety Check for ActPack current"""
@@ -250,142 +325,115 @@ class ExoObject:
             
         return new_commanded_current
     
-    def thermal_safety_checker(self):
-        """Ensure that winding temperature is below 100°C (115°C is the hard limit).
-        Ensure that case temperature is below 75°C (80°C is the hard limit).
-        Uses Jianpings model to project forward the measured temperature from Dephy ActPack.
-        
-        Returns:
-        exo_safety_shutoff_flag (bool): flag that indicates if the exo has exceeded thermal limits. 
-        Used to toggle whether the device should be shut off.
+    def stride_current_profile(self, peak_torque:float, stride_period:float=None, stance_period:float=None, n_samples:int=200)->np.ndarray:
+        """Motor current (mA, unsigned) commanded over one stride at this peak torque, at the current ankle angle.
+        Stride & stance periods default to the latest measured ones.
         """
-            
-        # measured temp by Dephy from the actpack is the case temperature
-        if self.side == "left":
-            measured_temp = config.temperature_left
-            motor_current = config.motor_current_left
-        elif self.side == "right":
-            measured_temp = config.temperature_right 
-            motor_current = config.motor_current_right
-            
-        # determine modeled case & winding temp
-        self.thermalModel.T_c = measured_temp
-        self.thermalModel.update(dt=(1 / self.frequency), motor_current=motor_current)
-        self.winding_temperature = self.thermalModel.T_w
-
-        # Shut off exo if thermal limits breached
-        if measured_temp >= self.max_case_temperature:
-            self.exo_safety_shutoff_flag = True 
-            print("Case Temperature has exceed 75°C soft limit. Exiting Gracefully")
-        if self.winding_temperature >= self.max_winding_temperature:
-            self.exo_safety_shutoff_flag = True 
-            print("Winding Temperature has exceed 115°C soft limit. Exiting Gracefully")
-
-        # using Jianping's thermal model to project winding & case temperature
-        # using the updated case temperature and setting shut-off flag
-        # self.case_temperature = measured_temp
-        # exo_safety_shutoff_flag = self.get_modelled_temps(motor_current)
-    
-    def get_modelled_temps(self, motor_current)->bool:
-        """using Jianping's thermal model to project winding & case 
-        temperature and determine whether exo should be shut off
+        measured_stride_period, measured_stance_period = self.read_gait_periods(config)
+        stride_period = stride_period or measured_stride_period or 1.12
+        stance_period = stance_period or measured_stance_period
         
-        Args:
-        motor_current (float): measured motor current in mA
+        if config.in_torque_FSM_mode:
+            _, torques = self.assistance_generator.stride_spline_profile(peak_torque, self.assistance_generator.holding_torque, 
+                                                                         stride_period, stance_period, n_samples)
+            ank_enc_counts = np.full(n_samples, self.read_ank_enc_count(config))
+            return np.abs(self.actuation.batch(torques, ank_enc_counts))
+        
+        _, currents = self.assistance_generator.stride_spline_profile(peak_torque*0.5, self.bias_current, 
+                                                                      stride_period, stance_period, n_samples)
+        return np.minimum(currents, config.MAX_ALLOWABLE_CURRENT)
+    
+    def thermal_headroom(self, peak_torque:float, duration:float)->dict:
+        """Forecasts (closed-form) whether peak_torque can be held for duration seconds from the current thermal state.
         
         Returns:
-        exo_safety_shutoff_flag (float): flag that indicates if the exo has exceeded thermal limits. 
-        Used to toggle whether the device should be shut off.
+        dict with time_to_soft_limit & time_to_hard_limit (s, inf if not reached within duration) and 
+        max_peak_torque (Nm) that stays under the soft limits for the whole duration.
         """
-        self.thermalModel.T_c = self.case_temperature
-        self.thermalModel.update(dt=(1 / self.frequency), motor_current=motor_current)
-        self.winding_temperature = self.thermalModel.T_w
-        
-        if self.case_temperature >= self.max_case_temperature:
-            shutoff_flag = True 
-            print("Case Temperature has exceed 75°C soft limit. Exiting Gracefully")
-        if self.winding_temperature >= self.max_winding_temperature:
-            shutoff_flag = True 
-            print("Winding Temperature has exceed 115°C soft limit. Exiting Gracefully soon")
-        
-        return shutoff_flag
+        # start from the measured case & supervisor's modelled winding temperatures
+        case_temperature, winding_temperature = self.read_thermal_forecast_inputs(config)
+        self.thermalModel.T_c = case_temperature or self.thermalModel.T_a
+        self.thermalModel.T_w = max(winding_temperature, self.thermalModel.T_c)
+        
+        def rms_current(peak):
+            return np.sqrt(np.mean(self.stride_current_profile(peak)**2))
+        
+        rms = rms_current(peak_torque)
+        return {'time_to_soft_limit': self.thermalModel.time_to_soft_limit(rms, horizon=duration),
+                'time_to_hard_limit': self.thermalModel.time_to_hard_limit(rms, horizon=duration),
+                'max_peak_torque': self.thermalModel.max_sustainable_peak(rms_current, duration, peak_range=(0, config.max_Vickrey_torque))}
+    
+    def latch_command(self, heel_strike_count:int, thermal_scale:float):
+        """Applies the latest command from the GUI command mailbox for the stride that starts at heel strike #heel_strike_count"""
+        command = gui_commands.latest()
+        self.latched_heel_strike_count = heel_strike_count
+        self.latched_command_version = command.version
+        self.latched_peak_torque = command.peak_torque * thermal_scale
+        
+        # prewarm the stance splines of the presentation schedule's torques (once per posted schedule)
+        if gui_commands.schedule_version != self.prewarmed_schedule_version:
+            self.prewarmed_schedule_version = gui_commands.schedule_version
+            if config.in_torque_FSM_mode:
+                self.assistance_generator.prewarm_stance_splines(gui_commands.schedule, self.assistance_generator.holding_torque)
+            else:
+                self.assistance_generator.prewarm_stance_splines([torque*0.5 for torque in gui_commands.schedule], 
+                                                                 self.assistance_generator.bias_current)
     
     def iterate(self):
+        heel_strike_time, heel_strike_count, stride_period, stance_time, in_swing, ank_enc_count = self.read_stance_inputs(config)
+        
+        # phase at command time (+ look-ahead) from the heel strike timestamp; held as swing until the first heel strike
+        if heel_strike_time is None:
+            time_in_current_stance, in_swing = float('nan'), True
+        else:
+            time_in_current_stance = time() + config.actuation_lookahead - heel_strike_time
+        setattr(config, self.time_since_heel_strike_attr, time_in_current_stance)
+        
+        # torque scale & shutoff flag published by the thermal supervisor
+        thermal_scale, thermal_shutoff = self.read_thermal_state(config)
+        
+        # latch the latest GUI command (scaled by the thermal supervisor) at the stride boundary
+        # (heel_strike_count is bumped once per heel strike by the Bertec thread or the IMU phase wrap)
+        if heel_strike_count != self.latched_heel_strike_count:
+            self.latch_command(heel_strike_count, thermal_scale)
         
         # TO ENABLE TORQUE BASED FSM:
         if config.in_torque_FSM_mode:
-            # if config.in_swing_bertec_left:
-            #     self.peak_torque_left = config.GUI_commanded_torque
-                
-            # if config.in_swing_bertec_right:
-            #     self.peak_torque_right = config.GUI_commanded_torque
+            peak_torque = self.latched_peak_torque
             
-            peak_torque = config.GUI_commanded_torque
-                
-            if(self.side == 'left'):
-                # 4-point spline generated torque
-                # desired_spline_torque = self.assistance_generator.torque_generator_MAIN(config.time_in_current_stride_left, config.stride_time_left, peak_torque, config.in_swing_start_left)
-                desired_spline_torque = self.assistance_generator.torque_generator_stance_MAIN(config.time_in_current_stance_left, 
-                                                                                               config.stride_period_bertec_left, 
-                                                                                               config.stance_time_left, 
-                                                                                               peak_torque, 
-                                                                                               config.in_swing_bertec_left)                
-                # desired_spline_torque = self.assistance_generator.biomimetic_torque_generator_MAIN(config.time_in_current_stance_left, config.stance_time_left, peak_torque, config.in_swing_bertec_left)
-                config.desired_spline_torque_left = desired_spline_torque
-                
-                
-            elif(self.side == 'right'):
-                # desired_spline_torque = self.assistance_generator.torque_generator_MAIN(config.time_in_current_stride_right, config.stride_time_right, peak_torque, config.in_swing_start_right)
-                desired_spline_torque = self.assistance_generator.torque_generator_stance_MAIN(config.time_in_current_stance_right, 
-                                                                                               config.stride_period_bertec_right, 
-                                                                                               config.stance_time_right, 
-                                                                                               peak_torque, 
-                                                                                               config.in_swing_bertec_right)                 
-                # desired_spline_torque = self.assistance_generator.biomimetic_torque_generator_MAIN(config.time_in_current_stance_right, config.stride_period_bertec_right,peak_torque, config.in_swing_bertec_right)
-                config.desired_spline_torque_right = desired_spline_torque
-            else:
-                print("Error")
+            # 4-point spline generated torque
+            desired_spline_torque = self.assistance_generator.torque_generator_stance_MAIN(time_in_current_stance, 
+                                                                                           stride_period, 
+                                                                                           stance_time, 
+                                                                                           peak_torque, 
+                                                                                           in_swing)
+            # desired_spline_torque = self.assistance_generator.biomimetic_torque_generator_MAIN(time_in_current_stance, stance_time, peak_torque, in_swing)
+            setattr(config, self.desired_spline_torque_attr, desired_spline_torque)
             
-            # Convert spline torque to it's corresponding current (mA)
-            desired_spline_current = self.desired_torque_2_current(desired_spline_torque)
+            # Convert spline torque to it's corresponding current (mA), clamped between bias and max allowable current
+            commanded_current = self.actuation(desired_spline_torque, ank_enc_count)
         
         else:
             # TO ENABLE CURRENT BASED FSM:
-            peak_current = config.GUI_commanded_torque*0.5
+            peak_current = self.latched_peak_torque*0.5
             
-            if(self.side == "left"):
-                # 4-point spline generated current
-                desired_spline_current = self.assistance_generator.current_generator_stance_MAIN(config.time_in_current_stance_left, 
-                                                                                               config.stride_period_bertec_left, 
-                                                                                               config.stance_time_left, 
-                                                                                               peak_current, 
-                                                                                               config.in_swing_bertec_left)
-                config.desired_spline_torque_left = desired_spline_current
-                curr_ank_angle = config.ankle_angle_left
-            elif(self.side == "right"):
-                desired_spline_current = self.assistance_generator.current_generator_stance_MAIN(config.time_in_current_stance_right, 
-                                                                                                config.stride_period_bertec_right, 
-                                                                                                config.stance_time_right, 
-                                                                                                peak_current, 
-                                                                                                config.in_swing_bertec_right)
-
-                config.desired_spline_torque_right = desired_spline_current
-                curr_ank_angle = config.ankle_angle_right
-            else:
-                print("Error")
+            # 4-point spline generated current
+            desired_spline_current = self.assistance_generator.current_generator_stance_MAIN(time_in_current_stance, 
+                                                                                             stride_period, 
+                                                                                             stance_time, 
+                                                                                             peak_current, 
+                                                                                             in_swing)
+            setattr(config, self.desired_spline_torque_attr, desired_spline_current)
                 
             # for current control, log the current transmission ratio:
-            N = self.get_TR_for_ank_ang(curr_ank_angle)
+            self.actuation.log_TR(ank_enc_count)
+
+            # Clamp current between bias and max allowable current
+            commanded_current = self.actuation.vet(desired_spline_current)
 
-        # Clamp current between bias and max allowable current
-        vetted_current = max(min(desired_spline_current, config.MAX_ALLOWABLE_CURRENT), self.bias_current)
-        
-        # Perform thermal safety check on actpack
-        # self.thermal_safety_checker()
-        
         # Shut off exo if thermal limits breached
-        if self.exo_safety_shutoff_flag:
+        if thermal_shutoff or self.exo_safety_shutoff_flag:
             self.device.command_motor_current(0)
-            config.EXIT_MAIN_LOOP_FLAG == True
+            config.EXIT_MAIN_LOOP_FLAG = True
         else:
-            self.device.command_motor_current(self.exo_left_or_right_sideMultiplier * vetted_current)
\ No newline at end of file
+            self.device.command_motor_current(commanded_current)
\ No newline at end of file
@@ -2,65 +2,146 @@ import threading
 import grpc 
 import gui2controller2_pb2
 import gui2controller2_pb2_grpc
+import gui2controller3_pb2
+import gui2controller3_pb2_grpc
 from concurrent import futures
 from typing import Type
 import time
 
 import config
-from utils import MovingAverageFilter
+from command_mailbox import gui_commands
+
+def apply_gui_command(torque:str = 'nan', slider_btn:str = 'nan', slider_value:float = float('nan'), confirm_btn_pressed:str = 'False'):
+    """Posts a GUI message (v2 or v3) to the command mailbox as one versioned, timestamped command"""
+    command = gui_commands.post(None if torque == 'nan' else float(torque), slider_btn, slider_value, confirm_btn_pressed)
+    if command.torque_changed_time == command.received_time:
+        print("New commanded torque is:", command.peak_torque)
 
 class GUI_thread(threading.Thread):
     def __init__(self, quit_event=Type[threading.Event], name='GUICommunication'):
 
         super().__init__(name = name)
         self.quit_event = quit_event
+        self.server = None
+        
+        # Request rate & handler latency, published to config every metrics_period
+        self.metrics_period = 1.0
+        self.metrics_lock = threading.Lock()
+        self.request_count = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
     
     class CommunicationService(gui2controller2_pb2_grpc.CommunicationServiceServicer):
         def __init__(self, GUI_thread):
             self.GUI_thread = GUI_thread
             
         def GUI_Messenger(self, request, context):
+            start_time = time.perf_counter()
+            
             # Printing out the request from the client        
             requested_torque = request.logging_data[0]              # Current Torque Experienced(Nm)
             requested_slider_btn = request.logging_data[1]          # Adjusted Slider Btn
             requested_slider_value = request.logging_data[2]        # Adjusted Slider Value($)
             requested_confirm_btn_pressed = request.logging_data[3] # Confirm Button Pressed
             
-            print("New commanded torque is:", config.GUI_commanded_torque)
-            
-            if requested_torque == 'nan':
-                config.adjusted_slider_btn = str(requested_slider_btn)
-                config.adjusted_slider_value = float(requested_slider_value)
-                config.confirm_btn_pressed = requested_confirm_btn_pressed
-            else: 
-                config.GUI_commanded_torque = float(requested_torque)
-                print("New commanded torque is:", config.GUI_commanded_torque)
-                
-                config.adjusted_slider_btn = str(requested_slider_btn)
-                config.adjusted_slider_value = float(requested_slider_value)
-                config.confirm_btn_pressed = requested_confirm_btn_pressed
+            apply_gui_command(requested_torque, requested_slider_btn, requested_slider_value, requested_confirm_btn_pressed)
+            self.GUI_thread.record_request(start_time)
             
             # Sending a Null response to GUI
             return gui2controller2_pb2.Null()
     
+    class CommunicationServiceV3(gui2controller3_pb2_grpc.CommunicationServiceV3Servicer):
+        """One bidirectional stream per GUI: typed events in, controller status out at config.gui_status_frequency"""
+        def __init__(self, GUI_thread):
+            self.GUI_thread = GUI_thread
+        
+        @staticmethod
+        def apply_event(event):
+            kind = event.WhichOneof('event')
+            if kind == 'torque_selection':
+                apply_gui_command(torque=event.torque_selection.peak_torque)
+            elif kind == 'slider_update':
+                apply_gui_command(slider_btn=event.slider_update.button, slider_value=event.slider_update.value)
+            elif kind == 'confirm':
+                apply_gui_command(confirm_btn_pressed='True')
+            elif kind == 'presentation_schedule':
+                gui_commands.post_schedule(entry.peak_torque for entry in event.presentation_schedule.entries)
+        
+        def Session(self, request_iterator, context):
+            session = {'acknowledged_sequence': 0}
+            closed = threading.Event()
+            
+            def receive():
+                try:
+                    for event in request_iterator:
+                        start_time = time.perf_counter()
+                        self.apply_event(event)
+                        self.GUI_thread.record_request(start_time)
+                        session['acknowledged_sequence'] = event.sequence
+                except grpc.RpcError:
+                    pass
+                finally:
+                    closed.set()
+            
+            threading.Thread(target=receive, name='GUISessionReceiver', daemon=True).start()
+            
+            # heel strikes (bumped once per stride by the Bertec thread or the IMU phase wrap) since the stream was opened
+            initial_heel_strike_counts = (config.heel_strike_count_left, config.heel_strike_count_right)
+            while context.is_active() and self.GUI_thread.quit_event.is_set():
+                stride_counts = {'left': config.heel_strike_count_left - initial_heel_strike_counts[0],
+                                 'right': config.heel_strike_count_right - initial_heel_strike_counts[1]}
+                
+                yield gui2controller3_pb2.ControllerStatus(
+                    acknowledged_sequence=session['acknowledged_sequence'],
+                    commanded_torque=gui_commands.latest().peak_torque,
+                    delivered_torque_left=config.act_ank_torque_left, delivered_torque_right=config.act_ank_torque_right,
+                    vas_main_frequency=config.vas_main_frequency, gse_thread_frequency=config.gse_thread_frequency,
+                    thermal_torque_scale_left=config.thermal_torque_scale_left, thermal_torque_scale_right=config.thermal_torque_scale_right,
+                    winding_temperature_left=config.winding_temperature_left, winding_temperature_right=config.winding_temperature_right,
+                    stride_count_left=stride_counts['left'], stride_count_right=stride_counts['right'])
+                
+                if closed.wait(1/config.gui_status_frequency):
+                    break
+    
+    def record_request(self, start_time:float):
+        """Counts a handled GUI message & its handler latency (called from the server's worker threads)"""
+        latency = time.perf_counter() - start_time
+        with self.metrics_lock:
+            self.request_count += 1
+            self.latency_sum += latency
+            self.latency_max = max(self.latency_max, latency)
+    
+    def publish_metrics(self, elapsed:float):
+        with self.metrics_lock:
+            count, latency_sum, latency_max = self.request_count, self.latency_sum, self.latency_max
+            self.request_count, self.latency_sum, self.latency_max = 0, 0.0, 0.0
+        
+        config.gui_communication_thread_frequency = count / elapsed    # GUI messages handled per s
+        config.gui_handler_latency = latency_sum / count if count else 0.0
+        config.gui_handler_latency_max = latency_max
+    
     def starting_server(self):
         print("Starting Server -- For receiving Peak Torques, $-Values, etc...")
-        server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+        # One GUI client: a v3 stream holds a worker for its lifetime, the rest serve v2 calls & stream reconnects
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=config.gui_server_max_workers, thread_name_prefix='GUIServer'),
+                             maximum_concurrent_rpcs=config.gui_server_max_workers)
         gui2controller2_pb2_grpc.add_CommunicationServiceServicer_to_server(self.CommunicationService(self),server)
+        gui2controller3_pb2_grpc.add_CommunicationServiceV3Servicer_to_server(self.CommunicationServiceV3(self),server)
         server.add_insecure_port(config.server_ip)
         server.start()
-        server.wait_for_termination()        
+        return server
 
     def run(self):
-        # Period Tracker
-        period_tracker = MovingAverageFilter(size=300)
-        prev_end_time = time.time()
-
+        # The server is started once; this thread only publishes its metrics until quit, then stops it gracefully
+        self.server = self.starting_server()
+        
+        prev_time = time.perf_counter()
         while self.quit_event.is_set():
-            self.starting_server()
-
-            # Update Period Tracker and config
-            end_time = time.time()
-            period_tracker.update(end_time - prev_end_time)
-            prev_end_time = end_time
-            config.gui_communication_thread_frequency = 1/period_tracker.average()
\ No newline at end of file
+            time.sleep(self.metrics_period)
+            
+            now = time.perf_counter()
+            self.publish_metrics(now - prev_time)
+            prev_time = now
+        
+        print("Stopping Server ({} s grace period)".format(config.gui_server_grace_period))
+        self.server.stop(config.gui_server_grace_period).wait()
@@ -14,16 +14,17 @@ from kivy.uix.textinput import TextInput
 from kivy.properties import StringProperty
 from kivy.properties import NumericProperty
 
-import numpy as np
+import os
 import time
 import csv
 from functools import partial
 import random
 
-import gui2controller2_pb2
-import gui2controller2_pb2_grpc
 import config
-import grpc
+from gui_transport import GuiTransport, GuiStreamTransport
+from presentation_schedule import PresentationSchedule
+
+thisdir = os.path.dirname(os.path.abspath(__file__))
 
 # Define the GUI class
 class GuiVas(BoxLayout):
@@ -54,6 +55,7 @@ class GuiVas(BoxLayout):
     
     npo_mv_text = StringProperty(f"${config.NPO_MV}")
     epo_mv_text = StringProperty(f"${config.EPO_MV}")
+    controller_status_text = StringProperty("")     # latest controller status (v3 stream only)
     
     # npo_mv_text = StringProperty(f"Assistance\nNot Valued:\n${config.NPO_MV}")
     # epo_mv_text = StringProperty(f"Assistance\nValued:\n${config.EPO_MV}")
@@ -69,9 +71,33 @@ class GuiVas(BoxLayout):
         self.rand_colors = ['#34308F','#590f2c']
         self.current_color_index = 0
         
+        # One persistent channel to the controller; messages are sent from a background thread
+        if config.grpc_protocol == 'v3':
+            self.transport = GuiStreamTransport(config.server_ip, enabled=config.grpc_needed, on_status=self.on_controller_status)
+        else:
+            self.transport = GuiTransport(config.server_ip, enabled=config.grpc_needed)
+        
+        # Trial x presentation x button -> torque mapping, logged & sent to the controller (to prepare those torques) up front
+        self.schedule = PresentationSchedule()
+        self.schedule.log(os.path.join(thisdir, "session_records", f"sub{config.sub_num}_presentation_schedule.csv"))
+        self.transport.send_schedule(self.schedule.mapping)
+        
         
+    def on_controller_status(self, status):
+        """Called from the transport's thread with each ControllerStatus; the label is updated on the Kivy thread"""
+        if config.show_controller_status:
+            Clock.schedule_once(partial(self.show_controller_status, status))
+
+
+    def show_controller_status(self, status, *args):
+        self.controller_status_text = ("Delivered {:.1f} / {:.1f} Nm   Thermal scale {:.2f} / {:.2f}   Winding {:.0f} / {:.0f} °C   (L / R)"
+                                       .format(status.delivered_torque_left, status.delivered_torque_right,
+                                               status.thermal_torque_scale_left, status.thermal_torque_scale_right,
+                                               status.winding_temperature_left, status.winding_temperature_right))
+
+
     def serverlogger(self, slider_index=None, btn_instance=None, curr_torque:float=0.0):
-        """Log the data/current torque selection and send to the Server/Rpi file"""
+        """Log the data/current torque selection and send to the Server/Rpi file (queued, sent by the transport's thread)"""
 
         try:
             # if a slider is being adjusted, find that slider's A,B,C,D index
@@ -83,44 +109,15 @@ class GuiVas(BoxLayout):
             #  If a slider has not been moved, but only a button has been pressed (including confirm btn), log the appropriate button's data
             if slider_selected == None: 
                 if curr_torque != 0.0:  # if the torque value is provided via btn press 
-                    temp_logging_data = [str(curr_torque), str('nan'), str('nan'), str(config.bool_confirm_button_pressed)]
-                    # Send the torque value to the server via gRPC
-                    if config.grpc_needed:
-                        with grpc.insecure_channel(config.server_ip, options=(('grpc.enable_http_proxy',0), )) as channel:
-                            try:
-                                stub = gui2controller2_pb2_grpc.CommunicationServiceStub(channel)
-                                response = stub.GUI_Messenger(gui2controller2_pb2.data_stream(logging_data=temp_logging_data))
-                                
-                            except grpc.RpcError as e:
-                                print("Error",e)
-                    
+                    self.transport.select_torque(btn_instance, curr_torque)
                     self.prev_btn_instance = btn_instance 
                 else:   # if the torque value is not provided (i.e. confirm btn is pressed)
-                    temp_logging_data = [str('nan'), str('nan'), str('nan'), str(config.bool_confirm_button_pressed)]
-                    # Send the torque value to the server via gRPC
-                    if config.grpc_needed:
-                        with grpc.insecure_channel(config.server_ip, options=(('grpc.enable_http_proxy',0), )) as channel:
-                            try:
-                                stub = gui2controller2_pb2_grpc.CommunicationServiceStub(channel)
-                                response = stub.GUI_Messenger(gui2controller2_pb2.data_stream(logging_data=temp_logging_data))
-                                
-                            except grpc.RpcError as e:
-                                print("Error",e)
+                    self.transport.confirm()
                 
             # otherwise, if a slider has been moved, log the appropriate slider's data
+            # (only the latest value of each slider is sent, at a bounded rate, while it is dragged)
             else:
-                temp_logging_data = [str('nan'), str(slider_selected),str(round(self.button_slider_values[chr(65+slider_index)], 2)), str(config.bool_confirm_button_pressed)]
-                # Send the torque value to the server via gRPC
-                if config.grpc_needed:
-                    with grpc.insecure_channel(config.server_ip, options=(('grpc.enable_http_proxy',0), )) as channel:
-                        try:
-                            stub = gui2controller2_pb2_grpc.CommunicationServiceStub(channel)
-                            response = stub.GUI_Messenger(gui2controller2_pb2.data_stream(logging_data=temp_logging_data))
-                        
-                        
-                        except grpc.RpcError as e:
-                            print("Error",e)
-                
+                self.transport.update_slider(slider_selected, self.button_slider_values[slider_selected])
                 self.prev_btn_instance = btn_instance 
          
             # reset the confirm button press after logging
@@ -131,32 +128,38 @@ class GuiVas(BoxLayout):
 
 
     def on_slider_value(self,additional_variable,instance_slider: Slider, value: float):
-        """Slider value change event method"""
+        """Slider value change event method (additional_variable is the slider's button letter)"""
         self.vas_value = value
 
-        # Find the index of the slider that triggered the event
-        slider_index = self.ids.slider_layout.children.index(instance_slider.parent)   # A = 0, B = 1, ...
+        # Index of the slider's button: A = 0, B = 1, ... (independent of the slider's current row)
+        slider_index = ord(additional_variable) - 65
 
         # Print the VAS value and the index of the slider
         # print(f"VAS value: {self.vas_value}, Slider: {chr(65+slider_index)}")
 
         # Update the text and position of the corresponding label
-        label_index = self.num_torque_options - self.ids.slider_layout.children.index(instance_slider.parent) - 1   # label index is the opposite of the slider index
-        self.labels[label_index].text = f"${round(value, 2)}"
-        self.labels[label_index].center_x = instance_slider.value_pos[0]  # Set the x position of the label to the x position of the slider
-        self.labels[label_index].y = instance_slider.value_pos[1] + instance_slider.height / 2  # Set the y position of the label to the y position of the slider
+        label = self.labels[additional_variable]
+        label.text = f"${round(value, 2)}"
+        label.center_x = instance_slider.value_pos[0]  # Set the x position of the label to the x position of the slider
+        label.y = instance_slider.value_pos[1] + instance_slider.height / 2  # Set the y position of the label to the y position of the slider
         
         # Set the opacity of the label to 1
-        self.labels[label_index].opacity = 1
+        label.opacity = 1
 
         config.bool_slider_value_changed = True
-        self.button_slider_values[chr(65+slider_index)] = self.vas_value # Update the dictionary with the new slider value
-        print("self.button_slider_values: ", self.button_slider_values)
+        self.button_slider_values[additional_variable] = self.vas_value # Update the dictionary with the new slider value
 
         # Log the data
         self.serverlogger(slider_index=slider_index)
 
 
+    def on_slider_release(self, instance_slider: Slider, touch):
+        """Sends the final slider value as soon as the slider is released"""
+        if touch.grab_current is instance_slider:
+            self.transport.flush()
+            print("self.button_slider_values: ", self.button_slider_values)
+
+
     def press(self, instance_btn: Button):
         """Button press response method"""
         print(f"You pressed the button: {instance_btn.text}")
@@ -167,69 +170,12 @@ class GuiVas(BoxLayout):
                 child.disabled = True
         Clock.schedule_once(self.reenable_widgets, 5)
 
-        if config.GUI_btn_setup == '4btn':
-            # randomized button-torque mapping for each trial (wtihout replacement)
-            np.random.seed(config.curr_trial_num)
-            
-            pseudo_random_presentation_torques = np.random.choice(config.torque_settings, size = config.num_of_tot_torque_settings, replace=False)
-            
-            print(pseudo_random_presentation_torques)
-            
-            # select a subset of the pseudo-randomized torques based on current presentation number
-            if config.current_presentation_num == 1:
-                pseudo_random_presentation_torques = pseudo_random_presentation_torques[0:self.torques_per_presentation]
-            elif config.current_presentation_num == 2:
-                pseudo_random_presentation_torques = pseudo_random_presentation_torques[self.torques_per_presentation:self.torques_per_presentation*2]
-            elif config.current_presentation_num == 3:
-                pseudo_random_presentation_torques = pseudo_random_presentation_torques[self.torques_per_presentation*2:config.num_of_tot_torque_settings]
-            
-            # Set the torque value based on the button pressed
-            if(instance_btn.text == 'A'):
-                torque = pseudo_random_presentation_torques[0]
-            elif(instance_btn.text == 'B'):
-                torque = pseudo_random_presentation_torques[1]
-            elif(instance_btn.text == 'C'):
-                torque = pseudo_random_presentation_torques[2]
-            elif(instance_btn.text == 'D'):
-                torque = pseudo_random_presentation_torques[3]
-                
-            print(round(torque, 3), "Nm")
-                
-        elif config.GUI_btn_setup == 'full':
-            # randomized button-torque mapping for each trial (wtihout replacement)
-            np.random.seed(config.curr_trial_num)
-            pseudo_random_presentation_torques = np.random.choice(config.torque_settings, size = config.num_of_tot_torque_settings, replace=False)
-            
-            # Set the torque value based on the button pressed
-            if(instance_btn.text == 'A'):
-                torque = pseudo_random_presentation_torques[0]
-            elif(instance_btn.text == 'B'):
-                torque = pseudo_random_presentation_torques[1]
-            elif(instance_btn.text == 'C'):
-                torque = pseudo_random_presentation_torques[2]
-            elif(instance_btn.text == 'D'):
-                torque = pseudo_random_presentation_torques[3]
-            elif(instance_btn.text == 'E'):
-                torque = pseudo_random_presentation_torques[4]
-            elif(instance_btn.text == 'F'):
-                torque = pseudo_random_presentation_torques[5]
-            elif(instance_btn.text == 'G'):
-                torque = pseudo_random_presentation_torques[6]
-            elif(instance_btn.text == 'H'):
-                torque = pseudo_random_presentation_torques[7]
-            elif(instance_btn.text == 'I'):
-                torque = pseudo_random_presentation_torques[8]
-            elif(instance_btn.text == 'J'):
-                torque = pseudo_random_presentation_torques[9]
-            elif(instance_btn.text == 'K'):
-                torque = pseudo_random_presentation_torques[10]
-            elif(instance_btn.text == 'L'):
-                torque = pseudo_random_presentation_torques[11]
-                
-            print(round(torque, 3), "Nm")
+        # randomized button-torque mapping for each trial (wtihout replacement), precomputed at GUI start
+        torque = self.schedule.torque(config.curr_trial_num, config.current_presentation_num, instance_btn.text)
+        print(torque, "Nm")
         
         # Log the new torque option
-        self.serverlogger(btn_instance=instance_btn.text, curr_torque=round(torque, 3))
+        self.serverlogger(btn_instance=instance_btn.text, curr_torque=torque)
         
         
     def reenable_widgets(self, *args):
@@ -249,14 +195,11 @@ class GuiVas(BoxLayout):
         # sort the buttons based on the slider values
         self.button_order = sorted(self.button_order, key=lambda button: self.button_slider_values.get(button, config.NPO_MV), reverse=True)
 
-        # Clear the old button layout
-        self.ids.button_layout.clear_widgets()
-        self.create_buttons()
-        self.create_sliders()
+        # Move the existing buttons & sliders to their new rows (no widgets are recreated or rebound)
+        self.arrange_buttons()
+        self.arrange_sliders()
         
         # Change the button color to enable the user to see the change/button press
-        confirm_button = self.ids.confirm_button
-        confirm_button.bind(on_release=partial(self.change_button_color, confirm_button))
         self.current_color_index += 1
 
 
@@ -272,51 +215,81 @@ class GuiVas(BoxLayout):
         
         
     def create_buttons(self):
-        """Create variable number of buttons"""
-        button_colors = ['#0d9c35','#00954b','#92dc7e','#64c987','#39b48e','#089f8f','#00898a','#08737f','#215d6e','#2a4858','#219ebc','#FFB703']
-        button_colors = button_colors[:self.num_torque_options]  # limit the number of buttons to the number of torque options
+        """Create variable number of buttons (called only once at the beginning, then reordered by arrange_buttons)"""
         self.ids.button_layout.rows =  self.num_torque_options   # set the number of columns in the grid layout
-        for count, i in enumerate(self.button_order):
+        self.buttons = {}
+        for i in self.button_order:
             # Create the button
             button = Button(text=f"{i}") # unicode point for 'A' is 65
-            self.last_pressed_button= i
             button.bind(on_press=self.press)
-            button.background_color = button_colors[count-1]
             button.font_size = 64
             button.background_normal = ''
-            self.ids.button_layout.add_widget(button)
+            self.buttons[i] = button
+        self.arrange_buttons()
+        
+        # Confirm button color changes on release (bound once)
+        confirm_button = self.ids.confirm_button
+        confirm_button.bind(on_release=partial(self.change_button_color, confirm_button))
 
 
     def create_sliders(self):
-        """Create variable number of sliders (called only once at the beginning)"""
-        
-        slider_colors = ['#0d9c35','#00954b','#92dc7e','#64c987','#39b48e','#089f8f','#00898a','#08737f','#215d6e','#2a4858','#219ebc','#FFB703']
-        slider_colors = slider_colors[:self.num_torque_options]  # limit the number of buttons to the number of torque options
+        """Create variable number of sliders (called only once at the beginning, then reordered by arrange_sliders)"""
         self.ids.slider_layout.rows = self.num_torque_options
-        self.labels = []
+        self.slider_rows = {}
+        self.labels = {}
 
         self.ids.slider_layout.clear_widgets()
-        for count,i in enumerate(self.button_order):
-            #for i in range(self.num_torque_options):
+        for i in self.button_order:
             # Create a BoxLayout for each slider
             box_layout = BoxLayout(orientation='horizontal')
 
             # Create the slider
             slider = Slider(min=config.NPO_MV, max=config.EPO_MV, value=self.button_slider_values[i], cursor_size=(65, 65), cursor_image="pin_1.png")
-            self.last_pressed_button = i
             additional_variable = i
             slider.bind(value=partial(self.on_slider_value, additional_variable))
+            slider.bind(on_touch_up=self.on_slider_release)
 
-            # Create the cursor label and initially set the opacity to 0
-            cursor_label = Label(text=f"${round(slider.value, 2)}", size_hint=(None, None), color=slider_colors[count-1],opacity=1)
-            self.labels.append(cursor_label)
+            # Create the cursor label
+            cursor_label = Label(text=f"${round(slider.value, 2)}", size_hint=(None, None), opacity=1)
+            self.labels[i] = cursor_label
 
             # Add the labels and the slider to the BoxLayout
             box_layout.add_widget(slider)
             box_layout.add_widget(cursor_label)
-            
-            # Add the BoxLayout to the slider_layout
-            self.ids.slider_layout.add_widget(box_layout)
+            self.slider_rows[i] = box_layout
+        self.arrange_sliders()
+
+
+    def arrange_buttons(self):
+        """Places the buttons in button_order & colors them by row"""
+        button_colors = ['#0d9c35','#00954b','#92dc7e','#64c987','#39b48e','#089f8f','#00898a','#08737f','#215d6e','#2a4858','#219ebc','#FFB703']
+        button_colors = button_colors[:self.num_torque_options]  # limit the number of buttons to the number of torque options
+        self.reorder(self.ids.button_layout, [self.buttons[i] for i in self.button_order])
+        for count, i in enumerate(self.button_order):
+            self.buttons[i].background_color = button_colors[count-1]
+
+
+    def arrange_sliders(self):
+        """Places the sliders in button_order & colors their labels by row"""
+        slider_colors = ['#0d9c35','#00954b','#92dc7e','#64c987','#39b48e','#089f8f','#00898a','#08737f','#215d6e','#2a4858','#219ebc','#FFB703']
+        slider_colors = slider_colors[:self.num_torque_options]  # limit the number of buttons to the number of torque options
+        self.reorder(self.ids.slider_layout, [self.slider_rows[i] for i in self.button_order])
+        for count, i in enumerate(self.button_order):
+            self.labels[i].color = slider_colors[count-1]
+
+
+    @staticmethod
+    def reorder(layout, widgets:list):
+        """Makes widgets (already in layout or not) the layout's children in display order, 
+        only moving the widgets that are out of place"""
+        # children are in reverse order of addition (the first added widget is displayed first); 
+        # fill children from index 0 so that the widgets already in place are never shifted
+        for index, widget in enumerate(reversed(widgets)):
+            if index < len(layout.children) and layout.children[index] is widget:
+                continue
+            if widget.parent is layout:
+                layout.remove_widget(widget)
+            layout.add_widget(widget, index=index)
 
 
 class VAS_GUIApp(App):
@@ -326,6 +299,9 @@ class VAS_GUIApp(App):
     def build(self):
         Builder.load_file("GUI_VAS.kv")
         return GuiVas()
+    
+    def on_stop(self):
+        self.root.transport.close()
 
 
 if __name__ == "__main__":
@@ -7,6 +7,8 @@ server_ip = f"{'0.0.0.0'}:" f"{'50051'}"   # IP address when just testing on sam
 client_ip = f"{'0.0.0.0'}:" f"{'50051'}"   # IP address when just testing on same machine
 gui_commanded_torque: float = 0.0          # For TestServer_2.py 
 grpc_needed:bool = True                      # SET TO FALSE IF DOING GUI TESTING W/O COMMANDING EXO
+grpc_protocol:str = 'v2'                     # 'v2' (unary, served by every controller) or 'v3' (bidirectional stream w/ controller status, gui2controller3.proto; opt-in)
+show_controller_status:bool = True           # v3 only: show delivered torque, thermal scale & winding temperatures next to CONFIRM
 
 ###### INITIALIZING RELEVANT VARS  ######
 bool_confirm_button_pressed: bool = False
@@ -20,6 +22,7 @@ GUI_btn_setup:str = 'full'                              # Full 12 btn setup or 4
 sub_num:int = 1
 curr_trial_num:int = 1                                  # Current trial number (out of 4 if '4btn' setup and 3 if 'full' setup)
 current_presentation_num:int = 3                        # Only 1 presentation if 'full' setup and 3 presentations if '4btn' setup
+num_of_trials:int = 4 if GUI_btn_setup == '4btn' else 3  # Trials in the session (presentation schedule is computed for all at GUI start)
 
 NPO_MV:float = -18.60        # Value of the slider at the extreme negative end (REMEMBER TO CHANGE IN .KV FILE)
 EPO_MV:float = 3.4           # Value of the slider at the extreme positive end (REMEMBER TO CHANGE IN .KV FILE)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: gui2controller3.proto
+# Protobuf Python Version: 4.25.0
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x15gui2controller3.proto\"6\n\x0fTorqueSelection\x12\x0e\n\x06\x62utton\x18\x01 \x01(\t\x12\x13\n\x0bpeak_torque\x18\x02 \x01(\x01\"-\n\x0cSliderUpdate\x12\x0e\n\x06\x62utton\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01\"\t\n\x07\x43onfirm\"[\n\x0fScheduledTorque\x12\r\n\x05trial\x18\x01 \x01(\r\x12\x14\n\x0cpresentation\x18\x02 \x01(\r\x12\x0e\n\x06\x62utton\x18\x03 \x01(\t\x12\x13\n\x0bpeak_torque\x18\x04 \x01(\x01\"9\n\x14PresentationSchedule\x12!\n\x07\x65ntries\x18\x01 \x03(\x0b\x32\x10.ScheduledTorque\"\xd0\x01\n\x08GuiEvent\x12\x10\n\x08sequence\x18\x01 \x01(\x04\x12,\n\x10torque_selection\x18\x02 \x01(\x0b\x32\x10.TorqueSelectionH\x00\x12&\n\rslider_update\x18\x03 \x01(\x0b\x32\r.SliderUpdateH\x00\x12\x1b\n\x07\x63onfirm\x18\x04 \x01(\x0b\x32\x08.ConfirmH\x00\x12\x36\n\x15presentation_schedule\x18\x05 \x01(\x0b\x32\x15.PresentationScheduleH\x00\x42\x07\n\x05\x65vent\"\x87\x03\n\x10\x43ontrollerStatus\x12\x1d\n\x15\x61\x63knowledged_sequence\x18\x01 \x01(\x04\x12\x18\n\x10\x63ommanded_torque\x18\x02 \x01(\x01\x12\x1d\n\x15\x64\x65livered_torque_left\x18\x03 \x01(\x02\x12\x1e\n\x16\x64\x65livered_torque_right\x18\x04 \x01(\x02\x12\x1a\n\x12vas_main_frequency\x18\x05 \x01(\x02\x12\x1c\n\x14gse_thread_frequency\x18\x06 \x01(\x02\x12!\n\x19thermal_torque_scale_left\x18\x07 \x01(\x02\x12\"\n\x1athermal_torque_scale_right\x18\x08 \x01(\x02\x12 \n\x18winding_temperature_left\x18\t \x01(\x02\x12!\n\x19winding_temperature_right\x18\n \x01(\x02\x12\x19\n\x11stride_count_left\x18\x0b \x01(\r\x12\x1a\n\x12stride_count_right\x18\x0c \x01(\r2G\n\x16\x43ommunicationServiceV3\x12-\n\x07Session\x12\t.GuiEvent\x1a\x11.ControllerStatus\"\x00(\x01\x30\x01\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'gui2controller3_pb2', _globals)
+if _descriptor._USE_C_DESCRIPTORS == False:
+  DESCRIPTOR._options = None
+  _globals['_TORQUESELECTION']._serialized_start=25
+  _globals['_TORQUESELECTION']._serialized_end=79
+  _globals['_SLIDERUPDATE']._serialized_start=81
+  _globals['_SLIDERUPDATE']._serialized_end=126
+  _globals['_CONFIRM']._serialized_start=128
+  _globals['_CONFIRM']._serialized_end=137
+  _globals['_SCHEDULEDTORQUE']._serialized_start=139
+  _globals['_SCHEDULEDTORQUE']._serialized_end=230
+  _globals['_PRESENTATIONSCHEDULE']._serialized_start=232
+  _globals['_PRESENTATIONSCHEDULE']._serialized_end=289
+  _globals['_GUIEVENT']._serialized_start=292
+  _globals['_GUIEVENT']._serialized_end=500
+  _globals['_CONTROLLERSTATUS']._serialized_start=503
+  _globals['_CONTROLLERSTATUS']._serialized_end=894
+  _globals['_COMMUNICATIONSERVICEV3']._serialized_start=896
+  _globals['_COMMUNICATIONSERVICEV3']._serialized_end=967
+# @@protoc_insertion_point(module_scope)
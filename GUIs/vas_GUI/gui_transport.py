@@ -0,0 +1,236 @@
+"""GUI -> Controller transport: one long-lived gRPC channel & a background sender thread,
+so that GUI event handlers (on the Kivy UI thread) only enqueue messages and never block on the network.
+
+Continuous updates (slider drags) are coalesced: only the latest value per key is kept and pending values are 
+sent at most max_rate times per second. Pending values are sent before any later discrete message (button, confirm),
+on flush() (slider release) and on close(), so the final value always reaches the controller.
+
+GuiTransport talks to the v2 (unary, string list) service; GuiStreamTransport keeps one v3 bidirectional stream open,
+sending typed events and receiving the controller status. Both take GUI events through select_torque/update_slider/confirm;
+the presentation schedule (send_schedule) is only sent by the v3 transport, first on every (re)opened stream
+(with v2, the controller prewarms its own copy of the torque settings, config.vas_torque_settings)."""
+import collections
+import itertools
+import queue
+import threading
+import time
+
+import grpc
+
+import gui2controller2_pb2
+import gui2controller2_pb2_grpc
+import gui2controller3_pb2
+import gui2controller3_pb2_grpc
+
+class GuiTransport:
+    WAKE = object()     # wakes the sender thread up to send coalesced values
+
+    def __init__(self, server_ip:str, enabled:bool = True, timeout:float = 1.0, max_rate:float = 20, on_error=None):
+        """
+        Args:
+            server_ip: address of the controller's gRPC server
+            enabled: if False, messages are dropped (GUI testing w/o commanding the exo)
+            timeout: deadline of each RPC (s)
+            max_rate: max rate at which coalesced values are sent (Hz)
+            on_error: called from the sender thread with (message, grpc.RpcError) when a message fails
+        """
+        self.enabled = enabled
+        self.timeout = timeout
+        self.on_error = on_error if on_error is not None else self.print_error
+        self.outbox = queue.Queue()
+
+        self.pending = {}               # {key: latest logging_data not yet queued}
+        self.lock = threading.Lock()
+        self.period = 1 / max_rate
+        self.next_send_time = 0.0
+        self.handover = collections.deque()  # messages taken by an outgoing() call that has ended
+        self.poll_period = 0.1
+
+        if self.enabled:
+            self.channel = grpc.insecure_channel(server_ip, options=(('grpc.enable_http_proxy', 0), ))
+            self.connect()
+            self.sender = threading.Thread(target=self.run, name='GuiTransport', daemon=True)
+            self.sender.start()
+
+    def connect(self):
+        self.stub = gui2controller2_pb2_grpc.CommunicationServiceStub(self.channel)
+
+    @staticmethod
+    def print_error(message, error):
+        print("Error sending", message, error)
+
+    # GUI events (v2 logging data: [torque, slider btn, slider value, confirm btn pressed])
+    def select_torque(self, button:str, peak_torque:float):
+        self.send([str(peak_torque), str('nan'), str('nan'), str(False)])
+
+    def update_slider(self, button:str, value:float):
+        self.send_latest(button, [str('nan'), str(button), str(round(value, 2)), str(False)])
+
+    def confirm(self):
+        self.send([str('nan'), str('nan'), str('nan'), str(True)])
+
+    def send_schedule(self, mapping:dict):
+        """The v2 service has no message for the presentation schedule (the controller prewarms config.vas_torque_settings)"""
+        pass
+
+    def send(self, message):
+        """Queues a message for the controller (returns immediately), after any pending coalesced values."""
+        if self.enabled:
+            with self.lock:
+                self.queue_pending()
+                self.outbox.put(message)
+
+    def send_latest(self, key, message):
+        """Replaces the pending value of key; pending values are sent at most max_rate times per second."""
+        if self.enabled:
+            with self.lock:
+                if not self.pending:
+                    self.outbox.put(self.WAKE)
+                self.pending[key] = message
+
+    def flush(self):
+        """Queues the pending coalesced values right away (e.g. on slider release)."""
+        if self.enabled:
+            with self.lock:
+                self.queue_pending()
+
+    def queue_pending(self):
+        # caller holds self.lock
+        for message in self.pending.values():
+            self.outbox.put(message)
+        self.pending.clear()
+
+    def outgoing(self, active=None):
+        """Yields the messages in send order (coalesced values at most max_rate times per second) until close(),
+        or until active() turns False (messages taken but not yielded by then are handed to the next call)."""
+        ended = lambda: active is not None and not active()
+        while True:
+            if self.handover:
+                message = self.handover.popleft()
+            else:
+                with self.lock:
+                    waiting = bool(self.pending)
+                if waiting:
+                    timeout = max(self.next_send_time - time.monotonic(), 0)
+                else:
+                    timeout = None if active is None else self.poll_period
+                try:
+                    message = self.outbox.get(timeout=timeout)
+                except queue.Empty:
+                    message = self.WAKE
+
+            if ended():
+                if message is None:
+                    self.outbox.put(None)
+                elif message is not self.WAKE:
+                    self.handover.appendleft(message)
+                return
+            if message is None:
+                return
+            if message is not self.WAKE:
+                yield message
+
+            # Send the coalesced values once the rate limit allows it
+            if time.monotonic() >= self.next_send_time:
+                with self.lock:
+                    pending = list(self.pending.values())
+                    self.pending.clear()
+                for i, message in enumerate(pending):
+                    if ended():
+                        self.handover.extend(pending[i:])
+                        return
+                    yield message
+                if pending:
+                    self.next_send_time = time.monotonic() + self.period
+
+    def run(self):
+        for logging_data in self.outgoing():
+            try:
+                self.stub.GUI_Messenger(gui2controller2_pb2.data_stream(logging_data=logging_data),
+                                        timeout=self.timeout, wait_for_ready=True)
+            except grpc.RpcError as e:
+                self.on_error(logging_data, e)
+
+    def close(self):
+        """Sends what is still queued or pending, then closes the channel."""
+        if self.enabled:
+            self.flush()
+            self.outbox.put(None)
+            self.sender.join()
+            self.channel.close()
+
+
+class GuiStreamTransport(GuiTransport):
+    def __init__(self, server_ip:str, enabled:bool = True, timeout:float = 1.0, max_rate:float = 20, on_error=None, 
+                 on_status=None, reconnect_period:float = 1.0):
+        """
+        Args:
+            on_status: called from the sender thread with each ControllerStatus received
+            reconnect_period: s to wait before reopening a broken stream
+            timeout: s close() waits for the stream to end
+            (others as GuiTransport)
+        """
+        self.on_status = on_status if on_status is not None else (lambda status: None)
+        self.reconnect_period = reconnect_period
+        self.sequence = 0
+        self.status = None              # latest ControllerStatus
+        self.schedule = None            # presentation schedule {(trial, presentation, button): peak torque}
+        self.closing = threading.Event()
+        super().__init__(server_ip, enabled, timeout, max_rate, on_error)
+
+    def connect(self):
+        self.stub = gui2controller3_pb2_grpc.CommunicationServiceV3Stub(self.channel)
+
+    def select_torque(self, button:str, peak_torque:float):
+        self.send(gui2controller3_pb2.GuiEvent(torque_selection=gui2controller3_pb2.TorqueSelection(button=button, peak_torque=peak_torque)))
+
+    def update_slider(self, button:str, value:float):
+        self.send_latest(button, gui2controller3_pb2.GuiEvent(slider_update=gui2controller3_pb2.SliderUpdate(button=button, value=value)))
+
+    def confirm(self):
+        self.send(gui2controller3_pb2.GuiEvent(confirm=gui2controller3_pb2.Confirm()))
+
+    def send_schedule(self, mapping:dict):
+        """Sends {(trial, presentation, button): peak torque} (the controller prewarms those torques), 
+        again on every reopened stream"""
+        self.schedule = mapping
+        self.send(self.schedule_event())
+
+    def schedule_event(self):
+        return gui2controller3_pb2.GuiEvent(presentation_schedule=gui2controller3_pb2.PresentationSchedule(entries=[
+            gui2controller3_pb2.ScheduledTorque(trial=trial, presentation=presentation, button=button, peak_torque=torque)
+            for (trial, presentation, button), torque in sorted(self.schedule.items())]))
+
+    def events(self, session:int):
+        # sequence numbers are assigned here, in send order
+        schedule = [self.schedule_event()] if (self.schedule is not None and session > 1) else []
+        for event in itertools.chain(schedule, self.outgoing(active=lambda: session == self.session)):
+            self.sequence += 1
+            event.sequence = self.sequence
+            yield event
+
+    def run(self):
+        # The stream is reopened (after reconnect_period) if it breaks or the controller ends it (server stopped);
+        # queued messages wait for the new stream
+        self.session = 1
+        while not self.closing.is_set():
+            try:
+                for status in self.stub.Session(self.events(self.session), wait_for_ready=True):
+                    self.status = status
+                    self.on_status(status)
+            except grpc.RpcError as e:
+                self.on_error(None, e)
+            finally:
+                # ends the old events() generator right away, so that gRPC's request thread does not take (and drop)
+                # messages from it during the reconnect wait
+                self.session += 1
+            self.closing.wait(self.reconnect_period)
+
+    def close(self):
+        """Sends what is still queued or pending, then ends the stream & closes the channel."""
+        if self.enabled:
+            self.flush()
+            self.outbox.put(None)
+            self.closing.set()
+            self.sender.join(self.timeout)
+            self.channel.close()
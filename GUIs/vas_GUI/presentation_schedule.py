@@ -0,0 +1,57 @@
+"""Trial x presentation x button -> torque mapping of the VAS GUI, computed once at GUI start.
+
+Each trial uses the pseudo-random permutation of config.torque_settings seeded by the trial number (same permutation
+as np.random.seed(trial) + np.random.choice, without touching the global random state). In the '4btn' setup,
+presentation p shows torques [4(p-1), 4p) of the permutation on buttons A-D; the 'full' setup shows all of them on A-L
+in a single presentation."""
+import csv
+import os
+
+import numpy as np
+
+import config
+
+class PresentationSchedule:
+    def __init__(self, torque_settings=config.torque_settings, btn_setup:str = config.GUI_btn_setup,
+                 num_trials:int = config.num_of_trials, torques_per_presentation:int = None):
+        self.btn_setup = btn_setup
+        self.torques_per_presentation = torques_per_presentation or (4 if btn_setup == '4btn' else len(torque_settings))
+        self.num_presentations = int(np.ceil(len(torque_settings) / self.torques_per_presentation))
+        self.torque_settings = torque_settings
+
+        self.mapping = {}       # {(trial, presentation, button): torque (Nm)}
+        for trial in range(1, num_trials + 1):
+            self.mapping.update(self.trial_mapping(trial))
+
+    def trial_mapping(self, trial:int) -> dict:
+        """{(trial, presentation, button): torque} of a single trial"""
+        mapping = {}
+        permutation = np.random.RandomState(trial).choice(self.torque_settings, size=len(self.torque_settings), replace=False)
+        for i, torque in enumerate(permutation):
+            presentation, button = divmod(i, self.torques_per_presentation)
+            mapping[(trial, presentation + 1, chr(65 + button))] = round(float(torque), 3)
+        return mapping
+
+    def presentation(self, presentation:int) -> int:
+        # the 'full' setup has a single presentation
+        return presentation if self.num_presentations > 1 else 1
+
+    def torque(self, trial:int, presentation:int, button:str) -> float:
+        key = (trial, self.presentation(presentation), button)
+        if key not in self.mapping:
+            # trial past the precomputed ones (curr_trial_num > num_of_trials): computed on the fly, as before the schedule
+            print("Trial {} is not in the presentation schedule, adding its torques".format(trial))
+            self.mapping.update(self.trial_mapping(trial))
+        return self.mapping[key]
+
+    def torques(self) -> list:
+        """Every torque that can be presented (Nm)"""
+        return sorted(set(self.mapping.values()))
+
+    def log(self, filename:str):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['trial', 'presentation', 'button', 'torque'])
+            for (trial, presentation, button), torque in sorted(self.mapping.items()):
+                writer.writerow([trial, presentation, button, torque])
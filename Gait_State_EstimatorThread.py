@@ -10,14 +10,18 @@ from typing import Type
 from collections import deque
 import time
 import config
-from rtplot import client 
 import threading
 import csv
 from time import strftime
+from multiprocessing import shared_memory
 from flexsea.device import Device
 
 from SoftRTloop import FlexibleTimer
 from utils import MovingAverageFilter
+from phase_estimator import GaitPhaseEstimator
+from telemetry import TelemetryPublisher
+from telemetry_channels import gse_channels
+
 
 class Gait_State_Estimator(threading.Thread):
     def __init__(self, side_1, device_1, side_2, device_2, quit_event=Type[threading.Event],name='GSE'):
@@ -66,6 +70,13 @@ class Gait_State_Estimator(threading.Thread):
         self.stance_time_left_temp = 0
         self.stance_time_right_temp = 0
 
+        # Continuous gait phase (adaptive oscillator on IMU + ankle angle)
+        self.phase_estimator_left = GaitPhaseEstimator()
+        self.phase_estimator_right = GaitPhaseEstimator()
+        self.prev_phase_time = time.time()
+        self.prev_gait_phase_left = 0.0
+        self.prev_gait_phase_right = 0.0
+
         ## Set the Filename to Save the Logged Data: 
         fname_construction = 'Sub{0}_{1}_{2}_{3}.csv'.format(
             str(config.subject_ID), 
@@ -89,6 +100,7 @@ class Gait_State_Estimator(threading.Thread):
 
             ##### Ankle Encoder #####
             #TODO: Need to add if loop to give error message if the ankle angle excceds the maximum and min angle angles
+            config.ankle_enc_count_left = data_left['ank_ang']     # raw count, indexes the TR lookup tables
             config.ankle_angle_left = (config.ANK_ENC_SIGN_LEFT_EXO * data_left['ank_ang'] * config.ENC_CLICKS_TO_DEG) - config.max_dorsiflexed_ang_left  # obtain ankle angle in deg wrt max dorsi offset
             ##### IMU #####
             #left accel
@@ -110,6 +122,8 @@ class Gait_State_Estimator(threading.Thread):
             config.motor_velocity_left = data_left['mot_vel']
             config.ankle_velocity_left = data_left['ank_vel'] / 10
             config.motor_current_left = data_left['mot_cur']
+            config.motor_current_sq_total_left += config.motor_current_left ** 2    # for the thermal supervisor's RMS current
+            config.motor_current_samples_left += 1
             
             
             ## ====Calculate Delivered Ankle Torque from Measured Current====
@@ -127,6 +141,7 @@ class Gait_State_Estimator(threading.Thread):
             
             ##### Ankle Encoder #####
             #TODO: Need to add if loop to give error message if the ankle angle excceds the maximum and min ale angles
+            config.ankle_enc_count_right = data_right['ank_ang']   # raw count, indexes the TR lookup tables
             config.ankle_angle_right = (config.ANK_ENC_SIGN_RIGHT_EXO*data_right['ank_ang'] * config.ENC_CLICKS_TO_DEG) - config.max_dorsiflexed_ang_right  # obtain ankle angle in deg wrt max dorsi offset
 
             ##### IMU #####
@@ -148,6 +163,8 @@ class Gait_State_Estimator(threading.Thread):
             config.ankle_velocity_right = data_right['ank_vel'] / 10
             
             config.motor_current_right = data_right['mot_cur']
+            config.motor_current_sq_total_right += config.motor_current_right ** 2
+            config.motor_current_samples_right += 1
                 
             ## ====Calculate Delivered Ankle Torque from Measured Current====
             act_mot_torque_right = (config.motor_current_right * config.Kt / 1000 / self.motor_sign_right)  # in Nm
@@ -176,6 +193,43 @@ class Gait_State_Estimator(threading.Thread):
                 config.heel_strike_right = 0
             self.prev_accel_y_right = config.accel_y_right
             
+    def gait_phase_estimator(self):
+        now = time.time()
+        dt = now - self.prev_phase_time
+        self.prev_phase_time = now
+
+        config.gait_phase_left, config.gait_phase_rate_left = self.phase_estimator_left.update(
+            config.accel_y_left, config.gyro_z_left, config.ankle_angle_left, dt, config.heel_strike_left == 10)
+        config.gait_phase_right, config.gait_phase_rate_right = self.phase_estimator_right.update(
+            config.accel_y_right, config.gyro_z_right, config.ankle_angle_right, dt, config.heel_strike_right == 10)
+
+        # Without the forceplates, the phase drives the same gait state the Bertec thread would publish
+        # (HS timestamp & count, stance/stride periods, swing flag, time in stance), so the controller schedules torque on it unchanged.
+        # A heel strike is published only when the phase wraps (once per stride), stamped with the time the phase crossed 0.
+        if not config.bertec_fp_streaming and config.imu_phase_scheduling:
+            stride_period_left = 1 / config.gait_phase_rate_left
+            if self.phase_estimator_left.is_locked() and config.gait_phase_left < self.prev_gait_phase_left - 0.5:
+                config.heel_strike_time_left = now - config.gait_phase_left * stride_period_left
+                config.heel_strike_count_left += 1
+            config.stride_period_bertec_left = stride_period_left
+            config.stance_time_left = stride_period_left * config.END_OF_STANCE / config.END_OF_STRIDE
+            config.in_swing_bertec_left = (not self.phase_estimator_left.is_locked()) or (config.gait_phase_left * config.END_OF_STRIDE >= config.END_OF_STANCE)
+            if not config.in_swing_bertec_left and config.heel_strike_time_left is not None:
+                config.time_in_current_stance_left = now - config.heel_strike_time_left
+
+            stride_period_right = 1 / config.gait_phase_rate_right
+            if self.phase_estimator_right.is_locked() and config.gait_phase_right < self.prev_gait_phase_right - 0.5:
+                config.heel_strike_time_right = now - config.gait_phase_right * stride_period_right
+                config.heel_strike_count_right += 1
+            config.stride_period_bertec_right = stride_period_right
+            config.stance_time_right = stride_period_right * config.END_OF_STANCE / config.END_OF_STRIDE
+            config.in_swing_bertec_right = (not self.phase_estimator_right.is_locked()) or (config.gait_phase_right * config.END_OF_STRIDE >= config.END_OF_STANCE)
+            if not config.in_swing_bertec_right and config.heel_strike_time_right is not None:
+                config.time_in_current_stance_right = now - config.heel_strike_time_right
+
+        self.prev_gait_phase_left = config.gait_phase_left
+        self.prev_gait_phase_right = config.gait_phase_right
+
     def in_swing_flag(self):
         # Left Side
         if (config.accel_y_left <= 0.8) and (config.ankle_angle_left - config.ankle_offset_left > 10) and (config.gyro_z_left >= -20):
@@ -257,53 +311,33 @@ class Gait_State_Estimator(threading.Thread):
         self.time_in_current_stride_right = time.time() - self.start_time_right
         config.time_in_current_stride_right = self.time_in_current_stride_right
     
-    def logging(self, filename, datapoint_array): #Adding VSO/ VSPA style of logging
-        with open(filename, 'a') as f:
-            writer = csv.writer(f, lineterminator='\n',quotechar='|')
-            writer.writerow(datapoint_array)
-            
     def run(self):
-        # RealTimePlotting of: left & right angle angle, actual ankle torque, ankle velocity, and commanded torque
-        client.configure_ip(config.rtplot_ip)
-        plot_1_config = {'names': ['Ankle Angle Left'], 'title': "Ankle Angle Left", 'colors': ['r'], 'yrange':[20, 130], 'ylabel': "degrees", 'xlabel': 'timestep', "line_width":[8,8]}
-        # plot_2_config = {'names': ['Ankle Angle Right'], 'title': "Ankle Angle Right", 'colors': ['r'], 'yrange':[20,130], 'ylabel': "degrees", 'xlabel': 'timestep'}
-        # plot_3_config = {'names': ['Left Motor encoder'], 'title': "Left Motor Angle", 'colors': ['b'], 'yrange':[0,1200], 'ylabel': "degrees", 'xlabel': 'timestep'}
-        # plot_4_config = {'names': ['Right Motor encoder'], 'title': "Left Motor Angle", 'colors': ['b'], 'yrange':[0,1200], 'ylabel': "degrees", 'xlabel': 'timestep'}        
-        # plot_3_config = {'names': ['Left Motor Current'], 'title': "Left Motor Current", 'colors': ['b'], 'yrange':[0,25000], 'ylabel': "Nm", 'xlabel': 'timestep'}
-        # plot_3_1_config = {'names': ['Right Motor Current'], 'title': "Right Motor Current", 'colors': ['b'], 'yrange':[0,25000], 'ylabel': "Nm", 'xlabel': 'timestep'}
-        plot_5_1_config = {'names': ['Desired Torque Left'], 'title': "Desired Torque Left", 'colors': ['b'], 'yrange':[0,40], 'ylabel': "Nm", 'xlabel': 'timestep',"line_width":[8,8]}
-        plot_5_1_1_config = {'names': ['Calcd Torque Left'], 'title': "Calcd Torque Left", 'colors': ['r'], 'yrange':[0, 40], 'ylabel': "Nm", 'xlabel': 'timestep',"line_width":[8,8]}
-        # plot_5_2_config = {'names': ['Desired Torque Right'], 'title': "Desired Torque Right", 'colors': ['b'], 'yrange':[0,20], 'ylabel': "Nm", 'xlabel': 'timestep'}
-        # plot_6_config = {'names': ['Desired Torque Right'], 'title': "LEFT CURRENT TIME", 'colors': ['b'], 'yrange':[0,5], 'ylabel': "Nm", 'xlabel': 'timestep'}
-        # plot_6_1_config = {'names': ['N Left'], 'title': "N Left", 'colors': ['b'], 'yrange':[-10,20], 'ylabel': "TR", 'xlabel': 'timestep',"line_width":[8,8]}
-        # plot_6_2_config = {'names': ['N Right'], 'title': "N Right", 'colors': ['r'], 'yrange':[-10,18], 'ylabel': "TR", 'xlabel': 'timestep'}
-        
-        # plot_7_config = {'names': ['Accel X Backward Left'], 'title': "Accel X Left", 'colors': ['r'], 'yrange':[-10, 50], 'ylabel': "degrees", 'xlabel': 'timestep',"line_width":[8,8]}
-        # plot_8_config = {'names': ['Gyro Z Left'], 'title': "Gyro Z Left", 'colors': ['b'], 'yrange':[-50, 50], 'ylabel': "degrees", 'xlabel': 'timestep', "line_width":[8,8]}
-        plot_9_config = {'names': ['In Swing Left'], 'title': "Swing Left", 'colors': ['r'], 'yrange':[0, 100], 'ylabel': "degrees", 'xlabel': 'timestep',"line_width":[8,8]}
-        plot_10_config = {'names': ['Accel Y Left'], 'title': "Accel Y Left", 'colors': ['r'], 'yrange':[-10, 50], 'ylabel': "degrees", 'xlabel': 'timestep',"line_width":[8,8]}
-        # plot_12_config = {'names': ['Calcd Torque Right'], 'title': "Calcd Torque Right", 'colors': ['r'], 'yrange':[0, 40], 'ylabel': "Nm", 'xlabel': 'timestep',"line_width":[8,8]}
- 
-        # all_plot_configs = [plot_1_config, plot_2_config,plot_3_config, plot_3_1_config, plot_4_config, plot_5_config, plot_6_config]
-        all_plot_configs = [plot_1_config, plot_5_1_config, plot_5_1_1_config, plot_9_config, plot_10_config]
-        client.initialize_plots(all_plot_configs)
+        # Any logged signal not yet declared in config gets a default
+        gse_channels.declare(config)
+
+        # RealTimePlotting of the channels selected in config.rtplot_channels (sent from the telemetry thread)
+        self.telemetry = TelemetryPublisher(gse_channels.plot_configs(), config.rtplot_channels, quit_event=self.quit_event,
+                                            channel_index=gse_channels.index)
+        self.telemetry.daemon = True
+        self.telemetry.start()
         
-        # Logging to csv
-        self.logging(self.filename, ['state_time_left', 'temperature_left', 'ankle_angle_left', 'accel_x_left', 
-                         'accel_y_left', 'accel_z_left', 'gyro_x_left', 'gyro_y_left', 'gyro_z_left', 
-                         'motor_angle_left', 'motor_velocity_left', 'motor_current_left', 
-                         'stride_time_left', 'heel_strike_left', 'time_in_current_stride_left', 'state_time_right', 'temperature_right', 
-                         'ankle_angle_right', 'accel_x_right', 'accel_y_right', 'accel_z_right', 
-                         'gyro_x_right', 'gyro_y_right', 'gyro_z_right', 'motor_angle_right', 
-                         'motor_velocity_right', 'motor_current_right', 'stride_time_right', 
-                         'heel_strike_right', 'time_in_current_stride_right', 'rise_time','peak time','fall time', 
-                         'peak torque magnitude', 'adjusted slider btn', 'adjusted slider value', 'GUI confirm btn status',
-                         'N_left','N_right', 'left_swing_flag', 'right_swing_flag','back_calcd_torque_left','back_calcd_torque_right',
-                         'bertec_HS_left', 'bertec_HS_right', 'all_bertec_left', 'all_bertec_right', 'bertec_stance_t_left', 'bertec_stance_t_right',
-                         'stride_t_bertec_left', 'stride_t_bertec_right', 'bertec_in_swing_left', 'bertec_in_swing_right',
-                         'desired_torque_left', 'desired_torque_right',
-                         'vas_main_frequency', 'gui_communication_thread_frequency', 'gse_thread_frequency', 'bertec_thread_frequency'
-                         ])
+        # Logging to csv (kept open and line buffered, so at most the row being written is lost on a crash)
+        log_file = open(self.filename, 'a', buffering=1)
+        writer = csv.writer(log_file, lineterminator='\n', quotechar='|')
+        writer.writerow(gse_channels.header())
+
+        # Latest row also published in shared memory for other processes (gse_channels.record(SharedMemory(name).buf) reads it)
+        shm, latest_row = None, None
+        if config.telemetry_shm_name:
+            try:
+                shm = shared_memory.SharedMemory(name=config.telemetry_shm_name, create=True, size=gse_channels.dtype.itemsize)
+            except FileExistsError:
+                # left behind by a previous run that crashed
+                stale = shared_memory.SharedMemory(name=config.telemetry_shm_name)
+                stale.close()
+                stale.unlink()
+                shm = shared_memory.SharedMemory(name=config.telemetry_shm_name, create=True, size=gse_channels.dtype.itemsize)
+            latest_row = gse_channels.record(shm.buf)
         
         # Period Tracker
         period_tracker = MovingAverageFilter(size=500)
@@ -315,31 +349,16 @@ class Gait_State_Estimator(threading.Thread):
                 self.read_exo_sensors()
                 self.gait_estimator()
                 self.stride_time()
+                self.gait_phase_estimator()
                 self.in_swing_flag()
                 # self.IMU_stance_time()
                 
-                # logging to csv
-                self.logging(self.filename, [config.state_time_left, config.temperature_left, config.ankle_angle_left, config.accel_x_left,
-                    config.accel_y_left, config.accel_z_left, config.gyro_x_left, config.gyro_y_left, config.gyro_z_left,
-                    config.motor_angle_left, config.motor_velocity_left, config.motor_current_left, config.stride_time_left,
-                    config.heel_strike_left, config.time_in_current_stride_left, config.state_time_right, config.temperature_right,
-                    config.ankle_angle_right, config.accel_x_right, config.accel_y_right, config.accel_z_right, config.gyro_x_right,
-                    config.gyro_y_right, config.gyro_z_right, config.motor_angle_right, config.motor_velocity_right,
-                    config.motor_current_right, config.stride_time_right, config.heel_strike_right,
-                    config.time_in_current_stride_right, config.t_rise, config.t_peak, config.t_fall,
-                    config.GUI_commanded_torque, config.adjusted_slider_btn, config.adjusted_slider_value, config.confirm_btn_pressed, 
-                    config.N_left, config.N_right, config.swing_val_left, config.swing_val_right, config.act_ank_torque_left, config.act_ank_torque_right,
-                    config.bertec_HS_left,config.bertec_HS_right, config.z_forces_left, config.z_forces_right, config.time_in_current_stance_left, config.time_in_current_stance_right,
-                    config.stride_period_bertec_left, config.stride_period_bertec_right,config.swing_val_bertec_left,config.swing_val_bertec_right,
-                    config.desired_spline_torque_left,config.desired_spline_torque_right,
-                    config.vas_main_frequency, config.gui_communication_thread_frequency, config.gse_thread_frequency, config.bertec_thread_frequency
-                    ])
-
-                # plotting with RTPlot
-                #data = [config.ankle_angle_left,config.ankle_angle_right,config.motor_current_left, config.motor_current_right, config.desired_spline_torque_left, config.desired_spline_torque_right, self.time_in_current_stride_left]
-                data = [config.ankle_angle_left, config.desired_spline_torque_left, config.act_ank_torque_left,
-                        config.swing_val_left, config.swing_val_right, config.accel_y_left]
-                client.send_array(data)
+                # logging to csv & plotting with RTPlot (the telemetry thread only gets a queued reference to the row)
+                row = gse_channels.pack(config)
+                writer.writerow(row)
+                self.telemetry.push(row)
+                if latest_row is not None:
+                    latest_row[()] = row
                 # time.sleep(1/500) 
                 
                 # Update Period Tracker and config
@@ -354,6 +373,12 @@ class Gait_State_Estimator(threading.Thread):
             #     print('Error in the Gait State Estimator thread!!!!')
             #     print(e)
 
+        log_file.close()
+        if shm is not None:
+            del latest_row      # the record must release the buffer before it is closed
+            shm.close()
+            shm.unlink()
+
 """#Testing GSE, very basic script
 
 from flexsea import flexsea as flex
@@ -27,11 +27,22 @@ class GroundContact:
 
         self.time_in_current_stance = 0
     
-    def update(self, force):
+    def update(self, force, sample_time=None):
+        """
+        Args:
+            force: vertical GRF from the force plate (N)
+            sample_time: time at which the force plate sampled this force, on the Pi clock (s).
+                         Heel strike & toe off are stamped with it so link latency does not delay them.
+                         Defaults to the Pi's arrival time.
+        """
+        now = time.time()
+        if sample_time is None:
+            sample_time = now
+
         newContact = self.contact
         if self.contact: # if no state change, i.e. we are in contact 
             # compute current time in stance
-            self.time_in_current_stance = time.time() - self.HS_time 
+            self.time_in_current_stance = now - self.HS_time 
             
             if force < to_threshold: #there is no contact if the force is less than 20 N 
                 newContact = False  
@@ -42,7 +53,7 @@ class GroundContact:
         # if newContact has changed to true, means heel-strike, otherwise toe-off
         if newContact != self.contact:  # Detects a state change
             if newContact == True: # in this case we have a heel strike 
-                temp_stride_period_bertec = time.time() - self.HS_time
+                temp_stride_period_bertec = sample_time - self.HS_time
                 
                 # make sure stride_period is appropriate before appending to averaging list:
                 if((0.8*self.stride_period_bertec) <= temp_stride_period_bertec <= (1.20*self.stride_period_bertec)):
@@ -55,10 +66,11 @@ class GroundContact:
                 if len(self.stride_periods) >= self.movmean_window_sz:
                     self.stride_period_bertec = np.mean(self.stride_periods)
                     
-                self.HS_time = time.time()
+                self.HS_time = sample_time
+                self.time_in_current_stance = now - self.HS_time
                 
             else: # in this case we have a toe off, so compute stance time
-                self.TO_time = time.time()
+                self.TO_time = sample_time
                 time_diff = self.TO_time - self.HS_time
                 
                 # make sure stance period is appropriate before appending to averaging list:
@@ -0,0 +1,92 @@
+# Description:
+# Low-rate thermal supervision of both actpacks, kept out of the control loop.
+#
+# At THERMAL_SUPERVISOR_FREQUENCY, the two-node thermal model of each motor is integrated exactly (matrix exponential,
+# ThermalModel.step_exact) over the real elapsed time, using the measured case temperature and the RMS motor current
+# since the previous tick (from the squared-current running sums kept by the GSE thread).
+# The supervisor publishes a torque scale factor & a latched shutoff flag per side in config, which
+# ExoObject.iterate reads in O(1).
+
+import threading
+import time
+from typing import Type
+
+import config
+from SoftRTloop import FlexibleTimer
+from thermal import ThermalModel, resolve_thermal_params
+from utils import MovingAverageFilter
+
+class ThermalSupervisor(threading.Thread):
+    def __init__(self, quit_event=Type[threading.Event], device_ids:dict = None, name='ThermalSupervisor'):
+        """
+        Args:
+            device_ids: {side: device id}, to use each device's thermal parameters (resolve_thermal_params, as ExoObject)
+        """
+        super().__init__(name=name)
+        self.quit_event = quit_event
+        device_ids = device_ids or {}
+
+        # same soft limits as the ExoObject thermal model (torque is scaled down between soft & hard limits)
+        self.models = {side: ThermalModel(params=resolve_thermal_params(device_ids[side]) if side in device_ids else {},
+                                          temp_limit_windings=100, soft_border_C_windings=10, temp_limit_case=70, soft_border_C_case=10)
+                       for side in ('left', 'right')}
+        self.prev_sq_total = {side: 0.0 for side in self.models}
+        self.prev_samples = {side: 0 for side in self.models}
+
+        self.softRTloop = FlexibleTimer(target_freq=config.THERMAL_SUPERVISOR_FREQUENCY)
+
+    def rms_current(self, side:str) -> float:
+        """RMS motor current (mA) over the samples read by the GSE thread since the last call."""
+        sq_total = getattr(config, 'motor_current_sq_total_' + side)
+        samples = getattr(config, 'motor_current_samples_' + side)
+        new_samples = samples - self.prev_samples[side]
+        mean_sq = (sq_total - self.prev_sq_total[side]) / new_samples if new_samples > 0 else 0.0
+        self.prev_sq_total[side] = sq_total
+        self.prev_samples[side] = samples
+        return max(mean_sq, 0.0) ** 0.5
+
+    def supervise(self, side:str, dt:float):
+        model = self.models[side]
+
+        # measured temp by Dephy from the actpack is the case temperature
+        measured_temp = getattr(config, 'temperature_' + side)
+        model.T_c = measured_temp
+        model.step_exact(dt, self.rms_current(side))
+
+        setattr(config, 'winding_temperature_' + side, model.T_w)
+        setattr(config, 'thermal_torque_scale_' + side, model.get_torque_scale())
+
+        # Shut off exo if thermal limits breached (latched)
+        if not getattr(config, 'thermal_shutoff_' + side):
+            if measured_temp >= config.MAX_CASE_TEMPERATURE:
+                setattr(config, 'thermal_shutoff_' + side, True)
+                print("{} Case Temperature has exceeded {}°C limit. Exiting Gracefully".format(side, config.MAX_CASE_TEMPERATURE))
+            if model.T_w >= config.MAX_WINDING_TEMPERATURE:
+                setattr(config, 'thermal_shutoff_' + side, True)
+                print("{} Winding Temperature has exceeded {}°C limit. Exiting Gracefully".format(side, config.MAX_WINDING_TEMPERATURE))
+
+    def run(self):
+        # start from the measured case temperature & current count
+        for side, model in self.models.items():
+            model.T_w = model.T_c = getattr(config, 'temperature_' + side) or model.T_a
+            self.rms_current(side)
+
+        # Period Tracker
+        period_tracker = MovingAverageFilter(size=50)
+        prev_time = time.perf_counter()
+
+        while self.quit_event.is_set():
+            try:
+                now = time.perf_counter()
+                dt = now - prev_time
+                prev_time = now
+
+                for side in self.models:
+                    self.supervise(side, dt)
+
+                period_tracker.update(dt)
+                config.thermal_supervisor_frequency = 1/period_tracker.average()
+            except Exception as e:
+                print("error in thermal supervisor thread: ", e)
+
+            self.softRTloop.pause()
@@ -0,0 +1,148 @@
+# Identifies the ThermalModel parameters (C_w, R_WC, C_c, R_CA) of a device from thermal characterization logs
+# (thermal_fulldata_*.csv written by thermal_characterization_STANDING.py).
+#
+# Only the case temperature is measured, so the two-node model is simulated free-running from the logged motor current
+# and its case temperature is compared to the measured one:
+#   - each run is binned (bin_dt) into RMS current & mean case temperature
+#   - the exact transition of every bin is computed at once (batched matrix exponential of the augmented [T_w, T_c, 1] system)
+#   - a parameter set and all its finite-difference perturbations are simulated together (batched over parameter sets),
+#     giving the residuals & jacobian for scipy least_squares in one pass
+# Parameters are fit in log space to keep them positive. Runs are fit individually in parallel (one process per file),
+# then jointly starting from the median of the per-run fits, and written to thermal_params_<device id>.csv,
+# which ExoObject & ThermalSupervisor load into ThermalModel(params=...).
+#
+# Usage: python thermal_param_identification.py <device id> thermal_fulldata_left_20000mA.csv [more logs ...]
+
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.linalg import expm
+from scipy.optimize import least_squares
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from thermal import ThermalModel, IDENTIFIED_PARAMS, save_thermal_params
+
+def load_runs(filename:str, bin_dt:float = 1.0) -> list:
+    """Reads a thermal_fulldata log (runs appended to the same file each start with a header row) and bins every run.
+
+    Returns:
+        list of dict(dt, rms_current, case_temp) arrays per bin
+    """
+    runs = []
+    rows = []
+    with open(filename, mode='r') as file:
+        csv_reader = csv.reader(file, quotechar='|')
+        for row in csv_reader:
+            if row and row[0] == 'trial_time':
+                if rows:
+                    runs.append(rows)
+                header = row
+                rows = []
+            elif row:
+                rows.append([float(x) for x in row])
+    if rows:
+        runs.append(rows)
+
+    binned = []
+    for rows in runs:
+        data = np.array(rows)
+        t = data[:, header.index('trial_time')]
+        case_temp = data[:, header.index('case_temp')]
+        motor_current = data[:, header.index('motor_current')]
+
+        bins = ((t - t[0]) // bin_dt).astype(int)
+        counts = np.bincount(bins)
+        filled = np.flatnonzero(counts)
+        mean_sq_current = np.bincount(bins, motor_current**2)[filled] / counts[filled]
+        mean_case_temp = np.bincount(bins, case_temp)[filled] / counts[filled]
+        dt = np.diff(filled) * bin_dt
+
+        binned.append({'dt': dt, 'rms_current': np.sqrt(mean_sq_current[1:]), 'case_temp': mean_case_temp})
+    return binned
+
+def simulate_case_temperature(log_params:np.ndarray, run:dict, model:ThermalModel = None) -> np.ndarray:
+    """
+    Args:
+        log_params: (n_sets, 4) log of [C_w, R_WC, C_c, R_CA]
+        run: binned run from load_runs
+        model: provides the resistance & tempco constants (R_ϕ_0, α, R_T_0)
+
+    Returns:
+        (n_sets, n_bins) simulated case temperature, starting with the winding & case at the first measured case temperature
+        (which is also used as the ambient)
+    """
+    model = model or ThermalModel()
+    C_w, R_WC, C_c, R_CA = np.exp(np.atleast_2d(log_params)).T[:, :, None]     # (n_sets, 1) each
+    T_0 = run['case_temp'][0]
+    I2R_0 = (run['rms_current'] * 1e-3)**2 * model.R_ϕ_0                     # (n_bins - 1,)
+
+    # augmented system of every (parameter set, bin): d/dt [T_w, T_c, 1] = M [T_w, T_c, 1]
+    n_sets, n_steps = C_w.shape[0], I2R_0.size
+    M = np.zeros((n_sets, n_steps, 3, 3))
+    M[..., 0, 0] = (I2R_0 * model.α - 1 / R_WC) / C_w
+    M[..., 0, 1] = 1 / (R_WC * C_w)
+    M[..., 0, 2] = I2R_0 * (1 - model.α * model.R_T_0) / C_w
+    M[..., 1, 0] = 1 / (R_WC * C_c)
+    M[..., 1, 1] = -(1 / R_WC + 1 / R_CA) / C_c
+    M[..., 1, 2] = T_0 / (R_CA * C_c)
+    transitions = expm(M * run['dt'][None, :, None, None])
+
+    T = np.tile([T_0, T_0, 1.0], (n_sets, 1))
+    case_temp = np.empty((n_sets, n_steps + 1))
+    case_temp[:, 0] = T_0
+    for k in range(n_steps):
+        T = np.einsum('pij,pj->pi', transitions[:, k], T)
+        case_temp[:, k + 1] = T[:, 1]
+    return case_temp
+
+def residuals_and_jacobian(log_params:np.ndarray, runs:list, step:float = 1e-4):
+    """Residuals (simulated - measured case temperature) of every run & their forward-difference jacobian,
+    from one batched simulation of log_params and its perturbations."""
+    param_sets = np.vstack([log_params, log_params + step * np.eye(log_params.size)])
+    simulated = np.hstack([simulate_case_temperature(param_sets, run) - run['case_temp'] for run in runs])
+    return simulated[0], ((simulated[1:] - simulated[0]) / step).T
+
+def fit(runs:list, initial_params:dict = None) -> dict:
+    """Least-squares fit of [C_w, R_WC, C_c, R_CA] to the runs. Returns the params & RMS case temperature error."""
+    model = ThermalModel(params=initial_params or {})
+    log_params_0 = np.log([getattr(model, name) for name in IDENTIFIED_PARAMS])
+
+    cache = {}
+    def evaluate(log_params):
+        key = log_params.tobytes()
+        if key not in cache:
+            cache.clear()
+            cache[key] = residuals_and_jacobian(log_params, runs)
+        return cache[key]
+
+    result = least_squares(lambda x: evaluate(x)[0], log_params_0, jac=lambda x: evaluate(x)[1], method='trf')
+    params = dict(zip(IDENTIFIED_PARAMS, np.exp(result.x).tolist()))
+    params['rms_error_C'] = float(np.sqrt(np.mean(result.fun**2)))
+    return params
+
+def fit_file(filename:str) -> dict:
+    return fit(load_runs(filename))
+
+def identify(device_id, filenames:list) -> dict:
+    """Fits every log in parallel, then all logs jointly from the median per-log fit, and writes the device params file."""
+    with ProcessPoolExecutor() as executor:
+        per_file = list(executor.map(fit_file, filenames))
+    for filename, params in zip(filenames, per_file):
+        print("{}: {}".format(os.path.basename(filename), params))
+
+    initial_params = {name: float(np.median([params[name] for params in per_file])) for name in IDENTIFIED_PARAMS}
+    runs = [run for filename in filenames for run in load_runs(filename)]
+    params = fit(runs, initial_params)
+    print("joint fit: ", params)
+
+    print("saved to: ", save_thermal_params(device_id, {name: params[name] for name in IDENTIFIED_PARAMS}))
+    return params
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python thermal_param_identification.py <device id> <thermal_fulldata csv> [...]")
+        sys.exit(1)
+    identify(sys.argv[1], sys.argv[2:])
@@ -1,14 +1,19 @@
 # MAIN SCRIPT TO PERFORM TR CHARACTERIZATION 
 
 import csv
+import os
 import threading
 import numpy as np
-from time import time, sleep
+from time import sleep, perf_counter
 from flexsea.device import Device
 import sys
 sys.path.insert(0, '/home/pi/Exoboot-Controller-VAS/')
 from ExoClass import ExoObject
 import config
+from calibration_store import update_calibration
+from tr_fitting import StreamingPolyFit, fit_TR_curve, load_capture, lookup_tables
+
+thisdir = os.path.dirname(os.path.abspath(__file__))
 
 def get_active_ports():
     """To use the exos, it is necessary to define the ports they are going to be connected to. 
@@ -38,39 +43,59 @@ def get_active_ports():
     return side_1, device_1, side_2, device_2
 
 class TR_Characterizer:
-    def __init__(self, exo):
+    def __init__(self, exo, frequency:float = 250, print_period:float = 0.5, fit_method:str = 'huber', direction:str = 'both'):
+        """
+        Args:
+            exo: ExoObject to characterize
+            frequency: sampling frequency (Hz)
+            print_period: s between live fit printouts
+            fit_method, direction: final fit of the capture (see tr_fitting.fit_TR_curve)
+        """
         self.exo = exo
-        self.full_filename = "Transmission_Ratio_Characterization/default_TR_fulldata_{}.csv".format(self.exo.side)
-        self.coefs_filename = "Transmission_Ratio_Characterization/default_TR_coefs_{}.csv".format(self.exo.side)
+        self.full_filename = os.path.join(thisdir, "default_TR_fulldata_{}.csv".format(self.exo.side))
+        self.coefs_filename = os.path.join(thisdir, "default_TR_coefs_{}.csv".format(self.exo.side))
+        self.frequency = frequency
+        self.print_period = print_period
+        self.fit_method = fit_method
+        self.direction = direction
 
+        self.fit = StreamingPolyFit(degree=3)
+        self.checked_TR_coeffs = None   # TR fit at the previous convergence check
+        self.stable_checks = 0          # consecutive convergence checks the TR fit has stayed within tolerance
         self.thread = None
         self.kill = False
 
+    def status(self) -> str:
+        return "{}: {} samples, ankle {:.1f} to {:.1f} deg ({:.0f} deg covered), fit RMS error {:.2f} deg".format(
+            self.exo.side, self.fit.count, self.fit.min_angle, self.fit.max_angle, self.fit.coverage(), self.fit.rms_residual())
+
     def collect(self):
         """This function collects a curve of motor angle vs. ankle angle which is differentiated
         later to get a transmission ratio curve vs. ankle angle. The ankle joint should be moved through
         the full range of motion (starting at extreme dorsiflexion to extreme plantarflexion on repeat)
         while this is running.
+        
+        The cubic fit is accumulated sample by sample (StreamingPolyFit) & its residual/coverage printed live.
+        The capture is then refit with outlier rejection (fit_method) & the runtime lookup tables are stored.
         """
 
         print("Starting ankle transmission ratio procedure...\n")
-        
-        # conduct transmission ratio curve characterization procedure and store curve
-        self.motorAngleVec = np.array([])
-        self.ankleAngleVec = np.array([])
-        startTime = time()
+        print("Begin rotating the angle joint starting from extreme dorsiflexion to extreme plantarflexion...")
+        print("Press any key to stop characterization\n")
 
         pullCurrent = 1000  # magnitude only, not adjusted based on leg side yet
         desCurrent = pullCurrent * self.exo.exo_left_or_right_sideMultiplier
         
         iterations = 0
-        with open(self.full_filename, "w", newline="\n") as fd:
+        period = 1 / self.frequency
+        next_time = perf_counter()
+        next_print_time = next_time + self.print_period
+        with open(self.full_filename, "w", newline="\n", buffering=1 << 16) as fd:
             writer = csv.writer(fd)
             self.exo.device.command_motor_current(desCurrent)
             
             while not self.kill:
                 act_pack = self.exo.device.read()
-                # fxu.clear_terminal()
                 iterations += 1
 
                 # Ankle direction convention:   plantarflexion: increasing angle, dorsiflexion: decreasing angle
@@ -78,25 +103,33 @@ class TR_Characterizer:
                 current_mot_angle = self.exo.exo_left_or_right_sideMultiplier * act_pack['mot_ang'] * self.exo.ANK_ENC_CLICKS_TO_DEG # deg
 
                 act_current = act_pack['mot_cur']
-                currentTime = time()
+                self.fit.update(current_ank_angle, current_mot_angle)
+                writer.writerow([iterations, desCurrent, act_current, current_mot_angle, current_ank_angle])
 
-                self.motorAngleVec = np.append(self.motorAngleVec, current_mot_angle)
-                self.ankleAngleVec = np.append(self.ankleAngleVec, current_ank_angle)
+                now = perf_counter()
+                if now >= next_print_time:
+                    print(self.status())
+                    next_print_time = now + self.print_period
 
-                print("Begin rotating the angle joint starting from extreme dorsiflexion to extreme plantarflexion...\n")
-                print("Motor Angle: {} deg".format(current_mot_angle))
-                print("Ankle Angle: {} deg".format(current_ank_angle))
-                print("\nPress any key to stop characterization")
-                sleep(1/250)
+                next_time += period
+                sleep(max(next_time - perf_counter(), 0))
 
-                writer.writerow([iterations, desCurrent, act_current, current_mot_angle, current_ank_angle])
-
-        # fit a 3rd order polynomial to the ankle and motor angles
-        self.motor_angle_curve_coeffs = np.polyfit(self.ankleAngleVec, self.motorAngleVec, 3)
+        # Robust fit of the motor angle vs ankle angle curve (streaming least-squares cubic if there are too few samples)
+        self.exo.device.command_motor_current(0)
+        try:
+            self.curve_fit = fit_TR_curve(*load_capture(self.full_filename), method=self.fit_method, direction=self.direction)
+            self.motor_angle_curve_coeffs = self.curve_fit.motor_angle_curve_coeffs
+            print("{}: {} fit, RMS error {:.2f} deg, {:.1f} % inliers".format(
+                self.exo.side, self.fit_method, self.curve_fit.rms_residual, 100 * self.curve_fit.inlier_fraction))
+        except ValueError as e:
+            print("{}: {} fit failed ({}), using the least-squares cubic".format(self.exo.side, self.fit_method, e))
+            self.curve_fit = None
+            self.motor_angle_curve_coeffs = self.fit.coeffs()
         
         # polynomial deriv coefficients (derivative of the motor angle vs ankle angle curve yields the TR)
         self.TR_curve_coeffs = np.polyder(self.motor_angle_curve_coeffs)
 
+        print(self.status())
         print("Char curve")
         print(str(self.motor_angle_curve_coeffs))
         print("TR curve")
@@ -104,7 +137,6 @@ class TR_Characterizer:
         print(self.offset)
         
         print("Exiting curve characterization procedure")
-        self.exo.device.command_motor_current(0)
         sleep(0.5)
         
         with open(self.coefs_filename, "w") as file:
@@ -112,30 +144,124 @@ class TR_Characterizer:
             writer.writerow(self.motor_angle_curve_coeffs)
             writer.writerow(self.TR_curve_coeffs)
             writer.writerow([self.offset])
+        
+        if self.curve_fit is not None:
+            self.store_lookup_tables()
 
         print("Collect Finished\n")
         
-    def start(self):
+    def store_lookup_tables(self):
+        """Stores the lookup tables of the fitted curve (which may be a spline) in the exo's calibration store, 
+        keyed by the coefficients written to the coefs file so that ExoObject reuses them instead of rebuilding from the cubic."""
+        self.exo.TR_curve_coeffs = [float(x) for x in self.TR_curve_coeffs]
+        self.exo.motor_angle_curve_coeffs = [float(y) for y in self.motor_angle_curve_coeffs]
+        self.exo.max_dorsi_offset = float(self.offset)
+        
+        TR_table, motor_angle_table, current_per_torque_table = lookup_tables(
+            self.curve_fit, self.exo.ank_enc_sign, self.exo.max_dorsi_offset, self.exo.efficiency, self.exo.Kt)
+        self.exo.calibration = update_calibration(self.exo.device.id, **self.exo.TR_calibration_fields(), TR_table=TR_table, 
+                                                  motor_angle_table=motor_angle_table, current_per_torque_table=current_per_torque_table)
+
+    def converged(self, min_coverage:float, max_TR_change:float, min_samples:int, stable_checks:int) -> bool:
+        """Enough ankle range covered & the TR curve has stopped moving (by less than max_TR_change over the covered range)
+        for stable_checks consecutive checks. The RMS residual is not used: backlash outliers keep it high after the fit has settled."""
+        if self.fit.count < min_samples or self.fit.coverage() < min_coverage:
+            self.stable_checks = 0
+            return False
+        
+        TR_change = self.fit.TR_change(self.checked_TR_coeffs)
+        self.checked_TR_coeffs = self.fit.TR_coeffs()
+        self.stable_checks = self.stable_checks + 1 if TR_change <= max_TR_change else 0
+        return self.stable_checks >= stable_checks
+
+    def pull(self):
         pullCurrent = 1000  # magnitude only, not adjusted based on leg side yet
         desCurrent = pullCurrent * self.exo.exo_left_or_right_sideMultiplier
         self.exo.device.command_motor_current(desCurrent)
 
+    def lock_offset(self):
+        act_pack = self.exo.device.read()
+        self.offset = self.exo.ank_enc_sign * act_pack['ank_ang'] * self.exo.ANK_ENC_CLICKS_TO_DEG 
+        print(self.exo.side, self.offset)
+
+    def start_collecting(self):
+        self.thread = threading.Thread(target=self.collect, args=(), name='TR_' + self.exo.side)
+        self.thread.start()
+
+    def start(self):
+        self.pull()
+
         # self.exo.fxs.send_motor_command(self.exo.dev_id, fxe.FX_CURRENT, desCurrent)
         
         input("Set ankle angle to maximum dorsiflexion hardstop. Press any key to lock in angle/offset at this ankle position")
-        act_pack = self.exo.device.read()
-        self.offset = self.exo.ank_enc_sign * act_pack['ank_ang'] * self.exo.ANK_ENC_CLICKS_TO_DEG 
-        print(self.offset)
+        self.lock_offset()
 
         input("Press any key to continue")
-        self.thread = threading.Thread(target=self.collect, args=())
-        self.thread.start()
+        self.start_collecting()
 
     def stop(self):
         self.kill = True
         self.thread.join()
 
 
+class TR_CharacterizationRunner:
+    def __init__(self, characterizers:list, auto_stop:bool = False, min_coverage:float = 30, max_TR_change:float = 0.05, 
+                 min_samples:int = 2500, stable_checks:int = 4, poll_period:float = 0.5):
+        """Characterizes all exos at once (one collect thread per device, each with its own fit).
+        
+        Args:
+            characterizers: TR_Characterizers, one per exo
+            auto_stop: stop each exo once its fit has converged (see TR_Characterizer.converged) instead of waiting for the operator
+            min_coverage: ankle range (deg) that must be covered before auto stopping
+            max_TR_change: largest change of the TR curve between checks (over the covered range) counted as stable
+            min_samples: fewest samples accepted for auto stopping
+            stable_checks: consecutive stable checks required for auto stopping
+            poll_period: s between convergence checks
+        """
+        self.characterizers = characterizers
+        self.auto_stop = auto_stop
+        self.min_coverage = min_coverage
+        self.max_TR_change = max_TR_change
+        self.min_samples = min_samples
+        self.stable_checks = stable_checks
+        self.poll_period = poll_period
+        self.operator_stop = threading.Event()
+
+    def wait_for_operator(self):
+        input()
+        self.operator_stop.set()
+
+    def run(self):
+        for characterizer in self.characterizers:
+            characterizer.pull()
+
+        input("Set ALL ankles to maximum dorsiflexion hardstop. Press any key to lock in angles/offsets at these ankle positions")
+        for characterizer in self.characterizers:
+            characterizer.lock_offset()
+
+        input("Press any key to continue")
+        for characterizer in self.characterizers:
+            characterizer.start_collecting()
+
+        # input() blocks, so the operator's stop is awaited in a daemon thread while convergence is polled here
+        threading.Thread(target=self.wait_for_operator, daemon=True).start()
+        if self.auto_stop:
+            print("Collection stops automatically once {} deg are covered & the TR fit has changed by less than {} for {:.0f} s (or press any key)".format(
+                self.min_coverage, self.max_TR_change, self.stable_checks * self.poll_period))
+
+        running = list(self.characterizers)
+        while running and not self.operator_stop.wait(self.poll_period):
+            if not self.auto_stop:
+                continue
+            for characterizer in [c for c in running if c.converged(self.min_coverage, self.max_TR_change, self.min_samples, self.stable_checks)]:
+                print("{} exo converged".format(characterizer.exo.side))
+                characterizer.stop()
+                running.remove(characterizer)
+
+        for characterizer in running:
+            characterizer.stop()
+
+
 if __name__ == "__main__":
     # Recieve active ports that the exoskeletons are connected to
     # fxs = flex.FlexSEA()
@@ -159,14 +285,8 @@ if __name__ == "__main__":
         exo_right = ExoObject(side=side_1, device = device_1)
     
     # Collect the transmission ratio & motor-angle coefficients anytime the belts are replaced
-    print("Starting TR Characterization")
-    char_Left = TR_Characterizer(exo_left)
-    char_Left.start()
-    input() #"Press any key to stop TR characterization of LEFT exo"
-    char_Left.stop()
-
-    char_Right = TR_Characterizer(exo_right)
-    char_Right.start()
-    input() #"Press any key to stop TR characterization of RIGHT exo"
-    char_Right.stop()
+    print("Starting TR Characterization of BOTH exos")
+    auto_stop = input("Stop automatically once the fits converge? (y/n): ").strip().lower() == 'y'
+    runner = TR_CharacterizationRunner([TR_Characterizer(exo_left), TR_Characterizer(exo_right)], auto_stop=auto_stop)
+    runner.run()
     print("TR Characterization successful. Goodbye")
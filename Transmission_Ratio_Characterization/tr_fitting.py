@@ -0,0 +1,277 @@
+# Fitting of the motor angle vs ankle angle curve for TR characterization.
+#
+# StreamingPolyFit accumulates the normal equations of a polynomial least-squares fit one sample at a time (O(1) per
+# sample, no sample storage), so the fit, its residual & how much its TR curve still moves are available live while
+# the ankle is cycled.
+# Ankle angles are scaled to [-1, 1] over the expected range of motion to keep the normal equations well conditioned;
+# coefficients are returned in np.polyval order & units (deg).
+#
+# fit_TR_curve fits a whole capture at once (vectorized, a 60 s capture takes milliseconds) with outlier rejection:
+#   'lstsq'  : plain least-squares cubic
+#   'huber'  : cubic by iteratively reweighted least squares with Huber weights (down-weights backlash transients)
+#   'ransac' : cubic fit to the largest consensus set of a batch of random minimal fits
+#   'spline' : piecewise cubic least-squares spline (knots every few deg) through binned samples, refit after rejecting outliers
+# Samples can be restricted to plantarflexing or dorsiflexing motion (TR hysteresis between directions), and samples at 
+# direction reversals (where the belt backlash is) are dropped. lookup_tables() emits the count-indexed tables used at runtime.
+
+import os
+import sys
+from typing import Any, NamedTuple
+
+import numpy as np
+from numpy.polynomial import Polynomial
+from scipy.interpolate import make_lsq_spline
+
+thisdir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(thisdir))
+
+import transmission
+
+class StreamingPolyFit:
+    def __init__(self, degree:int = 3, angle_range:tuple = (-20, 60), bin_width:float = 1.0):
+        """
+        Args:
+            degree: polynomial degree of motor angle vs ankle angle
+            angle_range: expected ankle angle range (deg), used for scaling & coverage
+            bin_width: width of the ankle angle bins used to measure coverage (deg)
+        """
+        self.degree = degree
+        self.angle_range = angle_range
+        self.center = 0.5 * (angle_range[0] + angle_range[1])
+        self.half_width = 0.5 * (angle_range[1] - angle_range[0])
+
+        self.x_moments = np.zeros(2 * degree + 1)     # sum of x^k, k = 0..2*degree
+        self.xy_moments = np.zeros(degree + 1)        # sum of x^k * y, k = 0..degree
+        self.y_sq_sum = 0.0
+        self.count = 0
+        self.powers = np.arange(2 * degree + 1)
+
+        self.bin_width = bin_width
+        self.bin_counts = np.zeros(int(np.ceil((angle_range[1] - angle_range[0]) / bin_width)), dtype=int)
+        self.min_angle = np.inf
+        self.max_angle = -np.inf
+
+    def update(self, ankle_angle:float, motor_angle:float):
+        x = (ankle_angle - self.center) / self.half_width
+        x_powers = x ** self.powers
+        self.x_moments += x_powers
+        self.xy_moments += x_powers[:self.degree + 1] * motor_angle
+        self.y_sq_sum += motor_angle * motor_angle
+        self.count += 1
+
+        self.min_angle = min(self.min_angle, ankle_angle)
+        self.max_angle = max(self.max_angle, ankle_angle)
+        i = int((ankle_angle - self.angle_range[0]) // self.bin_width)
+        if 0 <= i < self.bin_counts.size:
+            self.bin_counts[i] += 1
+
+    def scaled_solution(self) -> np.ndarray:
+        """Least-squares coefficients in the scaled ankle angle, lowest order first."""
+        n = self.degree + 1
+        normal_matrix = self.x_moments[np.add.outer(np.arange(n), np.arange(n))]
+        return np.linalg.lstsq(normal_matrix, self.xy_moments, rcond=None)[0]
+
+    def coeffs(self) -> np.ndarray:
+        """Current fit of motor angle vs ankle angle (deg), highest order first (np.polyval order)."""
+        fit = Polynomial(self.scaled_solution(), domain=[self.angle_range[0], self.angle_range[1]], window=[-1, 1])
+        return fit.convert().coef[::-1]
+
+    def TR_coeffs(self) -> np.ndarray:
+        """Derivative of the fit (transmission ratio vs ankle angle), np.polyval order."""
+        return np.polyder(self.coeffs())
+
+    def rms_residual(self) -> float:
+        """RMS motor angle error of the current fit over all samples (deg)."""
+        if self.count <= self.degree:
+            return np.inf
+        beta = self.scaled_solution()
+        n = self.degree + 1
+        normal_matrix = self.x_moments[np.add.outer(np.arange(n), np.arange(n))]
+        rss = self.y_sq_sum - 2 * beta @ self.xy_moments + beta @ normal_matrix @ beta
+        return float(np.sqrt(max(rss, 0.0) / self.count))
+
+    def TR_change(self, previous_TR_coeffs, n_points:int = 50) -> float:
+        """Largest change of the TR curve over the ankle range seen so far since previous_TR_coeffs (np.polyval order).
+        Unlike the RMS residual, this settles even when backlash outliers keep the residual high."""
+        if previous_TR_coeffs is None or self.count <= self.degree:
+            return np.inf
+        ankle_angles = np.linspace(self.min_angle, self.max_angle, n_points)
+        return float(np.max(np.abs(np.polyval(self.TR_coeffs(), ankle_angles) - np.polyval(previous_TR_coeffs, ankle_angles))))
+
+    def coverage(self, min_samples_per_bin:int = 5) -> float:
+        """Ankle angle range (deg) covered with at least min_samples_per_bin samples per bin."""
+        return float(np.count_nonzero(self.bin_counts >= min_samples_per_bin) * self.bin_width)
+
+
+class TRCurveFit(NamedTuple):
+    method: str
+    motor_angle_curve: Any          # motor angle vs ankle angle (np.polyval coefficients or callable)
+    TR_curve: Any                   # TR vs ankle angle (np.polyval coefficients or callable)
+    motor_angle_curve_coeffs: np.ndarray    # cubic approximation of motor_angle_curve (for the coefs file)
+    rms_residual: float             # RMS motor angle error over the inliers (deg)
+    inlier_fraction: float          # fraction of the selected samples kept by the outlier rejection
+    angle_range: tuple              # ankle angle range of the fitted samples (deg)
+
+
+def load_capture(filename:str):
+    """(ankle angles, motor angles) in deg from a TR_Characterizer full data file."""
+    data = np.loadtxt(filename, delimiter=",", ndmin=2)
+    return data[:, 4], data[:, 3]
+
+def select_samples(ankle_angles:np.ndarray, direction:str = 'both', min_speed:float = 0.02, smoothing:int = 9) -> np.ndarray:
+    """Mask of the samples moving in the requested direction ('both', 'plantar' or 'dorsi') 
+    faster than min_speed (deg/sample), which drops the direction reversals."""
+    velocity = np.gradient(np.convolve(ankle_angles, np.ones(smoothing) / smoothing, mode='same'))
+    if direction == 'plantar':
+        return velocity > min_speed
+    if direction == 'dorsi':
+        return velocity < -min_speed
+    if direction == 'both':
+        return np.abs(velocity) > min_speed
+    raise ValueError("Unknown direction {}".format(direction))
+
+def robust_scale(residuals:np.ndarray) -> float:
+    """Normalized median absolute deviation (std of gaussian residuals)."""
+    return 1.4826 * np.median(np.abs(residuals - np.median(residuals)))
+
+def scaled_vander(ankle_angles:np.ndarray, angle_range:tuple, degree:int) -> np.ndarray:
+    center = 0.5 * (angle_range[0] + angle_range[1])
+    half_width = 0.5 * (angle_range[1] - angle_range[0])
+    return np.vander((ankle_angles - center) / half_width, degree + 1, increasing=True)
+
+def polyval_coeffs(scaled_solution:np.ndarray, angle_range:tuple) -> np.ndarray:
+    return Polynomial(scaled_solution, domain=list(angle_range), window=[-1, 1]).convert().coef[::-1]
+
+def huber_polyfit(vander:np.ndarray, motor_angles:np.ndarray, delta:float = 1.345, n_iter:int = 30, tol:float = 1e-8):
+    """Huber IRLS. Returns (scaled solution, weights)."""
+    weights = np.ones(motor_angles.size)
+    beta = np.linalg.lstsq(vander, motor_angles, rcond=None)[0]
+    for _ in range(n_iter):
+        residuals = motor_angles - vander @ beta
+        scale = robust_scale(residuals)
+        if scale == 0:
+            break
+        abs_residuals = np.abs(residuals)
+        weights = np.minimum(1, delta * scale / np.maximum(abs_residuals, 1e-12))
+        sqrt_weights = np.sqrt(weights)
+        new_beta = np.linalg.lstsq(vander * sqrt_weights[:, None], motor_angles * sqrt_weights, rcond=None)[0]
+        converged = np.max(np.abs(new_beta - beta)) <= tol * (1 + np.max(np.abs(beta)))
+        beta = new_beta
+        if converged:
+            break
+    return beta, weights
+
+def ransac_polyfit(vander:np.ndarray, motor_angles:np.ndarray, threshold:float = 2.0, n_trials:int = 256, seed:int = 0):
+    """All minimal fits are solved as one batch. Returns (scaled solution, inlier mask)."""
+    rng = np.random.default_rng(seed)
+    n_coeffs = vander.shape[1]
+    samples = rng.integers(motor_angles.size, size=(n_trials, n_coeffs))
+    trial_betas = (np.linalg.pinv(vander[samples]) @ motor_angles[samples][:, :, None])[:, :, 0]   # (n_trials, n_coeffs)
+
+    inlier_counts = (np.abs(motor_angles[:, None] - vander @ trial_betas.T) <= threshold).sum(axis=0)
+    best_beta = trial_betas[np.argmax(inlier_counts)]
+    inliers = np.abs(motor_angles - vander @ best_beta) <= threshold
+
+    beta = np.linalg.lstsq(vander[inliers], motor_angles[inliers], rcond=None)[0]
+    inliers = np.abs(motor_angles - vander @ beta) <= threshold
+    return beta, inliers
+
+def binned_means(ankle_angles:np.ndarray, motor_angles:np.ndarray, bin_width:float):
+    """Means of the samples in each occupied ankle angle bin: (ankle angle, motor angle, count)."""
+    bins = np.floor((ankle_angles - ankle_angles.min()) / bin_width).astype(int)
+    counts = np.bincount(bins)
+    occupied = counts > 0
+    counts = counts[occupied]
+    return np.bincount(bins, ankle_angles)[occupied] / counts, np.bincount(bins, motor_angles)[occupied] / counts, counts
+
+def lsq_spline_fit(ankle_angles:np.ndarray, motor_angles:np.ndarray, knot_spacing:float = 5.0, bin_width:float = 0.25, 
+                   rejection:float = 3.0):
+    """Cubic least-squares spline with interior knots every knot_spacing deg, fit to the binned means (weighted by counts)
+    & refit without samples beyond rejection * robust scale. Returns (spline, inlier mask)."""
+    lo, hi = ankle_angles.min(), ankle_angles.max()
+    interior_knots = np.linspace(lo, hi, max(int((hi - lo) // knot_spacing), 1) + 1)[1:-1]
+    knots = np.r_[[lo] * 4, interior_knots, [hi] * 4]
+
+    inliers = np.ones(motor_angles.size, dtype=bool)
+    for _ in range(2):
+        x, y, counts = binned_means(ankle_angles[inliers], motor_angles[inliers], bin_width)
+        spline = make_lsq_spline(x, y, knots, k=3, w=np.sqrt(counts))
+        residuals = motor_angles - spline(ankle_angles)
+        inliers = np.abs(residuals) <= rejection * max(robust_scale(residuals), 1e-9)
+    return spline, inliers
+
+def clamped_curves(spline, angle_range:tuple):
+    """Spline curves that don't extrapolate past the fitted range: TR is held at its edge values 
+    & the motor angle continues linearly with it."""
+    TR_spline = spline.derivative()
+    def TR_curve(ankle_angles):
+        return TR_spline(np.clip(ankle_angles, *angle_range))
+    def motor_angle_curve(ankle_angles):
+        clipped = np.clip(ankle_angles, *angle_range)
+        return spline(clipped) + TR_spline(clipped) * (ankle_angles - clipped)
+    return motor_angle_curve, TR_curve
+
+def fit_TR_curve(ankle_angles:np.ndarray, motor_angles:np.ndarray, method:str = 'huber', direction:str = 'both', 
+                 min_speed:float = 0.02, degree:int = 3, ransac_threshold:float = 2.0, knot_spacing:float = 5.0) -> TRCurveFit:
+    """
+    Args:
+        ankle_angles, motor_angles: TR characterization samples (deg)
+        method: 'lstsq', 'huber', 'ransac' or 'spline'
+        direction: fit only 'plantar' or 'dorsi' motion, or 'both'
+        min_speed: samples slower than this (deg/sample) are dropped (direction reversals), 0 keeps all
+        degree: polynomial degree of the polynomial methods
+        ransac_threshold: motor angle error (deg) of a RANSAC inlier
+        knot_spacing: spline knot spacing (deg)
+    """
+    ankle_angles = np.asarray(ankle_angles, dtype=float)
+    motor_angles = np.asarray(motor_angles, dtype=float)
+    if min_speed > 0 or direction != 'both':
+        selected = select_samples(ankle_angles, direction, min_speed)
+        ankle_angles, motor_angles = ankle_angles[selected], motor_angles[selected]
+    if motor_angles.size <= degree:
+        raise ValueError("Not enough samples to fit ({} selected)".format(motor_angles.size))
+
+    angle_range = (float(ankle_angles.min()), float(ankle_angles.max()))
+    vander = scaled_vander(ankle_angles, angle_range, degree)
+
+    if method == 'spline':
+        spline, inliers = lsq_spline_fit(ankle_angles, motor_angles, knot_spacing)
+        motor_angle_curve, TR_curve = clamped_curves(spline, angle_range)
+        beta = np.linalg.lstsq(vander[inliers], spline(ankle_angles[inliers]), rcond=None)[0]
+        fitted = spline(ankle_angles)
+    else:
+        if method == 'lstsq':
+            beta = np.linalg.lstsq(vander, motor_angles, rcond=None)[0]
+            inliers = np.ones(motor_angles.size, dtype=bool)
+        elif method == 'huber':
+            beta, weights = huber_polyfit(vander, motor_angles)
+            inliers = weights >= 1
+        elif method == 'ransac':
+            beta, inliers = ransac_polyfit(vander, motor_angles, ransac_threshold)
+        else:
+            raise ValueError("Unknown fitting method {}".format(method))
+        motor_angle_curve = polyval_coeffs(beta, angle_range)
+        TR_curve = np.polyder(motor_angle_curve)
+        fitted = vander @ beta
+
+    rms_residual = float(np.sqrt(np.mean((motor_angles[inliers] - fitted[inliers])**2)))
+    return TRCurveFit(method, motor_angle_curve, TR_curve, polyval_coeffs(beta, angle_range), rms_residual, 
+                      float(np.mean(inliers)), angle_range)
+
+def lookup_tables(fit:TRCurveFit, ank_enc_sign:int, max_dorsi_offset:float, efficiency:float, Kt:float):
+    """(TR_table, motor_angle_table, current_per_torque_table) indexed by raw ankle encoder count, as used by ExoObject."""
+    return transmission.build_lookup_tables(fit.TR_curve, fit.motor_angle_curve, ank_enc_sign, max_dorsi_offset, efficiency, Kt)
+
+
+if __name__ == "__main__":
+    # Compare the fitting methods on a full data file: python tr_fitting.py default_TR_fulldata_left.csv
+    from time import perf_counter
+
+    ankle_angles, motor_angles = load_capture(sys.argv[1])
+    print("{} samples, ankle {:.1f} to {:.1f} deg".format(ankle_angles.size, ankle_angles.min(), ankle_angles.max()))
+    for method in ('lstsq', 'huber', 'ransac', 'spline'):
+        for direction in ('both', 'plantar', 'dorsi'):
+            start_time = perf_counter()
+            fit = fit_TR_curve(ankle_angles, motor_angles, method, direction)
+            print("{:<7}{:<8} RMS error {:6.3f} deg, {:5.1f} % inliers, {:6.1f} ms".format(
+                method, direction, fit.rms_residual, 100 * fit.inlier_fraction, 1e3 * (perf_counter() - start_time)))
@@ -24,11 +24,14 @@ import traceback
 from flexsea.device import Device
 
 from ExoClass import ExoObject
+from command_mailbox import gui_commands
+from session_startup import SessionStartup
 from SoftRTloop import FlexibleTimer
 from utils import MovingAverageFilter
 
 import config
 import Gait_State_EstimatorThread
+import ThermalSupervisorThread
 
 def get_active_ports():
     """To use the exos, it is necessary to define the ports they are going to be connected to. 
@@ -84,20 +87,22 @@ def VAS_MAIN(side_1, device_1, side_2, device_2):
             exo_left = ExoObject(side=side_2, device = device_2)
             exo_right = ExoObject(side=side_1, device = device_1)
 
-        # Command bias current to spool the belts
-        input('Hit ANY KEY to allow belts to spool for BOTH exos')
-        exo_left.spool_belt()
-        exo_right.spool_belt()
+        # Spool the belts & determine Motor & Ankle Encoder Offsets on both exos at once
+        if not SessionStartup([exo_left, exo_right]).run().ok:
+            raise ExitMainLoopException("Session startup failed, exiting.")
         
-        # Determine Motor & Ankle Encoder Offsets. Zero the exos every time you start this code
-        input('Hit ANY KEY to START ZEROING procedure for BOTH exos')
-        exo_left.zeroProcedure()
-        exo_right.zeroProcedure()
-      
-        # Set timing parameters from config
-        input('Hit ANY KEY to send start ACTIVE commands to BOTH exos')
+        # Set timing parameters from config (before the forecast, which uses the session's torque profile)
         exo_left.set_spline_timing_params(config.spline_timing_params)
         exo_right.set_spline_timing_params(config.spline_timing_params)
+        
+        # Thermal headroom forecast at the highest torque setting
+        for exo in (exo_left, exo_right):
+            headroom = exo.thermal_headroom(config.max_Vickrey_torque, config.thermal_forecast_duration)
+            print("{} exo at {} Nm: soft limit in {:.0f} s, hard limit in {:.0f} s, max sustainable peak for {:.0f} s: {:.1f} Nm".format(
+                exo.side, config.max_Vickrey_torque, headroom['time_to_soft_limit'], headroom['time_to_hard_limit'], 
+                config.thermal_forecast_duration, headroom['max_peak_torque']))
+      
+        input('Hit ANY KEY to send start ACTIVE commands to BOTH exos')
     
         # Period Tracker
         period_tracker = MovingAverageFilter(initial_value=0, size=300)
@@ -182,7 +187,6 @@ if __name__ == '__main__':
         # fxs.set_gains(dev_id_2, config.DEFAULT_KP, config.DEFAULT_KI, config.DEFAULT_KD, 0, 0, config.DEFAULT_FF)  
 
         # Starting the threads
-        lock = threading.Lock()
         quit_event = threading.Event()
         quit_event.set()
 
@@ -190,10 +194,11 @@ if __name__ == '__main__':
             GUI = GUICommunicationThread.GUI_thread(quit_event=quit_event)    # Thread:2 -- GUI
             GUI.daemon = True
             GUI.start()
+            gui_commands.post_schedule(config.vas_torque_settings)    # prewarmed by the exos (a v3 GUI replaces it with its own schedule)
             print('GUI server started; run the GUI client on the Surface Tablet')
             input('Hit ANY KEY once the GUI client has been started')
         elif config.trial_type == 'Vickrey':
-            config.GUI_commanded_torque = config.max_Vickrey_torque    # Fixed Commanded Torque (Nm) for the Vickrey trial
+            gui_commands.post(config.max_Vickrey_torque)    # Fixed Commanded Torque (Nm) for the Vickrey trial
     
         # Thread:3 -- Gait State Estimator
         GSE = Gait_State_EstimatorThread.Gait_State_Estimator(side_1, device_1, side_2, device_2, quit_event=quit_event)
@@ -207,21 +212,23 @@ if __name__ == '__main__':
             Bertec.start()
             print('Bertec Streaming started')
 
+        # Thread:5 -- Thermal Supervision (torque scale & shutoff read by ExoObject.iterate)
+        Thermal = ThermalSupervisorThread.ThermalSupervisor(quit_event=quit_event, device_ids={side_1: device_1.id, side_2: device_2.id})
+        Thermal.daemon = True
+        Thermal.start()
+
         # Main VAS state machine
         VAS_MAIN(side_1, device_1, side_2, device_2)
 
-        # Joining the threads
+        # Joining the threads (clearing quit_event stops them; the GUI server gets a grace period)
+        quit_event.clear()
         if config.trial_type == 'VAS':
             GUI.join()
-            GSE.join()
-            lock.acquire()
-        elif config.trial_type == 'Vickrey':
-            GSE.join()
-            lock.acquire()
+        GSE.join()
+        Thermal.join()
    
         if config.bertec_fp_streaming:
             Bertec.join()
-            lock.acquire()
     
     except Exception as e:
         print("Exiting")
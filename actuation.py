@@ -0,0 +1,62 @@
+# Description:
+# Per-side torque -> motor current pipeline, bound once when the exo is constructed.
+#
+# Everything that does not change while walking (side, spool direction, TR & gain lookup tables,
+# bias & max current) is bound at construction, so one call maps (desired ankle torque, raw ankle encoder count)
+# to the vetted, signed current that is sent to the actpack. batch() does the same on arrays for offline use.
+
+import numpy as np
+
+import config
+from transmission import ANK_ENC_MASK
+
+class ActuationPipeline:
+    def __init__(self, side:str, side_multiplier:int, TR_table:np.ndarray, current_per_torque_table:np.ndarray,
+                 bias_current:int, max_current:int = config.MAX_ALLOWABLE_CURRENT):
+        """
+        Args:
+            side: 'left' or 'right'
+            side_multiplier: spool direction of the exo (sign of the commanded current)
+            TR_table: clamped transmission ratio per raw ankle encoder count
+            current_per_torque_table: mA per N-m of ankle torque per raw ankle encoder count
+            bias_current: minimum current, keeps the belt spooled (mA)
+            max_current: maximum allowable current (mA)
+        """
+        self.side = side
+        self.side_multiplier = side_multiplier
+        self.bias_current = bias_current
+        self.max_current = max_current
+        self.N_attr = 'N_' + side       # config attribute the instantaneous TR is logged to
+
+        self.TR_table = np.asarray(TR_table, dtype=float)
+        self.current_per_torque_table = np.asarray(current_per_torque_table, dtype=float)
+
+        # python lists index faster than numpy arrays for single elements
+        self.TR_lut = self.TR_table.tolist()
+        self.current_per_torque_lut = self.current_per_torque_table.tolist()
+
+    def log_TR(self, ank_enc_count:int) -> float:
+        """Logs & returns the instantaneous transmission ratio at this ankle encoder count."""
+        N = self.TR_lut[ank_enc_count & ANK_ENC_MASK]
+        setattr(config, self.N_attr, N)
+        return N
+
+    def torque_to_current(self, desired_torque:float, ank_enc_count:int) -> int:
+        """Unsigned, un-clamped motor current (mA) for the desired ankle torque (N-m)."""
+        index = ank_enc_count & ANK_ENC_MASK
+        setattr(config, self.N_attr, self.TR_lut[index])
+        return int(desired_torque * self.current_per_torque_lut[index])
+
+    def vet(self, current:float) -> int:
+        """Clamps the current between the bias & max allowable current and applies the spool direction."""
+        return self.side_multiplier * max(min(current, self.max_current), self.bias_current)
+
+    def __call__(self, desired_torque:float, ank_enc_count:int) -> int:
+        return self.vet(self.torque_to_current(desired_torque, ank_enc_count))
+
+    def batch(self, desired_torques, ank_enc_counts) -> np.ndarray:
+        """Vectorized __call__ for arrays of desired torques & raw ankle encoder counts (does not log N)."""
+        index = np.bitwise_and(np.asarray(ank_enc_counts, dtype=np.int64), ANK_ENC_MASK)
+        currents = np.trunc(np.asarray(desired_torques, dtype=float) * self.current_per_torque_table[index])
+        currents = np.maximum(np.minimum(currents, self.max_current), self.bias_current)
+        return (self.side_multiplier * currents).astype(int)
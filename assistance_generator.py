@@ -27,8 +27,9 @@ class AssistanceGenerator:
         self.t_toe_off = t_toe_off  # % stance from heel strike
         self.holding_torque = holding_torque_threshold
         self.bias_current = bias_current
-        self.prev_commanded_rising = -1
-        self.prev_commanded_falling = -1
+        self.stance_spline_key = None   # (peak, holding) of the current stance splines
+        self.stance_splines = {}        # {(peak, holding): (rising, falling)} generated so far (& prewarmed)
+        self.max_cached_splines = 64
         
         # Extract the biological ankle torque
         if config.in_torque_FSM_mode == False:
@@ -119,27 +120,14 @@ class AssistanceGenerator:
                     output_current = self.bias_current
                     
                 elif (time_in_current_stance > stance_t_onset) and (time_in_current_stance <= stance_t_peak):
-                    # Only regen spline object when torque is changed, otherwise just eval using same object
-                    if self.prev_commanded_rising != peak_current:
-                        currents = [self.bias_current, peak_current]
-                        t_nodes = [stance_t_onset, stance_t_peak]
-
-                        # Rising spline until peak time
-                        self.rising_spline = CubicSpline(t_nodes, currents,bc_type='clamped')  
-                        self.prev_commanded_rising = peak_current
-                    
-                    output_current = self.rising_spline(time_in_current_stance)
+                    # Rising spline until peak time (normalized time, only regenerated when the peak changes)
+                    self.update_stance_splines(peak_current, self.bias_current)
+                    output_current = self.rising_spline((time_in_current_stance - stance_t_onset) / (stance_t_peak - stance_t_onset))
 
                 elif (time_in_current_stance > stance_t_peak) and (time_in_current_stance <= stance_t_dropoff):
-                    if self.prev_commanded_falling != peak_current:
-                        currents = [peak_current, self.bias_current]
-                        t_nodes = [stance_t_peak, stance_t_dropoff]
-                        
-                        # Falling spline until offset time
-                        self.falling_spline = CubicSpline(t_nodes, currents,bc_type='clamped')
-                        self.prev_commanded_falling = peak_current
-                    
-                    output_current = self.falling_spline(time_in_current_stance)
+                    # Falling spline until offset time
+                    self.update_stance_splines(peak_current, self.bias_current)
+                    output_current = self.falling_spline((time_in_current_stance - stance_t_peak) / (stance_t_dropoff - stance_t_peak))
                 else:
                     # either less than 0% or greater than toe-off (including swing if misclassified)
                     output_current = self.bias_current
@@ -227,27 +215,14 @@ class AssistanceGenerator:
                 output_torque = self.holding_torque
                 
             elif (time_in_current_stance > stance_t_onset) and (time_in_current_stance <= stance_t_peak):
-                # Only regen spline object when torque is changed, otherwise just eval using same object
-                # if self.prev_commanded_rising != peak_torque:
-                torques = [self.holding_torque, float(peak_torque)]
-                t_nodes = [stance_t_onset, stance_t_peak]
-                    
-                # Rising spline until peak time
-                self.rising_spline = CubicSpline(t_nodes, torques,bc_type='clamped')   
-                # self.prev_commanded_rising = peak_torque
-                    
-                output_torque =  self.rising_spline(time_in_current_stance) 
+                # Rising spline until peak time (normalized time, only regenerated when the peak changes)
+                self.update_stance_splines(peak_torque, self.holding_torque)
+                output_torque = self.rising_spline((time_in_current_stance - stance_t_onset) / (stance_t_peak - stance_t_onset))
 
             elif (time_in_current_stance > stance_t_peak) and (time_in_current_stance <= stance_t_dropoff):
-                # if self.prev_commanded_falling != peak_torque:
-                torques = [float(peak_torque), self.holding_torque]
-                t_nodes = [stance_t_peak, stance_t_dropoff]
-                
                 # Falling spline until offset time
-                self.falling_spline = CubicSpline(t_nodes, torques,bc_type='clamped')
-                # self.prev_commanded_falling = peak_torque
-                
-                output_torque =  self.falling_spline(time_in_current_stance)      
+                self.update_stance_splines(peak_torque, self.holding_torque)
+                output_torque = self.falling_spline((time_in_current_stance - stance_t_peak) / (stance_t_dropoff - stance_t_peak))
                 
             else:
                 # either less than 0% or greater than toe-off (including swing if misclassified)
@@ -291,6 +266,61 @@ class AssistanceGenerator:
 
         return output_torque_clipped
     
+    def update_stance_splines(self, peak:float, holding:float):
+        """Rising (holding -> peak) & falling (peak -> holding) clamped splines over normalized time [0, 1].
+        A clamped 2-node spline only depends on its end values, so the stance timing is applied by normalizing the time
+        and the splines are only regenerated when the peak (latched once per stride) or holding value changes."""
+        key = (float(peak), float(holding))
+        if key != self.stance_spline_key:
+            self.rising_spline, self.falling_spline = self.stance_spline_pair(key)
+            self.stance_spline_key = key
+    
+    def stance_spline_pair(self, key:tuple)->tuple:
+        """Cached (rising, falling) splines of key = (peak, holding)"""
+        splines = self.stance_splines.get(key)
+        if splines is None:
+            if len(self.stance_splines) >= self.max_cached_splines:
+                self.stance_splines.clear()
+            peak, holding = key
+            splines = (CubicSpline([0, 1], [holding, peak], bc_type='clamped'),
+                       CubicSpline([0, 1], [peak, holding], bc_type='clamped'))
+            self.stance_splines[key] = splines
+        return splines
+    
+    def prewarm_stance_splines(self, peaks, holding:float):
+        """Generates the stance splines of every peak that can be commanded (e.g. the VAS presentation schedule), 
+        so that a new peak does not build them mid-stance"""
+        for peak in peaks:
+            self.stance_spline_pair((float(peak), float(holding)))
+    
+    def stride_spline_profile(self, peak:float, holding:float, stride_period:float=1.12, stance_period:float=0.65, n_samples:int=200)->tuple:
+        """Samples the stance spline (as generated by torque_generator_stance_MAIN / current_generator_stance_MAIN)
+        uniformly over one stride, from heel strike to the next heel strike. Used for thermal forecasting & simulation.
+        
+        args:
+            peak: peak torque (Nm) or current (mA)
+            holding: holding torque or bias current, held outside of the rise/fall
+            stride_period: average stride period
+            stance_period: average stance period
+            n_samples: samples over the stride
+            
+        returns:
+            times: time since HS of each sample
+            profile: spline value at each sample
+        """
+        stance_t_onset, stance_t_peak, stance_t_dropoff, _ = self.convert_percent_stride_thresholds_to_stance_times(stance_period)
+        peak = max(peak, holding)
+        
+        times = np.arange(n_samples) * stride_period / n_samples
+        profile = np.full(n_samples, float(holding))
+        
+        rising = (times > stance_t_onset) & (times <= stance_t_peak)
+        falling = (times > stance_t_peak) & (times <= stance_t_dropoff)
+        profile[rising] = CubicSpline([stance_t_onset, stance_t_peak], [holding, float(peak)], bc_type='clamped')(times[rising])
+        profile[falling] = CubicSpline([stance_t_peak, stance_t_dropoff], [float(peak), holding], bc_type='clamped')(times[falling])
+        
+        return times, np.maximum(profile, holding)
+    
     def convert_percent_stride_thresholds_to_stance_times(self, stance_period:float)->list:
             """Converts 4ptSpline thresholds from units of % stride to seconds within the current stance phase
             using the average stance period
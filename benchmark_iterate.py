@@ -0,0 +1,80 @@
+# Description:
+# Benchmark harness for the control step. Runs ExoObject.iterate() for both sides against a fake actpack
+# (no hardware, no threads) with a synthetic TR calibration & gait, and reports the time per call in µs.
+#
+# Usage: python benchmark_iterate.py [iterations]
+#
+# Reference (x86 dev machine, 20000 iterations): ~3-4 µs median and ~7-10 µs mean per call, the mean being
+# pulled up by scheduler/GC outliers (p99 ~30-45 µs). Numbers vary from run to run; re-measure on the Pi.
+
+import sys
+import tempfile
+from time import perf_counter_ns, time
+
+import numpy as np
+
+import calibration_store
+import config
+from ExoClass import ExoObject
+from command_mailbox import gui_commands
+
+# synthetic calibration: motor angle vs ankle angle (deg) & its derivative (TR)
+SYNTHETIC_MOTOR_ANGLE_COEFFS = [-0.0004, 0.02, 14.0, 0.0]
+SYNTHETIC_TR_COEFFS = np.polyder(SYNTHETIC_MOTOR_ANGLE_COEFFS).tolist()
+
+class FakeDevice:
+    def __init__(self, id):
+        self.id = id
+        self.commanded_current = 0
+
+    def command_motor_current(self, current):
+        self.commanded_current = current
+
+def make_exo(side:str) -> ExoObject:
+    exo = ExoObject(side=side, device=FakeDevice(side))
+    exo.TR_curve_coeffs = SYNTHETIC_TR_COEFFS
+    exo.motor_angle_curve_coeffs = SYNTHETIC_MOTOR_ANGLE_COEFFS
+    exo.max_dorsi_offset = 0.0
+    exo.build_TR_lookup_tables()
+    return exo
+
+def run(exo:ExoObject, iterations:int, stride_period:float = 1.2, samples_per_stride:int = 500) -> np.ndarray:
+    """Returns the duration of every iterate() call in µs."""
+    side = exo.side
+    setattr(config, 'stride_period_bertec_' + side, stride_period)
+    setattr(config, 'stance_time_' + side, 0.6 * stride_period)
+    setattr(config, 'in_swing_bertec_' + side, False)
+    counts = np.random.default_rng(0).integers(4000, 6000, iterations).tolist()
+
+    durations = np.empty(iterations)
+    for i in range(iterations):
+        # sweep the gait cycle so every spline segment is exercised
+        phase = (i % samples_per_stride) / samples_per_stride
+        if phase == 0:
+            setattr(config, 'heel_strike_count_' + side, getattr(config, 'heel_strike_count_' + side) + 1)
+        setattr(config, 'heel_strike_time_' + side, time() - phase * stride_period)
+        setattr(config, 'ankle_enc_count_' + side, counts[i])
+
+        start = perf_counter_ns()
+        exo.iterate()
+        durations[i] = (perf_counter_ns() - start) / 1000
+
+    return durations
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    gui_commands.post(20)
+
+    # the fake devices' calibrations are written to a throwaway directory, not to Calibrations/
+    calibration_dir = tempfile.TemporaryDirectory()
+    calibration_store.CALIBRATION_DIR = calibration_dir.name
+    exos = [make_exo(side) for side in ("left", "right")]
+
+    print("{:<8}{:<10}{:>10}{:>10}{:>10}".format("side", "mode", "mean", "median", "p99"))
+    for torque_mode in (True, False):
+        config.in_torque_FSM_mode = torque_mode
+        for exo in exos:
+            durations = run(exo, iterations)
+            print("{:<8}{:<10}{:>10.1f}{:>10.1f}{:>10.1f}".format(exo.side, "torque" if torque_mode else "current",
+                  durations.mean(), np.median(durations), np.percentile(durations, 99)))
+    print("(µs per iterate())")
@@ -0,0 +1,90 @@
+# Description:
+# Calibration store keyed by device ID (see LEFT_EXO_DEV_IDS / RIGHT_EXO_DEV_IDS in config).
+#
+# Everything calibrated for a device (TR curve coefficients & the count-indexed lookup tables built from them,
+# zero offsets, thermal model parameters) is kept in one binary file per device (numpy .npz),
+# stamped with a format version, a save time and a sha256 of its contents. Loading the file at startup
+# skips rebuilding the lookup tables, and recent zero offsets can be reused instead of re-zeroing.
+
+import hashlib
+import os
+import time
+
+import numpy as np
+
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Calibrations")
+CALIBRATION_VERSION = 1
+METADATA = ("version", "saved_time", "content_hash")
+
+def calibration_path(device_id) -> str:
+    return os.path.join(CALIBRATION_DIR, "calibration_{}.npz".format(device_id))
+
+def content_hash(fields:dict) -> str:
+    """sha256 over the field names, dtypes, shapes & values (metadata excluded)."""
+    digest = hashlib.sha256()
+    for name in sorted(fields):
+        if name in METADATA:
+            continue
+        value = np.ascontiguousarray(fields[name])
+        digest.update(name.encode())
+        digest.update(str(value.dtype).encode())
+        digest.update(str(value.shape).encode())
+        digest.update(value.tobytes())
+    return digest.hexdigest()
+
+def load_calibration(device_id) -> dict:
+    """Returns the stored calibration of the device ({} if none, from an older format, or corrupted)."""
+    path = calibration_path(device_id)
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            fields = {name: data[name] for name in data.files}
+    except (OSError, ValueError) as e:
+        print("Could not read calibration {}: {}".format(path, e))
+        return {}
+
+    if int(fields.get("version", -1)) != CALIBRATION_VERSION:
+        print("Ignoring calibration {} (format version {})".format(path, fields.get("version")))
+        return {}
+    if str(fields.get("content_hash")) != content_hash(fields):
+        print("Ignoring calibration {} (content hash mismatch)".format(path))
+        return {}
+    return fields
+
+def save_calibration(device_id, fields:dict) -> dict:
+    """Writes the calibration (atomically) with version, save time & content hash. Returns the stored fields."""
+    fields = {name: np.asarray(value) for name, value in fields.items() if name not in METADATA}
+    fields["version"] = np.asarray(CALIBRATION_VERSION)
+    fields["saved_time"] = np.asarray(time.time())
+    fields["content_hash"] = np.asarray(content_hash(fields))
+
+    os.makedirs(CALIBRATION_DIR, exist_ok=True)
+    path = calibration_path(device_id)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **fields)
+    os.replace(tmp_path, path)
+    return fields
+
+def update_calibration(device_id, **fields) -> dict:
+    """Merges fields into the stored calibration of the device and saves it."""
+    calibration = load_calibration(device_id)
+    calibration.update(fields)
+    return save_calibration(device_id, calibration)
+
+def thermal_params_from(calibration:dict) -> dict:
+    if "thermal_param_names" not in calibration:
+        return {}
+    return {str(name): float(value) for name, value in zip(calibration["thermal_param_names"], calibration["thermal_param_values"])}
+
+def thermal_params_fields(params:dict) -> dict:
+    return {"thermal_param_names": np.array(list(params), dtype=str), "thermal_param_values": np.array(list(params.values()), dtype=float)}
+
+def recent_zero_offsets(calibration:dict, max_age:float):
+    """(motor angle offset, ankle angle offset) if zeroed less than max_age seconds ago, else None."""
+    if max_age <= 0 or "zero_time" not in calibration:
+        return None
+    if time.time() - float(calibration["zero_time"]) > max_age:
+        return None
+    return float(calibration["motor_angle_offset"]), float(calibration["ankle_angle_offset"])
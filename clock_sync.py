@@ -0,0 +1,49 @@
+# Description:
+# Online clock-offset estimator between the Vicon/Bertec publisher (Vicon PC) and the Pi.
+#
+# The publisher stamps each force-plate sample with its own clock, in the same 'fz_stamped' message as the forces.
+# Every time the Pi receives one of those stamps it observes   local_recv_time - remote_time = clock_offset + link_delay.
+# As in NTP's clock filter, the sample with the smallest observed delay in a sliding window is the one
+# least corrupted by network/SDK queueing, so the window minimum is used as the offset measurement.
+# That measurement is then low-pass filtered so that a single lucky/unlucky packet does not move the estimate.
+#
+# Note: with one-way stamps only, the constant floor of the link delay cannot be separated from the clock
+# offset and is absorbed into it. What is removed is the variable latency above that floor, which is the
+# part that shifts heel strikes late by different amounts from step to step.
+
+from collections import deque
+
+class ClockSync:
+    def __init__(self, window_size:int = 200, gain:float = 0.05):
+        """
+        Args:
+            window_size: number of recent stamps the minimum-delay filter looks over
+            gain: first-order filter gain applied to the windowed offset (0 < gain <= 1)
+        """
+        self.window = deque(maxlen=window_size)
+        self.gain = gain
+
+        self.offset = None      # estimated (Pi clock - publisher clock) in seconds
+        self.latency = 0.0      # latency of the most recent stamp above the estimated offset (s)
+
+    def is_synced(self):
+        return self.offset is not None
+
+    def update(self, remote_time:float, local_time:float) -> float:
+        """Feed one (publisher stamp, Pi receive time) pair and return the filtered offset."""
+        self.window.append(local_time - remote_time)
+        windowed_offset = min(self.window)
+
+        if self.offset is None:
+            self.offset = windowed_offset
+        else:
+            self.offset += self.gain * (windowed_offset - self.offset)
+
+        self.latency = max(local_time - self.to_local(remote_time), 0.0)
+        return self.offset
+
+    def to_local(self, remote_time:float) -> float:
+        """Maps a publisher timestamp onto the Pi clock."""
+        if self.offset is None:
+            return remote_time
+        return remote_time + self.offset
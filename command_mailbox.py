@@ -0,0 +1,67 @@
+# Description:
+# Versioned mailbox for the commands sent by the GUI (VAS) or set by the trial scripts (Vickrey, Acclimation).
+#
+# A command is an immutable GuiCommand, replaced as a whole under a lock by post() and stamped with its receive time,
+# so the control loop never sees half of one message and half of the next. latest() is a single reference read.
+# The fields are mirrored to config (GUI_commanded_torque, adjusted_slider_*, confirm_btn_pressed) for logging.
+# ExoObject latches the peak torque of the latest command at the next heel strike (stride boundary).
+# The GUI also posts its presentation schedule (every peak torque it can command) once, up front; ExoObject prewarms
+# its stance spline cache for those torques at the next stride boundary.
+
+import threading
+import time
+from typing import NamedTuple
+
+import config
+
+class GuiCommand(NamedTuple):
+    version: int                    # increases by 1 per posted command
+    peak_torque: float              # Nm
+    slider_btn: str
+    slider_value: float             # $
+    confirm_btn_pressed: str
+    received_time: float            # s (time.time())
+    torque_changed_time: float      # s, when peak_torque last changed value
+
+
+class CommandMailbox:
+    def __init__(self):
+        self.lock = threading.Lock()
+        now = time.time()
+        self.command = GuiCommand(0, config.GUI_commanded_torque, config.adjusted_slider_btn, config.adjusted_slider_value,
+                                  config.confirm_btn_pressed, now, now)
+        self.schedule = ()              # peak torques (Nm) of the presentation schedule
+        self.schedule_version = 0
+
+    def post(self, peak_torque:float = None, slider_btn:str = 'nan', slider_value:float = float('nan'),
+             confirm_btn_pressed:str = 'False') -> GuiCommand:
+        """Replaces the command; peak_torque None keeps the current peak torque."""
+        with self.lock:
+            previous = self.command
+            now = time.time()
+            if peak_torque is None or float(peak_torque) == previous.peak_torque:
+                peak_torque, torque_changed_time = previous.peak_torque, previous.torque_changed_time
+            else:
+                peak_torque, torque_changed_time = float(peak_torque), now
+
+            self.command = GuiCommand(previous.version + 1, peak_torque, str(slider_btn), float(slider_value),
+                                      str(confirm_btn_pressed), now, torque_changed_time)
+
+            config.GUI_commanded_torque = self.command.peak_torque
+            config.adjusted_slider_btn = self.command.slider_btn
+            config.adjusted_slider_value = self.command.slider_value
+            config.confirm_btn_pressed = self.command.confirm_btn_pressed
+            return self.command
+
+    def post_schedule(self, peak_torques) -> tuple:
+        """Replaces the peak torques the GUI can command"""
+        with self.lock:
+            self.schedule = tuple(sorted(set(float(torque) for torque in peak_torques)))
+            self.schedule_version += 1
+            return self.schedule
+
+    def latest(self) -> GuiCommand:
+        return self.command
+
+
+gui_commands = CommandMailbox()
@@ -7,6 +7,8 @@ server_ip = f"{'35.3.134.250'}:" f"{'50051'}"   # IP address of the Controller (
 # client_ip = f"{'0.0.0.0'}:" f"{'50051'}"         # IP address of Tablet (or my laptop if debugging) running the GUI
 rtplot_ip = '35.3.80.31'    # ip address of server for real time ploting (monitor)
 Vicon_ip_address='141.212.77.30'    # Vicon ip to connect to Bertec Forceplates for streaming
+rtplot_channels = ['ankle_angle_left', 'desired_torque_left', 'back_calcd_torque_left', 'left_swing_flag', 'accel_y_left']  # log channel names (telemetry_channels.py), can be changed while running
+telemetry_shm_name: str = None    # if set, the GSE thread also publishes its latest logged row in this shared memory block (layout: gse_channels.dtype)
 ##############################################################  
 
 # setting trial naming (components compiled into a full filename in GSE Thread)
@@ -19,11 +21,18 @@ GUI_commanded_torque: float = 0.0   # Current Torque Experienced (Nm)
 adjusted_slider_btn: str = 'nan'    # Adjusted Slider Btn
 adjusted_slider_value: float = 0.0  # Adjusted Slider Value($)
 confirm_btn_pressed: str = 'False'  # Confirm Button Pressed?
+gui_status_frequency: float = 10    # Hz, controller status streamed back to v3 GUI clients
+gui_server_max_workers: int = 3     # gRPC server threads (& max concurrent RPCs) for the single GUI client
+gui_server_grace_period: float = 1.0    # s given to in-flight GUI RPCs when stopping the server
 max_Vickrey_torque : float = 40.0   # Nm
+vas_torque_settings: list = [round(40.0*i/12, 3) for i in range(1, 13)]   # Nm, the VAS GUI's torque buttons (GUIs/vas_GUI/config.py), prewarmed at start (v2 GUIs can't send their schedule)
 
 # TOGGLES:
 in_torque_FSM_mode: bool = True       # Toggle for 4pt FSM-based Torque Control or biomimetic Torque Control
 bertec_fp_streaming: bool = True      # Toggle for Bertec Forceplate Streaming or IMU-based Gait State Estimation
+imu_phase_scheduling: bool = True     # Without Bertec: schedule torque on the IMU adaptive-oscillator gait phase
+startup_prompts: bool = True          # Wait for the operator before spooling & zeroing (both exos are done concurrently)
+zero_offsets_max_age: float = 0       # s, reuse stored zero offsets younger than this instead of re-zeroing (0: always re-zero)
 
 ## ~ Timing Parameters for the 4-Point Spline ~ ##
 
@@ -82,6 +91,22 @@ GYRO_GAIN = 1 / 32.75  # LSB -> deg/s
 Kt = 0.000146 #mA/Nm
 efficiency = 0.9    # 90% efficiency for belt drive
 
+# Thermal Supervision (ThermalSupervisorThread)
+THERMAL_SUPERVISOR_FREQUENCY = 20   # Hz
+MAX_CASE_TEMPERATURE = 80           # °C, hard limit (shut off)
+MAX_WINDING_TEMPERATURE = 115       # °C, hard limit (shut off)
+thermal_forecast_duration = 10*60   # s, checked at max_Vickrey_torque before sending ACTIVE commands
+thermal_torque_scale_left: float = 1.0    # read by the control loop, scales the peak command
+thermal_torque_scale_right: float = 1.0
+thermal_shutoff_left: bool = False
+thermal_shutoff_right: bool = False
+winding_temperature_left: float = 21.0    # modelled
+winding_temperature_right: float = 21.0
+motor_current_sq_total_left: float = 0.0  # running sum of squared motor current samples (mA^2), written by the GSE thread
+motor_current_sq_total_right: float = 0.0
+motor_current_samples_left: int = 0
+motor_current_samples_right: int = 0
+
 # Bertec Parameters
 HS_THRESHOLD = 80
 TO_THRESHOLD = 30
@@ -92,6 +117,8 @@ temperature_left: float = 0.0
 
 ankle_angle_left: float = 0.0
 ankle_angle_right: float = 0.0
+ankle_enc_count_left: int = 0
+ankle_enc_count_right: int = 0
 
 ankle_velocity_left: float = 0.0
 ankle_velocity_right: float = 0.0
@@ -139,6 +166,12 @@ stride_time_left: float = 1.0
 time_in_current_stride_right: float = 0.0
 time_in_current_stride_left: float = 0.0
 
+# IMU continuous gait phase (0 at heel strike -> 1 at next heel strike) and phase rate (strides/s)
+gait_phase_left: float = 0.0
+gait_phase_right: float = 0.0
+gait_phase_rate_left: float = 1.0
+gait_phase_rate_right: float = 1.0
+
 # IMU Swing Variables
 in_swing_start_left: bool = False
 in_swing_start_right: bool = False
@@ -179,6 +212,24 @@ swing_val_bertec_right = 0
 stride_period_bertec_left = 0
 stride_period_bertec_right = 0
 
+# Heel strike timestamps (Pi clock, s) published by the Bertec thread; None until the first heel strike.
+# The controller computes the time since heel strike from these at command time (time_since_heel_strike_*, logged
+# next to the Bertec thread's time_in_current_stance_*, which is held through swing).
+heel_strike_time_left: float = None
+heel_strike_time_right: float = None
+heel_strike_count_left: int = 0         # bumped once per detected heel strike (stride boundary)
+heel_strike_count_right: int = 0
+time_since_heel_strike_left: float = float('nan')
+time_since_heel_strike_right: float = float('nan')
+
+# Look-ahead added to time in stance when commanding (s). Set to the measured actuation latency
+# (command -> delivered torque) so the spline is evaluated where the ankle will be when torque lands.
+actuation_lookahead: float = 0.0
+
+# Vicon PC -> Pi clock sync (s)
+bertec_clock_offset: float = 0.0    # Pi clock - publisher clock
+bertec_latency: float = 0.0         # link + SDK latency backed out of HS/TO times
+
 time_in_current_stance_left = 0
 time_in_current_stance_right = 0
 
@@ -187,6 +238,9 @@ vas_main_frequency: float = 400
 gui_communication_thread_frequency: float = 0
 gse_thread_frequency: float = 0
 bertec_thread_frequency: float = 0
+thermal_supervisor_frequency: float = 0
+gui_handler_latency: float = 0      # s, mean over the last second
+gui_handler_latency_max: float = 0  # s, max over the last second
 vas_main_period: float = 0
 gui_communication_thread_period: float = 0
 gse_thread_period: float = 0
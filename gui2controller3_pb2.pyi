@@ -0,0 +1,86 @@
+from google.protobuf.internal import containers as _containers
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import message as _message
+from typing import ClassVar as _ClassVar, Iterable as _Iterable, Mapping as _Mapping, Optional as _Optional, Union as _Union
+
+DESCRIPTOR: _descriptor.FileDescriptor
+
+class TorqueSelection(_message.Message):
+    __slots__ = ("button", "peak_torque")
+    BUTTON_FIELD_NUMBER: _ClassVar[int]
+    PEAK_TORQUE_FIELD_NUMBER: _ClassVar[int]
+    button: str
+    peak_torque: float
+    def __init__(self, button: _Optional[str] = ..., peak_torque: _Optional[float] = ...) -> None: ...
+
+class SliderUpdate(_message.Message):
+    __slots__ = ("button", "value")
+    BUTTON_FIELD_NUMBER: _ClassVar[int]
+    VALUE_FIELD_NUMBER: _ClassVar[int]
+    button: str
+    value: float
+    def __init__(self, button: _Optional[str] = ..., value: _Optional[float] = ...) -> None: ...
+
+class Confirm(_message.Message):
+    __slots__ = ()
+    def __init__(self) -> None: ...
+
+class ScheduledTorque(_message.Message):
+    __slots__ = ("trial", "presentation", "button", "peak_torque")
+    TRIAL_FIELD_NUMBER: _ClassVar[int]
+    PRESENTATION_FIELD_NUMBER: _ClassVar[int]
+    BUTTON_FIELD_NUMBER: _ClassVar[int]
+    PEAK_TORQUE_FIELD_NUMBER: _ClassVar[int]
+    trial: int
+    presentation: int
+    button: str
+    peak_torque: float
+    def __init__(self, trial: _Optional[int] = ..., presentation: _Optional[int] = ..., button: _Optional[str] = ..., peak_torque: _Optional[float] = ...) -> None: ...
+
+class PresentationSchedule(_message.Message):
+    __slots__ = ("entries",)
+    ENTRIES_FIELD_NUMBER: _ClassVar[int]
+    entries: _containers.RepeatedCompositeFieldContainer[ScheduledTorque]
+    def __init__(self, entries: _Optional[_Iterable[_Union[ScheduledTorque, _Mapping]]] = ...) -> None: ...
+
+class GuiEvent(_message.Message):
+    __slots__ = ("sequence", "torque_selection", "slider_update", "confirm", "presentation_schedule")
+    SEQUENCE_FIELD_NUMBER: _ClassVar[int]
+    TORQUE_SELECTION_FIELD_NUMBER: _ClassVar[int]
+    SLIDER_UPDATE_FIELD_NUMBER: _ClassVar[int]
+    CONFIRM_FIELD_NUMBER: _ClassVar[int]
+    PRESENTATION_SCHEDULE_FIELD_NUMBER: _ClassVar[int]
+    sequence: int
+    torque_selection: TorqueSelection
+    slider_update: SliderUpdate
+    confirm: Confirm
+    presentation_schedule: PresentationSchedule
+    def __init__(self, sequence: _Optional[int] = ..., torque_selection: _Optional[_Union[TorqueSelection, _Mapping]] = ..., slider_update: _Optional[_Union[SliderUpdate, _Mapping]] = ..., confirm: _Optional[_Union[Confirm, _Mapping]] = ..., presentation_schedule: _Optional[_Union[PresentationSchedule, _Mapping]] = ...) -> None: ...
+
+class ControllerStatus(_message.Message):
+    __slots__ = ("acknowledged_sequence", "commanded_torque", "delivered_torque_left", "delivered_torque_right", "vas_main_frequency", "gse_thread_frequency", "thermal_torque_scale_left", "thermal_torque_scale_right", "winding_temperature_left", "winding_temperature_right", "stride_count_left", "stride_count_right")
+    ACKNOWLEDGED_SEQUENCE_FIELD_NUMBER: _ClassVar[int]
+    COMMANDED_TORQUE_FIELD_NUMBER: _ClassVar[int]
+    DELIVERED_TORQUE_LEFT_FIELD_NUMBER: _ClassVar[int]
+    DELIVERED_TORQUE_RIGHT_FIELD_NUMBER: _ClassVar[int]
+    VAS_MAIN_FREQUENCY_FIELD_NUMBER: _ClassVar[int]
+    GSE_THREAD_FREQUENCY_FIELD_NUMBER: _ClassVar[int]
+    THERMAL_TORQUE_SCALE_LEFT_FIELD_NUMBER: _ClassVar[int]
+    THERMAL_TORQUE_SCALE_RIGHT_FIELD_NUMBER: _ClassVar[int]
+    WINDING_TEMPERATURE_LEFT_FIELD_NUMBER: _ClassVar[int]
+    WINDING_TEMPERATURE_RIGHT_FIELD_NUMBER: _ClassVar[int]
+    STRIDE_COUNT_LEFT_FIELD_NUMBER: _ClassVar[int]
+    STRIDE_COUNT_RIGHT_FIELD_NUMBER: _ClassVar[int]
+    acknowledged_sequence: int
+    commanded_torque: float
+    delivered_torque_left: float
+    delivered_torque_right: float
+    vas_main_frequency: float
+    gse_thread_frequency: float
+    thermal_torque_scale_left: float
+    thermal_torque_scale_right: float
+    winding_temperature_left: float
+    winding_temperature_right: float
+    stride_count_left: int
+    stride_count_right: int
+    def __init__(self, acknowledged_sequence: _Optional[int] = ..., commanded_torque: _Optional[float] = ..., delivered_torque_left: _Optional[float] = ..., delivered_torque_right: _Optional[float] = ..., vas_main_frequency: _Optional[float] = ..., gse_thread_frequency: _Optional[float] = ..., thermal_torque_scale_left: _Optional[float] = ..., thermal_torque_scale_right: _Optional[float] = ..., winding_temperature_left: _Optional[float] = ..., winding_temperature_right: _Optional[float] = ..., stride_count_left: _Optional[int] = ..., stride_count_right: _Optional[int] = ...) -> None: ...
@@ -0,0 +1,84 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+
+import gui2controller3_pb2 as gui2controller3__pb2
+
+
+class CommunicationServiceV3Stub(object):
+    """This service is between
+    Client: GUI, streaming typed GUI events (presentation schedule, torque selection, slider update, confirm) over one long-lived stream
+    Server: RPI, streaming the controller status back to the GUI while the stream is open
+
+    The v2 CommunicationService (gui2controller2.proto) is still served for GUIs that use it.
+
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Session = channel.stream_stream(
+                '/CommunicationServiceV3/Session',
+                request_serializer=gui2controller3__pb2.GuiEvent.SerializeToString,
+                response_deserializer=gui2controller3__pb2.ControllerStatus.FromString,
+                )
+
+
+class CommunicationServiceV3Servicer(object):
+    """This service is between
+    Client: GUI, streaming typed GUI events (presentation schedule, torque selection, slider update, confirm) over one long-lived stream
+    Server: RPI, streaming the controller status back to the GUI while the stream is open
+
+    The v2 CommunicationService (gui2controller2.proto) is still served for GUIs that use it.
+
+    """
+
+    def Session(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_CommunicationServiceV3Servicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Session': grpc.stream_stream_rpc_method_handler(
+                    servicer.Session,
+                    request_deserializer=gui2controller3__pb2.GuiEvent.FromString,
+                    response_serializer=gui2controller3__pb2.ControllerStatus.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'CommunicationServiceV3', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+ # This class is part of an EXPERIMENTAL API.
+class CommunicationServiceV3(object):
+    """This service is between
+    Client: GUI, streaming typed GUI events (presentation schedule, torque selection, slider update, confirm) over one long-lived stream
+    Server: RPI, streaming the controller status back to the GUI while the stream is open
+
+    The v2 CommunicationService (gui2controller2.proto) is still served for GUIs that use it.
+
+    """
+
+    @staticmethod
+    def Session(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/CommunicationServiceV3/Session',
+            gui2controller3__pb2.GuiEvent.SerializeToString,
+            gui2controller3__pb2.ControllerStatus.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
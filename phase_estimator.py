@@ -0,0 +1,122 @@
+# Description:
+# Continuous gait-phase estimation from the actpack IMU & ankle encoder using an adaptive oscillator.
+#
+# An adaptive frequency oscillator (Righetti et al. 2006, Ronsse et al. 2011) locks onto the periodic part of
+# a gait signal: a pool of harmonics  x_hat = a0 + sum_k a_k sin(k*phi)  is fit online while the phase phi and
+# the frequency omega are pulled towards the signal by the fitting error. Every update is a handful of scalar
+# operations, so phase and phase rate are available every tick in constant time.
+#
+# The oscillator phase is arbitrary with respect to the gait cycle, so heel strikes (from the IMU heel strike
+# detector) are used to learn the phase offset: gait phase 0 is heel strike and 1 is the next heel strike.
+
+import math
+
+TWO_PI = 2 * math.pi
+
+class AdaptiveOscillator:
+    def __init__(self, n_harmonics:int = 3, stride_period:float = 1.2, nu_phi:float = 4.0, nu_omega:float = 4.0, eta:float = 2.0):
+        """
+        Args:
+            n_harmonics: number of harmonics fit to the input signal
+            stride_period: initial guess of the stride period (s)
+            nu_phi: phase coupling gain
+            nu_omega: frequency adaptation gain
+            eta: amplitude learning rate
+        """
+        self.n_harmonics = n_harmonics
+        self.nu_phi = nu_phi
+        self.nu_omega = nu_omega
+        self.eta = eta
+
+        self.phi = 0.0                          # oscillator phase (rad, unwrapped)
+        self.omega = TWO_PI / stride_period     # oscillator frequency (rad/s)
+        self.a0 = 0.0
+        self.a = [1.0] + [0.0] * (n_harmonics - 1)    # inputs are normalized to unit variance
+
+    def update(self, x:float, dt:float):
+        """Advance the oscillator by dt with the new input sample x. Returns (phase [0, 2pi), omega)."""
+        sines = [math.sin((k + 1) * self.phi) for k in range(self.n_harmonics)]
+        x_hat = self.a0 + sum(a_k * s_k for a_k, s_k in zip(self.a, sines))
+        error = x - x_hat
+
+        # normalize the coupling by the learnt amplitude so gains do not depend on signal scale
+        coupling = error * math.cos(self.phi) / max(sum(abs(a_k) for a_k in self.a), 0.1)
+
+        self.phi += dt * (self.omega + self.nu_phi * coupling)
+        self.omega += dt * self.nu_omega * coupling
+        self.a0 += dt * self.eta * error
+        for k in range(self.n_harmonics):
+            self.a[k] += dt * self.eta * error * sines[k]
+
+        return self.phi % TWO_PI, self.omega
+
+
+class NormalizedSignal:
+    # Exponentially weighted running mean/std used to put IMU & encoder channels on a common scale
+    def __init__(self, time_constant:float = 5.0):
+        self.time_constant = time_constant
+        self.mean = 0.0
+        self.var = 1.0
+        self.cold = True
+
+    def update(self, x:float, dt:float) -> float:
+        if self.cold:
+            self.mean = x
+            self.cold = False
+        alpha = min(dt / self.time_constant, 1.0)
+        deviation = x - self.mean
+        self.mean += alpha * deviation
+        self.var += alpha * (deviation * deviation - self.var)
+        return deviation / math.sqrt(self.var + 1e-9)
+
+
+class GaitPhaseEstimator:
+    def __init__(self, weights=(0.0, 1.0, 1.0), stride_period:float = 1.2, min_stride_period:float = 0.6, max_stride_period:float = 2.5):
+        """
+        Args:
+            weights: contribution of (accel_y, gyro_z, ankle angle) to the oscillator input (each channel is normalized first).
+                     accel_y is spiky around heel strike and is off by default.
+            stride_period: initial guess of the stride period (s)
+            min_stride_period, max_stride_period: plausible stride periods (s); the frequency estimate is kept within them
+        """
+        self.weights = weights
+        self.oscillator = AdaptiveOscillator(stride_period=stride_period)
+        self.channels = [NormalizedSignal() for _ in weights]
+
+        self.min_omega = TWO_PI / max_stride_period
+        self.max_omega = TWO_PI / min_stride_period
+
+        # circular mean of the oscillator phase at heel strike (phase offset), as a unit vector
+        self.offset_cos = 1.0
+        self.offset_sin = 0.0
+        self.offset_gain = 0.2
+        self.heel_strikes = 0
+
+        self.phase = 0.0        # gait phase, 0 at heel strike (fraction of stride)
+        self.phase_rate = 1 / stride_period     # strides/s
+
+    def update(self, accel_y:float, gyro_z:float, ankle_angle:float, dt:float, heel_strike:bool = False):
+        """Returns (gait phase in [0, 1), phase rate in strides/s)."""
+        x = 0.0
+        for weight, channel, sample in zip(self.weights, self.channels, (accel_y, gyro_z, ankle_angle)):
+            normalized = channel.update(sample, dt)
+            x += weight * normalized
+
+        osc_phase, omega = self.oscillator.update(x, dt)
+
+        # keep the frequency within plausible walking cadences (prevents locking onto a backwards/harmonic solution)
+        omega = min(max(omega, self.min_omega), self.max_omega)
+        self.oscillator.omega = omega
+
+        if heel_strike:
+            self.offset_cos += self.offset_gain * (math.cos(osc_phase) - self.offset_cos)
+            self.offset_sin += self.offset_gain * (math.sin(osc_phase) - self.offset_sin)
+            self.heel_strikes += 1
+
+        self.phase = ((osc_phase - math.atan2(self.offset_sin, self.offset_cos)) % TWO_PI) / TWO_PI
+        self.phase_rate = omega / TWO_PI
+        return self.phase, self.phase_rate
+
+    def is_locked(self) -> bool:
+        """True once the phase offset has been learnt from a few heel strikes."""
+        return self.heel_strikes >= 3
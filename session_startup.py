@@ -0,0 +1,103 @@
+# Description:
+# Session startup for both exos: belt spooling and zeroing run concurrently on both devices
+# (each device has its own serial link), one task per device with its own timeout.
+# Tasks run in daemon threads, so a step that hangs (e.g. a stuck serial read) cannot hold up startup past its
+# timeout or keep the process from exiting; the session is then aborted and the motors stopped by the caller.
+# Operator prompts between the steps are optional (config.startup_prompts).
+
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, NamedTuple
+
+import config
+
+class StepResult(NamedTuple):
+    ok: bool
+    value: Any = None           # return value of the step
+    error: str = ''
+    duration: float = 0.0       # s
+
+
+class StartupResult:
+    def __init__(self):
+        self.steps = {}         # {step name: {side: StepResult}}
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for step in self.steps.values() for result in step.values())
+
+    def summary(self) -> str:
+        lines = []
+        for step, results in self.steps.items():
+            for side, result in results.items():
+                status = "ok" if result.ok else "FAILED ({})".format(result.error)
+                lines.append("{:<8}{:<8}{:>6.2f} s  {}".format(step, side, result.duration, status))
+        return "\n".join(lines)
+
+
+class SessionStartup:
+    def __init__(self, exos:list, prompts:bool = config.startup_prompts, spool_timeout:float = 5, zero_timeout:float = 15):
+        """
+        Args:
+            exos: ExoObjects to start up
+            prompts: wait for the operator (ENTER) before each step
+            spool_timeout, zero_timeout: per device timeout of each step (s)
+        """
+        self.exos = exos
+        self.prompts = prompts
+        self.spool_timeout = spool_timeout
+        self.zero_timeout = zero_timeout
+
+    def prompt(self, message:str):
+        if self.prompts:
+            input(message)
+        else:
+            print(message.replace('Hit ANY KEY to ', '').capitalize())
+
+    @staticmethod
+    def submit(step, exo) -> Future:
+        """Runs step(exo) in its own daemon thread"""
+        future = Future()
+        def task():
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(step(exo))
+                except Exception as e:
+                    future.set_exception(e)
+        threading.Thread(target=task, name='startup_' + exo.side, daemon=True).start()
+        return future
+
+    def run_step(self, step, timeout:float) -> dict:
+        """Runs step(exo) for every exo concurrently; each result is collected within its own timeout
+        (a timed out step is abandoned, its thread does not delay the return)."""
+        start_time = time.perf_counter()
+        futures = {exo.side: self.submit(step, exo) for exo in self.exos}
+
+        results = {}
+        for side, future in futures.items():
+            remaining = max(timeout - (time.perf_counter() - start_time), 0)
+            try:
+                value = future.result(timeout=remaining)
+                results[side] = StepResult(True, value, duration=time.perf_counter() - start_time)
+            except FutureTimeoutError:
+                results[side] = StepResult(False, error="timed out after {} s".format(timeout), duration=time.perf_counter() - start_time)
+            except Exception as e:
+                results[side] = StepResult(False, error=str(e), duration=time.perf_counter() - start_time)
+        return results
+
+    def run(self) -> StartupResult:
+        result = StartupResult()
+
+        # Command bias current to spool the belts
+        self.prompt('Hit ANY KEY to allow belts to spool for BOTH exos')
+        result.steps['spool'] = self.run_step(lambda exo: exo.spool_belt(), self.spool_timeout)
+
+        # Determine Motor & Ankle Encoder Offsets (stored offsets are reused if younger than config.zero_offsets_max_age)
+        if result.ok:
+            self.prompt('Hit ANY KEY to START ZEROING procedure for BOTH exos')
+            result.steps['zero'] = self.run_step(lambda exo: exo.restore_or_zero(config.zero_offsets_max_age, self.zero_timeout),
+                                                 self.zero_timeout + 1)
+
+        print(result.summary())
+        return result
@@ -0,0 +1,163 @@
+# Description:
+# Real-time plotting publisher that keeps rtplot's network sends out of the sensor loop.
+#
+# The sensor thread only appends a sample to a bounded deque (append/popleft are atomic in CPython,
+# so no lock is taken on the hot path). A background thread wakes at the display frame rate, drains
+# the deque, keeps every `decimation`-th sample and ships them to rtplot as a single multi-sample frame
+# (one row per plotted channel, one column per sample). If the plotting monitor is slow, only this thread
+# waits on the socket; once the deque is full the oldest samples are dropped instead of stalling acquisition.
+#
+# Also holds the channel registry: every logged/plotted signal is declared once (name, dtype, units, side)
+# and the registry generates the log header & dtype, the shared-memory record layout, the rtplot configs and the row packer.
+
+import threading
+import time
+from collections import deque
+from operator import attrgetter
+from typing import NamedTuple, Type
+
+import numpy as np
+from rtplot import client
+
+import config
+
+class Channel(NamedTuple):
+    name: str                   # log column name
+    attr: str                   # attribute on the state source (dotted paths allowed)
+    dtype: str = 'f8'           # numpy dtype of the channel
+    units: str = ''
+    side: str = ''              # 'left', 'right' or '' for bilateral/global signals
+    plot: dict = None           # rtplot options (title, colors, yrange) if the channel can be plotted
+
+
+class ChannelRegistry:
+    """Generates everything that used to be kept in sync by hand from a single list of Channels."""
+    def __init__(self, channels:list):
+        self.channels = list(channels)
+        self.names = [channel.name for channel in self.channels]
+        self.index = {channel.name: i for i, channel in enumerate(self.channels)}
+
+        # log/record layout
+        self.dtype = np.dtype([(channel.name, channel.dtype) for channel in self.channels])
+
+        # packs one row from the state source in a single C-level call (returns a tuple ordered like names)
+        self.pack = attrgetter(*[channel.attr for channel in self.channels])
+
+    def header(self):
+        return list(self.names)
+
+    def record(self, buffer=None):
+        """Single-row structured array with this layout. Pass a buffer (e.g. multiprocessing.shared_memory.SharedMemory.buf)
+        to place it in shared memory; fill it with record[()] = registry.pack(source)."""
+        if buffer is None:
+            return np.zeros((), dtype=self.dtype)
+        return np.ndarray(shape=(), dtype=self.dtype, buffer=buffer)
+
+    def read_log(self, filename:str) -> np.ndarray:
+        """Loads a csv log as a structured array typed by this registry (columns are matched by header name, 
+        so logs written before channels were appended load too; empty cells become nan)."""
+        with open(filename) as f:
+            header = f.readline().rstrip('\n').split(',')
+        dtype = np.dtype([(name, self.dtype[name] if name in self.index else 'f8') for name in header])
+        return np.atleast_1d(np.genfromtxt(filename, delimiter=',', skip_header=1, dtype=dtype, deletechars='', replace_space=' '))
+
+    def plot_configs(self):
+        """rtplot config for every plottable channel, keyed by channel name."""
+        configs = {}
+        for channel in self.channels:
+            if channel.plot is None:
+                continue
+            title = channel.plot.get('title', channel.name)
+            configs[channel.name] = {'names': [title], 'title': title, 'colors': channel.plot.get('colors', ['b']),
+                                     'yrange': channel.plot.get('yrange', [0, 1]), 'ylabel': channel.units,
+                                     'xlabel': 'timestep', 'line_width': [8, 8]}
+        return configs
+
+    def side(self, side:str):
+        return [channel.name for channel in self.channels if channel.side == side]
+
+    def declare(self, module):
+        """Declares a zero default on the state module for any channel attribute it does not define yet."""
+        for channel in self.channels:
+            if '.' in channel.attr or hasattr(module, channel.attr):
+                continue
+            setattr(module, channel.attr, np.zeros((), dtype=channel.dtype).item())
+
+
+class TelemetryPublisher(threading.Thread):
+    def __init__(self, plot_configs:dict, selected:list, quit_event=Type[threading.Event], channel_index:dict = None,
+                 frame_rate:float = 30, decimation:int = 3, max_queue:int = 3000, name='Telemetry'):
+        """
+        Args:
+            plot_configs: {channel name: rtplot plot config}
+            selected: channel names to plot initially
+            channel_index: {channel name: position in the samples passed to push()}.
+                           Defaults to samples ordered like plot_configs.
+            quit_event: thread runs while this event is set
+            frame_rate: frames sent to rtplot per second
+            decimation: only every decimation-th pushed sample is plotted
+            max_queue: samples buffered before the oldest are dropped
+        """
+        super().__init__(name=name)
+        self.quit_event = quit_event
+
+        self.plot_configs = plot_configs
+        if channel_index is None:
+            channel_index = {name: i for i, name in enumerate(plot_configs)}
+        self.channel_index = channel_index
+        self.frame_period = 1 / frame_rate
+        self.decimation = max(int(decimation), 1)
+
+        self.samples = deque(maxlen=max_queue)
+        self.sample_count = 0
+
+        self.selected = None    # nothing initialized on the rtplot server yet
+        self.selected_columns = []
+        self.requested = list(selected)
+
+    def push(self, sample):
+        """Called from the sensor loop. sample is a sequence laid out as described by channel_index."""
+        self.samples.append(sample)
+
+    def select(self, channel_names):
+        """Changes the plotted channels at runtime (applied by the publisher thread on its next frame)."""
+        self.requested = list(channel_names)
+
+    def apply_selection(self):
+        names = [name for name in self.requested if name in self.plot_configs]
+        client.initialize_plots([self.plot_configs[name] for name in names])
+
+        self.selected = list(self.requested)
+        self.selected_columns = [self.channel_index[name] for name in names]
+
+    def send_frame(self):
+        frame = []
+        while self.samples:
+            sample = self.samples.popleft()
+            if self.sample_count % self.decimation == 0:
+                frame.append([sample[i] for i in self.selected_columns])
+            self.sample_count += 1
+
+        if frame and self.selected_columns:
+            client.send_array(np.array(frame, dtype=float).T)
+
+    def run(self):
+        client.configure_ip(config.rtplot_ip)
+        config_channels = list(config.rtplot_channels)
+
+        next_frame_time = time.perf_counter()
+        while self.quit_event.is_set():
+            try:
+                # channel selection can be changed by select() or by editing config.rtplot_channels
+                if list(config.rtplot_channels) != config_channels:
+                    config_channels = list(config.rtplot_channels)
+                    self.select(config_channels)
+                if self.requested != self.selected:
+                    self.apply_selection()
+
+                self.send_frame()
+            except Exception as e:
+                print("error in telemetry publisher thread: ", e)
+
+            next_frame_time += self.frame_period
+            time.sleep(max(next_frame_time - time.perf_counter(), 0))
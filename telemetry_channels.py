@@ -0,0 +1,109 @@
+# Description:
+# Single declaration of every signal logged by the Gait State Estimator thread.
+# The log header & dtype, the shared-memory record layout, the rtplot configs and the per-tick row packing are all generated from this list
+# (see telemetry.ChannelRegistry). To log or plot a new signal, add one line at the END of the list.
+# The historical CSV columns keep their names and positions so existing analysis scripts still work.
+
+from telemetry import Channel, ChannelRegistry
+
+ANKLE = dict(colors=['r'], yrange=[20, 130])
+TORQUE = dict(yrange=[0, 40])
+
+gse_channels = ChannelRegistry([
+    # Left exo sensors
+    Channel('state_time_left', 'state_time_left', units='s', side='left'),
+    Channel('temperature_left', 'temperature_left', units='C', side='left'),
+    Channel('ankle_angle_left', 'ankle_angle_left', units='degrees', side='left', plot=dict(title='Ankle Angle Left', **ANKLE)),
+    Channel('accel_x_left', 'accel_x_left', units='g', side='left', plot=dict(title='Accel X Left', colors=['r'], yrange=[-10, 50])),
+    Channel('accel_y_left', 'accel_y_left', units='g', side='left', plot=dict(title='Accel Y Left', colors=['r'], yrange=[-10, 50])),
+    Channel('accel_z_left', 'accel_z_left', units='g', side='left'),
+    Channel('gyro_x_left', 'gyro_x_left', units='deg/s', side='left'),
+    Channel('gyro_y_left', 'gyro_y_left', units='deg/s', side='left'),
+    Channel('gyro_z_left', 'gyro_z_left', units='deg/s', side='left', plot=dict(title='Gyro Z Left', yrange=[-50, 50])),
+    Channel('motor_angle_left', 'motor_angle_left', units='degrees', side='left', plot=dict(title='Left Motor Angle', yrange=[0, 1200])),
+    Channel('motor_velocity_left', 'motor_velocity_left', side='left'),
+    Channel('motor_current_left', 'motor_current_left', units='mA', side='left', plot=dict(title='Left Motor Current', yrange=[0, 25000])),
+    Channel('stride_time_left', 'stride_time_left', units='s', side='left'),
+    Channel('heel_strike_left', 'heel_strike_left', side='left'),
+    Channel('time_in_current_stride_left', 'time_in_current_stride_left', units='s', side='left'),
+
+    # Right exo sensors
+    Channel('state_time_right', 'state_time_right', units='s', side='right'),
+    Channel('temperature_right', 'temperature_right', units='C', side='right'),
+    Channel('ankle_angle_right', 'ankle_angle_right', units='degrees', side='right', plot=dict(title='Ankle Angle Right', **ANKLE)),
+    Channel('accel_x_right', 'accel_x_right', units='g', side='right'),
+    Channel('accel_y_right', 'accel_y_right', units='g', side='right'),
+    Channel('accel_z_right', 'accel_z_right', units='g', side='right'),
+    Channel('gyro_x_right', 'gyro_x_right', units='deg/s', side='right'),
+    Channel('gyro_y_right', 'gyro_y_right', units='deg/s', side='right'),
+    Channel('gyro_z_right', 'gyro_z_right', units='deg/s', side='right'),
+    Channel('motor_angle_right', 'motor_angle_right', units='degrees', side='right', plot=dict(title='Right Motor Angle', yrange=[0, 1200])),
+    Channel('motor_velocity_right', 'motor_velocity_right', side='right'),
+    Channel('motor_current_right', 'motor_current_right', units='mA', side='right', plot=dict(title='Right Motor Current', yrange=[0, 25000])),
+    Channel('stride_time_right', 'stride_time_right', units='s', side='right'),
+    Channel('heel_strike_right', 'heel_strike_right', side='right'),
+    Channel('time_in_current_stride_right', 'time_in_current_stride_right', units='s', side='right'),
+
+    # Spline & GUI
+    Channel('rise_time', 't_rise', units='% stance'),
+    Channel('peak time', 't_peak', units='% stance'),
+    Channel('fall time', 't_fall', units='% stance'),
+    Channel('peak torque magnitude', 'GUI_commanded_torque', units='Nm'),
+    Channel('adjusted slider btn', 'adjusted_slider_btn', dtype='U8'),
+    Channel('adjusted slider value', 'adjusted_slider_value', units='$'),
+    Channel('GUI confirm btn status', 'confirm_btn_pressed', dtype='U8'),
+
+    # Transmission, swing & delivered torque
+    Channel('N_left', 'N_left', side='left', plot=dict(title='N Left', yrange=[-10, 20])),
+    Channel('N_right', 'N_right', side='right', plot=dict(title='N Right', colors=['r'], yrange=[-10, 18])),
+    Channel('left_swing_flag', 'swing_val_left', side='left', plot=dict(title='Swing Left', colors=['r'], yrange=[0, 100])),
+    Channel('right_swing_flag', 'swing_val_right', side='right', plot=dict(title='Swing Right', colors=['r'], yrange=[0, 100])),
+    Channel('back_calcd_torque_left', 'act_ank_torque_left', units='Nm', side='left', plot=dict(title='Calcd Torque Left', colors=['r'], **TORQUE)),
+    Channel('back_calcd_torque_right', 'act_ank_torque_right', units='Nm', side='right', plot=dict(title='Calcd Torque Right', colors=['r'], **TORQUE)),
+
+    # Bertec
+    Channel('bertec_HS_left', 'bertec_HS_left', side='left'),
+    Channel('bertec_HS_right', 'bertec_HS_right', side='right'),
+    Channel('all_bertec_left', 'z_forces_left', units='N', side='left'),
+    Channel('all_bertec_right', 'z_forces_right', units='N', side='right'),
+    Channel('bertec_stance_t_left', 'time_in_current_stance_left', units='s', side='left'),
+    Channel('bertec_stance_t_right', 'time_in_current_stance_right', units='s', side='right'),
+    Channel('stride_t_bertec_left', 'stride_period_bertec_left', units='s', side='left'),
+    Channel('stride_t_bertec_right', 'stride_period_bertec_right', units='s', side='right'),
+    Channel('bertec_in_swing_left', 'swing_val_bertec_left', side='left'),
+    Channel('bertec_in_swing_right', 'swing_val_bertec_right', side='right'),
+
+    # Commanded torque
+    Channel('desired_torque_left', 'desired_spline_torque_left', units='Nm', side='left', plot=dict(title='Desired Torque Left', **TORQUE)),
+    Channel('desired_torque_right', 'desired_spline_torque_right', units='Nm', side='right', plot=dict(title='Desired Torque Right', **TORQUE)),
+
+    # Thread rates
+    Channel('vas_main_frequency', 'vas_main_frequency', units='Hz'),
+    Channel('gui_communication_thread_frequency', 'gui_communication_thread_frequency', units='Hz'),
+    Channel('gse_thread_frequency', 'gse_thread_frequency', units='Hz'),
+    Channel('bertec_thread_frequency', 'bertec_thread_frequency', units='Hz'),
+
+    # ---- Channels added after the historical header (append new channels below, never above) ----
+    Channel('bertec_latency', 'bertec_latency', units='s'),
+
+    # IMU gait phase
+    Channel('gait_phase_left', 'gait_phase_left', units='stride', side='left', plot=dict(title='Gait Phase Left', yrange=[0, 1])),
+    Channel('gait_phase_right', 'gait_phase_right', units='stride', side='right', plot=dict(title='Gait Phase Right', yrange=[0, 1])),
+    Channel('gait_phase_rate_left', 'gait_phase_rate_left', units='stride/s', side='left'),
+    Channel('gait_phase_rate_right', 'gait_phase_rate_right', units='stride/s', side='right'),
+
+    # Thermal supervision
+    Channel('winding_temperature_left', 'winding_temperature_left', units='C', side='left', plot=dict(title='Winding Temp Left', yrange=[20, 120])),
+    Channel('winding_temperature_right', 'winding_temperature_right', units='C', side='right', plot=dict(title='Winding Temp Right', yrange=[20, 120])),
+    Channel('thermal_torque_scale_left', 'thermal_torque_scale_left', side='left'),
+    Channel('thermal_torque_scale_right', 'thermal_torque_scale_right', side='right'),
+    Channel('thermal_supervisor_frequency', 'thermal_supervisor_frequency', units='Hz'),
+
+    # GUI server
+    Channel('gui_handler_latency', 'gui_handler_latency', units='s'),
+    Channel('gui_handler_latency_max', 'gui_handler_latency_max', units='s'),
+
+    # Controller timing
+    Channel('time_since_HS_left', 'time_since_heel_strike_left', units='s', side='left'),
+    Channel('time_since_HS_right', 'time_since_heel_strike_right', units='s', side='right'),
+])
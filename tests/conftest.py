@@ -0,0 +1,7 @@
+# The controller modules are run as scripts from the repo root (no package), so the tests import them the same way.
+import os
+import sys
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_dir)
+sys.path.insert(0, os.path.join(repo_dir, "Transmission_Ratio_Characterization"))
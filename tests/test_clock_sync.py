@@ -0,0 +1,29 @@
+import numpy as np
+
+from clock_sync import ClockSync
+
+def test_unsynced_maps_stamps_unchanged():
+    sync = ClockSync()
+    assert not sync.is_synced()
+    assert sync.to_local(12.5) == 12.5
+
+def test_offset_converges_to_offset_plus_delay_floor():
+    rng = np.random.default_rng(0)
+    clock_offset, delay_floor = 1000.0, 0.002
+    sync = ClockSync(window_size=200, gain=0.05)
+    for i in range(5000):
+        remote_time = i * 0.001
+        delay = delay_floor + rng.exponential(0.003)
+        sync.update(remote_time, remote_time + clock_offset + delay)
+
+    assert sync.is_synced()
+    assert abs(sync.offset - (clock_offset + delay_floor)) < 1e-3
+    assert sync.latency >= 0
+
+def test_latency_is_delay_above_the_floor():
+    sync = ClockSync(window_size=10, gain=1.0)
+    for i in range(10):
+        sync.update(i * 0.01, i * 0.01 + 5.0)
+    sync.update(0.2, 0.2 + 5.0 + 0.004)
+    assert abs(sync.latency - 0.004) < 1e-9
+    assert abs(sync.to_local(0.3) - 5.3) < 1e-9
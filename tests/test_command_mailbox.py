@@ -0,0 +1,34 @@
+import math
+
+import config
+from command_mailbox import CommandMailbox
+
+def test_post_versions_and_mirrors_to_config():
+    mailbox = CommandMailbox()
+    first = mailbox.post(20)
+    second = mailbox.post(slider_btn='A', slider_value=1.5)
+
+    assert (first.version, second.version) == (1, 2)
+    assert mailbox.latest() is second
+    assert second.peak_torque == 20.0           # None keeps the peak torque
+    assert second.torque_changed_time == first.torque_changed_time
+    assert (config.GUI_commanded_torque, config.adjusted_slider_btn, config.adjusted_slider_value) == (20.0, 'A', 1.5)
+
+def test_torque_changed_time_only_moves_with_the_torque():
+    mailbox = CommandMailbox()
+    first = mailbox.post(10)
+    same = mailbox.post(10.0, confirm_btn_pressed='True')
+    changed = mailbox.post(12.5)
+
+    assert same.torque_changed_time == first.torque_changed_time
+    assert changed.torque_changed_time == changed.received_time >= first.torque_changed_time
+    assert same.confirm_btn_pressed == 'True' and config.confirm_btn_pressed == 'False'
+    assert math.isnan(changed.slider_value)
+
+def test_post_schedule_sorts_unique_torques():
+    mailbox = CommandMailbox()
+    assert mailbox.schedule == () and mailbox.schedule_version == 0
+    assert mailbox.post_schedule([20, 10.0, 20.0, 3.333]) == (3.333, 10.0, 20.0)
+    assert mailbox.schedule_version == 1
+    mailbox.post_schedule([40])
+    assert mailbox.schedule == (40.0,) and mailbox.schedule_version == 2
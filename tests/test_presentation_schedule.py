@@ -0,0 +1,76 @@
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pytest
+
+gui_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "GUIs", "vas_GUI")
+
+def load_gui_module(name:str):
+    spec = importlib.util.spec_from_file_location("vas_gui_" + name, os.path.join(gui_dir, name + ".py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope="module")
+def gui():
+    """The GUI modules import their own config module, which has the same name as the controller's."""
+    controller_config = sys.modules.pop("config", None)
+    try:
+        gui_config = load_gui_module("config")
+        sys.modules["config"] = gui_config
+        presentation_schedule = load_gui_module("presentation_schedule")
+    finally:
+        sys.modules.pop("config", None)
+        if controller_config is not None:
+            sys.modules["config"] = controller_config
+    return gui_config, presentation_schedule
+
+def baseline_permutation(torque_settings, trial:int):
+    """Trial randomization of the GUI before the schedule was precomputed."""
+    np.random.seed(trial)
+    return np.random.choice(torque_settings, size=len(torque_settings), replace=False)
+
+def test_full_setup_matches_baseline_permutation(gui):
+    gui_config, presentation_schedule = gui
+    schedule = presentation_schedule.PresentationSchedule(gui_config.torque_settings, 'full', num_trials=3)
+    for trial in (1, 2, 3):
+        for i, torque in enumerate(baseline_permutation(gui_config.torque_settings, trial)):
+            # the 'full' setup shows every torque in its single presentation, whatever presentation number is configured
+            assert schedule.torque(trial, 3, chr(65 + i)) == round(float(torque), 3)
+
+def test_4btn_setup_splits_the_permutation_into_presentations(gui):
+    gui_config, presentation_schedule = gui
+    schedule = presentation_schedule.PresentationSchedule(gui_config.torque_settings, '4btn', num_trials=4)
+    assert schedule.num_presentations == 3
+    permutation = baseline_permutation(gui_config.torque_settings, 2)
+    for i, torque in enumerate(permutation):
+        presentation, button = divmod(i, 4)
+        assert schedule.torque(2, presentation + 1, "ABCD"[button]) == round(float(torque), 3)
+
+def test_trials_past_the_schedule_are_computed(gui):
+    gui_config, presentation_schedule = gui
+    schedule = presentation_schedule.PresentationSchedule(gui_config.torque_settings, 'full', num_trials=3)
+    permutation = baseline_permutation(gui_config.torque_settings, 7)
+    assert schedule.torque(7, 1, 'C') == round(float(permutation[2]), 3)
+    assert (7, 1, 'L') in schedule.mapping
+
+def test_schedule_does_not_touch_the_global_random_state(gui):
+    gui_config, presentation_schedule = gui
+    np.random.seed(123)
+    expected = np.random.rand()
+    np.random.seed(123)
+    presentation_schedule.PresentationSchedule(gui_config.torque_settings, 'full', num_trials=3)
+    assert np.random.rand() == expected
+
+def test_torques_and_log(gui, tmp_path):
+    gui_config, presentation_schedule = gui
+    schedule = presentation_schedule.PresentationSchedule(gui_config.torque_settings, 'full', num_trials=2)
+    assert schedule.torques() == sorted(round(float(torque), 3) for torque in gui_config.torque_settings)
+
+    filename = tmp_path / "records" / "schedule.csv"
+    schedule.log(str(filename))
+    lines = filename.read_text().splitlines()
+    assert lines[0] == "trial,presentation,button,torque"
+    assert len(lines) == 1 + 2 * len(gui_config.torque_settings)
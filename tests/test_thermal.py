@@ -0,0 +1,59 @@
+import numpy as np
+
+from thermal import ThermalModel
+
+def model(T_w=40.0, T_c=35.0):
+    thermal_model = ThermalModel(temp_limit_windings=100, soft_border_C_windings=10, temp_limit_case=70, soft_border_C_case=10)
+    thermal_model.T_w, thermal_model.T_c = T_w, T_c
+    return thermal_model
+
+def test_forecast_matches_step_exact():
+    times = np.array([0.0, 1.0, 10.0, 60.0, 600.0])
+    T_w, T_c = model().forecast(times, motor_current=8000)
+
+    stepped = model()
+    elapsed = 0.0
+    for t, expected_T_w, expected_T_c in zip(times, T_w, T_c):
+        stepped.step_exact(t - elapsed, 8000)
+        elapsed = t
+        assert np.isclose(stepped.T_w, expected_T_w, atol=1e-6)
+        assert np.isclose(stepped.T_c, expected_T_c, atol=1e-6)
+
+def test_step_exact_matches_small_update_steps():
+    exact, euler = model(), model()
+    exact.step_exact(5.0, 10000)
+    for _ in range(5000):
+        euler.update(dt=1e-3, motor_current=10000)
+    assert np.isclose(exact.T_w, euler.T_w, atol=0.05)
+    assert np.isclose(exact.T_c, euler.T_c, atol=0.05)
+
+def test_forecast_starts_at_the_current_state_and_settles_at_steady_state():
+    T_w, T_c = model().forecast([0.0, 1e6], motor_current=5000)
+    assert np.isclose(T_w[0], 40.0) and np.isclose(T_c[0], 35.0)
+    assert np.allclose([T_w[1], T_c[1]], model().steady_state(5000)[:2], atol=1e-6)
+
+def test_time_to_limit_is_the_first_crossing():
+    thermal_model = model()
+    t = thermal_model.time_to_soft_limit(15000, horizon=3600)
+    assert 0 < t < 3600
+
+    T_w, T_c = thermal_model.forecast(t, 15000)
+    assert np.isclose(max(T_w - thermal_model.soft_max_temp_windings, T_c - thermal_model.soft_max_temp_case), 0, atol=1e-6)
+    T_w, T_c = thermal_model.forecast(0.99 * t, 15000)
+    assert T_w < thermal_model.soft_max_temp_windings and T_c < thermal_model.soft_max_temp_case
+
+    assert thermal_model.time_to_hard_limit(15000, horizon=3600) > t
+
+def test_time_to_limit_without_current_or_already_over():
+    assert model().time_to_soft_limit(0, horizon=3600) == np.inf
+    assert model(T_w=95.0).time_to_soft_limit(0, horizon=3600) == 0.0
+
+def test_max_sustainable_peak_is_the_largest_peak_under_the_soft_limits():
+    thermal_model = model()
+    rms_current_for_peak = lambda peak: 600 * peak     # mA
+    duration = 600
+    peak = thermal_model.max_sustainable_peak(rms_current_for_peak, duration, peak_range=(0, 40), tol=0.05)
+
+    assert 0 < peak < 40
+    assert thermal_model.time_to_soft_limit(rms_current_for_peak(peak), horizon=duration) >= duration
+    assert thermal_model.time_to_soft_limit(rms_current_for_peak(peak + 0.1), horizon=duration) < duration
@@ -0,0 +1,81 @@
+import types
+
+import numpy as np
+import pytest
+
+import transmission
+from tr_fitting import StreamingPolyFit, fit_TR_curve, lookup_tables
+
+MOTOR_ANGLE_COEFFS = np.array([-0.0004, 0.02, 14.0, 5.0])
+
+def sweep(seconds:float, frequency:float = 250, period:float = 2.0, angle_range=(-15, 45)):
+    """Ankle cycled between the ends of angle_range (deg) & the motor angle of the synthetic transmission."""
+    t = np.arange(0, seconds, 1 / frequency)
+    center, amplitude = np.mean(angle_range), np.ptp(angle_range) / 2
+    ankle_angles = center + amplitude * np.sin(2 * np.pi * t / period)
+    return t, ankle_angles, np.polyval(MOTOR_ANGLE_COEFFS, ankle_angles)
+
+def with_backlash(ankle_angles, motor_angles, size:float = 25.0):
+    """Motor angle jumps at the direction reversals, as the belt backlash does."""
+    velocity = np.gradient(ankle_angles)
+    reversals = np.abs(velocity) < 0.15 * np.abs(velocity).max()
+    return motor_angles + np.where(reversals, size, 0.0)
+
+def test_streaming_fit_matches_batch_polyfit():
+    _, ankle_angles, motor_angles = sweep(10)
+    motor_angles = motor_angles + np.random.default_rng(0).normal(0, 0.5, motor_angles.size)
+    fit = StreamingPolyFit(degree=3)
+    for ankle_angle, motor_angle in zip(ankle_angles, motor_angles):
+        fit.update(ankle_angle, motor_angle)
+
+    expected = np.polyfit(ankle_angles, motor_angles, 3)
+    np.testing.assert_allclose(fit.coeffs(), expected, rtol=1e-6, atol=1e-8)
+    np.testing.assert_allclose(fit.TR_coeffs(), np.polyder(expected), rtol=1e-6, atol=1e-8)
+    assert np.isclose(fit.rms_residual(), np.sqrt(np.mean((motor_angles - np.polyval(expected, ankle_angles))**2)))
+    assert fit.coverage() == pytest.approx(60, abs=2)
+    assert fit.TR_change(fit.TR_coeffs()) == pytest.approx(0, abs=1e-9)
+
+def test_robust_fits_reject_backlash_outliers():
+    _, ankle_angles, motor_angles = sweep(20)
+    motor_angles = with_backlash(ankle_angles, motor_angles) + np.random.default_rng(0).normal(0, 0.05, motor_angles.size)
+    check_angles = np.linspace(-15, 45, 200)
+    true_TR = np.polyval(np.polyder(MOTOR_ANGLE_COEFFS), check_angles)
+
+    errors = {}
+    for method in ('lstsq', 'huber', 'ransac', 'spline'):
+        fit = fit_TR_curve(ankle_angles, motor_angles, method=method)
+        TR = fit.TR_curve(check_angles) if callable(fit.TR_curve) else np.polyval(fit.TR_curve, check_angles)
+        errors[method] = np.max(np.abs(TR - true_TR))
+
+    # dropping the reversals leaves part of the backlash in the plain least-squares fit
+    assert errors['lstsq'] > 0.2, errors
+    for method in ('huber', 'ransac', 'spline'):
+        assert errors[method] < 0.05, errors
+
+def test_lookup_tables_from_fit():
+    _, ankle_angles, motor_angles = sweep(10)
+    fit = fit_TR_curve(ankle_angles, motor_angles, method='lstsq', min_speed=0)
+    TR_table, motor_angle_table, current_per_torque_table = lookup_tables(fit, 1, 0.0, 0.9, 0.000146)
+    assert TR_table.shape == motor_angle_table.shape == current_per_torque_table.shape == (transmission.ANK_ENC_COUNTS,)
+    assert TR_table.min() >= transmission.MIN_TR
+
+def test_auto_stop_with_backlash_outliers():
+    # same synthetic capture as the auto-stop check: 250 Hz, backlash outliers that keep the RMS residual above 2 deg
+    TR_characterization_MAIN = pytest.importorskip("TR_characterization_MAIN", exc_type=ImportError)
+    characterizer = TR_characterization_MAIN.TR_Characterizer(types.SimpleNamespace(side='left'))
+    frequency, poll_period = 250, 0.5
+    t, ankle_angles, motor_angles = sweep(60, frequency)
+    motor_angles = with_backlash(ankle_angles, motor_angles)
+
+    stop_time = None
+    for i, (ankle_angle, motor_angle) in enumerate(zip(ankle_angles, motor_angles)):
+        characterizer.fit.update(ankle_angle, motor_angle)
+        if (i + 1) % int(poll_period * frequency) == 0 and characterizer.converged(30, 0.05, 2500, 4):
+            stop_time = t[i]
+            break
+
+    assert stop_time is not None and stop_time < 30
+    assert characterizer.fit.rms_residual() > 2.0
+    check_angles = np.linspace(-15, 45, 50)
+    assert np.max(np.abs(np.polyval(characterizer.fit.TR_coeffs(), check_angles) 
+                         - np.polyval(np.polyder(MOTOR_ANGLE_COEFFS), check_angles))) < 1.0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import config
+import transmission
+from actuation import ActuationPipeline
+
+MOTOR_ANGLE_COEFFS = [-0.0004, 0.02, 14.0, 0.0]
+TR_COEFFS = np.polyder(MOTOR_ANGLE_COEFFS).tolist()
+MAX_DORSI_OFFSET = 12.0
+BIAS_CURRENT = 750
+
+def polyval_TR(ank_enc_count, ank_enc_sign):
+    """TR as the controller computed it before the lookup tables (GSE ankle angle, polyval, clamp)."""
+    ankle_angle = ank_enc_sign * ank_enc_count * config.ENC_CLICKS_TO_DEG - MAX_DORSI_OFFSET
+    return max(np.polyval(TR_COEFFS, ankle_angle), transmission.MIN_TR)
+
+def polyval_current(desired_torque, ank_enc_count, ank_enc_sign):
+    return int(desired_torque / (polyval_TR(ank_enc_count, ank_enc_sign) * config.efficiency * config.Kt))
+
+def tables(ank_enc_sign):
+    return transmission.build_lookup_tables(TR_COEFFS, MOTOR_ANGLE_COEFFS, ank_enc_sign, MAX_DORSI_OFFSET, 
+                                            config.efficiency, config.Kt)
+
+@pytest.mark.parametrize("ank_enc_sign", [config.ANK_ENC_SIGN_LEFT_EXO, config.ANK_ENC_SIGN_RIGHT_EXO])
+def test_lookup_tables_match_polynomial_at_every_count(ank_enc_sign):
+    TR_table, motor_angle_table, current_per_torque_table = tables(ank_enc_sign)
+    counts = np.arange(transmission.ANK_ENC_COUNTS)
+    ankle_angles = ank_enc_sign * counts * config.ENC_CLICKS_TO_DEG - MAX_DORSI_OFFSET
+
+    assert TR_table.shape == (transmission.ANK_ENC_COUNTS,)
+    np.testing.assert_allclose(TR_table, np.maximum(np.polyval(TR_COEFFS, ankle_angles), transmission.MIN_TR))
+    np.testing.assert_allclose(motor_angle_table, np.polyval(MOTOR_ANGLE_COEFFS, ankle_angles))
+    np.testing.assert_allclose(current_per_torque_table, 1 / (TR_table * config.efficiency * config.Kt))
+    assert TR_table.min() >= transmission.MIN_TR
+
+def test_torque_to_current_matches_polynomial():
+    TR_table, _, current_per_torque_table = tables(config.ANK_ENC_SIGN_LEFT_EXO)
+    actuation = ActuationPipeline('left', 1, TR_table, current_per_torque_table, BIAS_CURRENT)
+    rng = np.random.default_rng(0)
+    for desired_torque, ank_enc_count in zip(rng.uniform(0, 40, 2000), rng.integers(0, transmission.ANK_ENC_COUNTS, 2000)):
+        # multiplying by the tabulated gain instead of dividing can move the truncation by 1 mA
+        assert abs(actuation.torque_to_current(desired_torque, int(ank_enc_count)) 
+                   - polyval_current(desired_torque, ank_enc_count, 1)) <= 1
+        assert config.N_left == polyval_TR(ank_enc_count, 1)
+
+def test_vet_clamps_and_signs():
+    TR_table, _, current_per_torque_table = tables(config.ANK_ENC_SIGN_RIGHT_EXO)
+    actuation = ActuationPipeline('right', -1, TR_table, current_per_torque_table, BIAS_CURRENT)
+    assert actuation.vet(0) == -BIAS_CURRENT
+    assert actuation.vet(5000) == -5000
+    assert actuation.vet(10 * config.MAX_ALLOWABLE_CURRENT) == -config.MAX_ALLOWABLE_CURRENT
+
+def test_batch_matches_single_calls():
+    TR_table, _, current_per_torque_table = tables(config.ANK_ENC_SIGN_RIGHT_EXO)
+    actuation = ActuationPipeline('right', -1, TR_table, current_per_torque_table, BIAS_CURRENT)
+    rng = np.random.default_rng(1)
+    torques = rng.uniform(0, 60, 500)
+    counts = rng.integers(0, transmission.ANK_ENC_COUNTS, 500)
+    assert actuation.batch(torques, counts).tolist() == [actuation(torque, int(count)) for torque, count in zip(torques, counts)]
@@ -0,0 +1,23 @@
+import numpy as np
+
+from utils import RunningStats
+
+def test_running_stats_matches_numpy():
+    samples = np.random.default_rng(1).normal(3.0, 2.0, 1000)
+    stats = RunningStats()
+    for sample in samples:
+        stats.update(sample)
+
+    assert stats.count == samples.size
+    assert np.isclose(stats.mean, samples.mean())
+    assert np.isclose(stats.variance(), samples.var(ddof=1))
+    assert np.isclose(stats.standard_error(), samples.std(ddof=1) / np.sqrt(samples.size))
+
+def test_running_stats_needs_two_samples():
+    stats = RunningStats()
+    stats.update(1.0)
+    assert stats.variance() == float('inf')
+    assert stats.standard_error() == float('inf')
+
+    stats.reset()
+    assert stats.count == 0 and stats.mean == 0.0
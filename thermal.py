@@ -4,8 +4,55 @@
 
 # Taken from OSL Library
 
+import csv
+import os
 from typing import Any, Callable, List, Optional
 import numpy as np
+from scipy.linalg import expm
+from scipy.optimize import brentq
+
+from calibration_store import load_calibration, update_calibration, thermal_params_from, thermal_params_fields
+
+# Per-device parameters identified from thermal characterization logs (Thermal_Characterization/thermal_param_identification.py)
+THERMAL_PARAMS_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Thermal_Characterization", "thermal_params_{}.csv")
+IDENTIFIED_PARAMS = ["C_w", "R_WC", "C_c", "R_CA"]
+
+
+def load_thermal_params(device_id) -> dict:
+    """
+    Loads the identified parameters of a device (header row of names, row of values).
+    Returns an empty dict (default parameters) if the device has not been identified.
+    """
+    filename = THERMAL_PARAMS_FILENAME.format(device_id)
+    if not os.path.exists(filename):
+        return {}
+
+    with open(filename, mode="r") as file:
+        csv_reader = csv.reader(file)
+        names = next(csv_reader)
+        values = next(csv_reader)
+    return {name: float(value) for name, value in zip(names, values)}
+
+
+def resolve_thermal_params(device_id) -> dict:
+    """
+    Parameters of a device used by both ExoObject & ThermalSupervisor: the identified ones if any (copied into the
+    calibration store), else those kept in the calibration store, else an empty dict (default parameters).
+    """
+    params = load_thermal_params(device_id)
+    stored = thermal_params_from(load_calibration(device_id))
+    if params and params != stored:
+        update_calibration(device_id, **thermal_params_fields(params))
+    return params or stored
+
+
+def save_thermal_params(device_id, params: dict) -> str:
+    filename = THERMAL_PARAMS_FILENAME.format(device_id)
+    with open(filename, mode="w") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(list(params))
+        writer.writerow(list(params.values()))
+    return filename
 
 
 class ThermalModel:
@@ -111,6 +158,155 @@ class ThermalModel:
         self.T_w += dt * dTw_dt
         self.T_c += dt * dTc_dt
 
+    def step_exact(self, dt: float, motor_current: float = 0) -> None:
+        """
+        Same dynamics as update(), but integrated exactly over dt assuming the current (and ambient) are constant over the step,
+        so large/irregular time steps stay accurate. With the temperature dependent resistance the system is linear in
+        [T_w, T_c, 1], so the step is the matrix exponential of the augmented 3x3 system.
+
+        Args:
+            dt (float): Time step in seconds (real elapsed time).
+            motor_current (float): Motor current in mA. For a varying current, pass the RMS current over the step.
+        """
+        Phi = expm(self.augmented_system(motor_current) * dt)
+        T_w, T_c = Phi[:2] @ np.array([self.T_w, self.T_c, 1.0])
+        self.T_w, self.T_c = float(T_w), float(T_c)
+
+    def augmented_system(self, motor_current: float = 0) -> np.ndarray:
+        """
+        d/dt [T_w, T_c, 1] = M @ [T_w, T_c, 1] for a constant motor current (mA).
+        """
+        I2R_0: float = (motor_current * 1e-3) ** 2 * self.R_ϕ_0
+
+        M = np.zeros((3, 3))
+        M[0, 0] = (I2R_0 * self.α - 1 / self.R_WC) / self.C_w
+        M[0, 1] = 1 / (self.R_WC * self.C_w)
+        M[0, 2] = I2R_0 * (1 - self.α * self.R_T_0) / self.C_w
+        M[1, 0] = 1 / (self.R_WC * self.C_c)
+        M[1, 1] = -(1 / self.R_WC + 1 / self.R_CA) / self.C_c
+        M[1, 2] = self.T_a / (self.R_CA * self.C_c)
+        return M
+
+    def steady_state(self, motor_current: float = 0) -> np.ndarray:
+        """
+        Steady-state [T_w, T_c] for a constant (or RMS of a periodic) motor current in mA.
+        """
+        M = self.augmented_system(motor_current)
+        return np.linalg.solve(M[:2, :2], -M[:2, 2])
+
+    def forecast(self, t, motor_current: float = 0):
+        """
+        Closed-form [T_w, T_c] at times t (s, scalar or array) from the current state, for a constant motor current (mA).
+        A periodic current profile (e.g. one stride of the spline) can be passed as its RMS since the stride period is much
+        shorter than the thermal time constants.
+
+        Returns:
+            (T_w, T_c): arrays shaped like t
+        """
+        M = self.augmented_system(motor_current)
+        A = M[:2, :2]
+        T_ss = np.linalg.solve(A, -M[:2, 2])
+
+        # T(t) = T_ss + V exp(Λt) V^-1 (T_0 - T_ss); the eigenvalues are real (symmetric coupling between the nodes)
+        eigvals, V = np.linalg.eig(A)
+        c = np.linalg.solve(V, np.array([self.T_w, self.T_c]) - T_ss)
+        t = np.asarray(t, dtype=float)
+        modes = np.exp(np.multiply.outer(eigvals, t))
+        T = T_ss.reshape((2,) + (1,) * t.ndim) + np.tensordot(V * c, modes, axes=1)
+        return T[0], T[1]
+
+    def time_to_limit(self, motor_current: float, T_w_limit: float, T_c_limit: float, horizon: float = 3600) -> float:
+        """
+        First time (s) the winding or case temperature reaches its limit at this (RMS) motor current, inf if not within horizon.
+        The closed-form forecast is bracketed on a log-spaced grid and the crossing refined with brentq.
+        """
+        def margin(t):
+            T_w, T_c = self.forecast(t, motor_current)
+            return np.maximum(T_w - T_w_limit, T_c - T_c_limit)
+
+        if margin(0.0) >= 0:
+            return 0.0
+
+        t_grid = np.concatenate(([0.0], np.geomspace(1e-2, horizon, 256)))
+        over = np.nonzero(margin(t_grid) >= 0)[0]
+        if over.size == 0:
+            return np.inf
+
+        i = over[0]
+        return float(brentq(margin, t_grid[i - 1], t_grid[i]))
+
+    def time_to_soft_limit(self, motor_current: float, horizon: float = 3600) -> float:
+        """Time (s) until the torque starts being scaled down (soft limits), inf if not within horizon."""
+        return self.time_to_limit(motor_current, self.soft_max_temp_windings, self.soft_max_temp_case, horizon)
+
+    def time_to_hard_limit(self, motor_current: float, horizon: float = 3600) -> float:
+        """Time (s) until the torque is scaled to zero (hard limits), inf if not within horizon."""
+        return self.time_to_limit(motor_current, self.abs_max_temp_windings, self.abs_max_temp_case, horizon)
+
+    def max_sustainable_peak(self, rms_current_for_peak: Callable[[float], float], duration: float,
+                             peak_range: tuple = (0, 40), soft: bool = True, tol: float = 0.1) -> float:
+        """
+        Largest peak (e.g. peak torque) that stays below the soft (or hard) limits for duration seconds.
+
+        Args:
+            rms_current_for_peak: maps a peak setting to the RMS motor current (mA) of its periodic profile.
+                                  Must increase with the peak.
+            duration (float): seconds the setting has to be held.
+            peak_range (tuple): (lowest, highest) peak considered.
+            soft (bool): use the soft limits (where scaling starts) instead of the hard limits.
+            tol (float): bisection tolerance on the peak.
+
+        Returns:
+            float: max sustainable peak within peak_range (the lowest value if even that is not sustainable).
+        """
+        time_to = self.time_to_soft_limit if soft else self.time_to_hard_limit
+
+        def sustainable(peak):
+            return time_to(rms_current_for_peak(peak), horizon=duration) >= duration
+
+        low, high = peak_range
+        if sustainable(high):
+            return float(high)
+        if not sustainable(low):
+            return float(low)
+
+        while high - low > tol:
+            mid = 0.5 * (low + high)
+            if sustainable(mid):
+                low = mid
+            else:
+                high = mid
+        return float(low)
+
+    def get_torque_scale(self) -> float:
+        """
+        Scale factor for the torque from the current winding & case temperatures (same soft borders as update_and_get_scale).
+
+        Returns:
+            float: 1 below the soft limits, 0 above the hard limits, torque (sqrt of heating) scale in between.
+        """
+        scale = 1.0
+        if self.T_w > self.abs_max_temp_windings:
+            scale = 0.0
+        elif self.T_w > self.soft_max_temp_windings:
+            scale *= (self.abs_max_temp_windings - self.T_w) / (
+                self.abs_max_temp_windings - self.soft_max_temp_windings
+            )
+
+        if self.T_c > self.abs_max_temp_case:
+            scale = 0.0
+        elif self.T_c > self.soft_max_temp_case:
+            scale *= (self.abs_max_temp_case - self.T_c) / (
+                self.abs_max_temp_case - self.soft_max_temp_case
+            )
+
+        if scale <= 0.0:
+            return 0.0
+        if scale >= 1.0:
+            return 1.0
+
+        return float(np.sqrt(scale))
+
     def update_and_get_scale(self, dt, motor_current: float = 0, FOS: float = 1.0):
         """
         Updates the temperature of the winding and the case based on the current and the ambient temperature and returns the scale factor for the torque.
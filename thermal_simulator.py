@@ -0,0 +1,150 @@
+# Description:
+# Offline thermal screening of whole-protocol torque schedules (VAS / Vickrey / acclimation orders).
+#
+# A schedule is a sequence of peak torque settings held for given presentation durations at given stride periods.
+# Every schedule is simulated with the ThermalModel dynamics, vectorized across schedules:
+#   - the current over one stride is derived from the AssistanceGenerator spline (the same profile the controller commands)
+#     and reduced to its RMS, since strides are much shorter than the thermal time constants
+#   - for each distinct (torque, stride period) the exact discrete-time transition over dt is precomputed
+#     (matrix exponential of the augmented [T_w, T_c, 1] system, see ThermalModel.step_exact)
+#   - all schedules are then advanced together, one batched 3x3 matrix-vector product per dt
+#
+# Usage: python thermal_simulator.py [n_schedules]
+
+import sys
+
+import numpy as np
+from scipy.linalg import expm
+
+import config
+from assistance_generator import AssistanceGenerator
+from thermal import ThermalModel
+
+class ThermalScheduleSimulator:
+    def __init__(self, thermal_model:ThermalModel = None, current_per_torque:float = None, nominal_TR:float = 15,
+                 bias_current:float = 750, dt:float = 1.0, n_samples:int = 200):
+        """
+        Args:
+            thermal_model: model (parameters & limits) to simulate; defaults to the ExoObject thermal limits
+            current_per_torque: mA per N-m of ankle torque; defaults to 1 / (nominal_TR * efficiency * Kt)
+            nominal_TR: transmission ratio used for the default current_per_torque
+            bias_current: minimum commanded current (mA)
+            dt: simulation step (s)
+            n_samples: samples of the spline per stride
+        """
+        if thermal_model is None:
+            thermal_model = ThermalModel(temp_limit_windings=100, soft_border_C_windings=10, temp_limit_case=70, soft_border_C_case=10)
+        if current_per_torque is None:
+            current_per_torque = 1 / (nominal_TR * config.efficiency * config.Kt)
+
+        self.thermal_model = thermal_model
+        self.current_per_torque = current_per_torque
+        self.bias_current = bias_current
+        self.dt = dt
+        self.n_samples = n_samples
+
+        self.assistance_generator = AssistanceGenerator(bias_current=bias_current)
+        t_rise, t_peak, t_fall, t_toe_off, holding_torque = config.spline_timing_params
+        self.assistance_generator.t_rise = t_rise
+        self.assistance_generator.t_peak = t_peak
+        self.assistance_generator.t_fall = t_fall
+        self.assistance_generator.t_toe_off = t_toe_off
+        self.assistance_generator.holding_torque = holding_torque
+
+    def rms_current(self, peak_torque:float, stride_period:float) -> float:
+        """RMS motor current (mA) over one stride of the commanded spline."""
+        stance_period = stride_period * config.END_OF_STANCE / config.END_OF_STRIDE
+        _, torques = self.assistance_generator.stride_spline_profile(peak_torque, self.assistance_generator.holding_torque,
+                                                                     stride_period, stance_period, self.n_samples)
+        currents = np.clip(torques * self.current_per_torque, self.bias_current, config.MAX_ALLOWABLE_CURRENT)
+        return float(np.sqrt(np.mean(currents**2)))
+
+    def transition(self, motor_current:float) -> np.ndarray:
+        """Exact 3x3 transition of [T_w, T_c, 1] over dt at this (RMS) motor current."""
+        return expm(self.thermal_model.augmented_system(motor_current) * self.dt)
+
+    def simulate(self, torque_schedules, durations, stride_periods=1.12, T_w0:float = None, T_c0:float = None,
+                 return_trajectories:bool = False) -> dict:
+        """
+        Args:
+            torque_schedules: (n_schedules, n_presentations) peak torque settings (Nm)
+            durations: (n_presentations,) duration of each presentation (s), shared by all schedules
+            stride_periods: stride period (s), scalar or broadcastable to torque_schedules
+            T_w0, T_c0: initial winding & case temperatures (°C), default to the model's state
+            return_trajectories: also return T_w & T_c at every step
+
+        Returns:
+            dict of per-schedule arrays: max_T_w, max_T_c, time_to_soft_limit, time_to_hard_limit (s, inf if never),
+            feasible (never reaches the soft limits); with return_trajectories also time, T_w & T_c (n_schedules, n_steps)
+        """
+        torque_schedules = np.atleast_2d(np.asarray(torque_schedules, dtype=float))
+        stride_periods = np.broadcast_to(np.asarray(stride_periods, dtype=float), torque_schedules.shape)
+        steps_per_presentation = np.maximum(np.round(np.asarray(durations, dtype=float) / self.dt).astype(int), 1)
+        n_schedules = torque_schedules.shape[0]
+        model = self.thermal_model
+
+        # one transition per distinct (torque, stride period)
+        levels, level_of = np.unique(np.stack([torque_schedules.ravel(), stride_periods.ravel()], axis=1), axis=0, return_inverse=True)
+        level_of = level_of.reshape(torque_schedules.shape)
+        transitions = np.stack([self.transition(self.rms_current(torque, stride_period)) for torque, stride_period in levels])
+
+        # level of every step of every schedule
+        step_levels = np.repeat(level_of, steps_per_presentation, axis=1)
+        n_steps = step_levels.shape[1]
+
+        T = np.empty((n_schedules, 3))
+        T[:, 0] = model.T_w if T_w0 is None else T_w0
+        T[:, 1] = model.T_c if T_c0 is None else T_c0
+        T[:, 2] = 1.0
+
+        max_T_w = T[:, 0].copy()
+        max_T_c = T[:, 1].copy()
+        time_to_soft = np.full(n_schedules, np.inf)
+        time_to_hard = np.full(n_schedules, np.inf)
+        if return_trajectories:
+            T_w_traj = np.empty((n_schedules, n_steps))
+            T_c_traj = np.empty((n_schedules, n_steps))
+
+        for k in range(n_steps):
+            T = np.einsum('sij,sj->si', transitions[step_levels[:, k]], T)
+            t = (k + 1) * self.dt
+
+            np.maximum(max_T_w, T[:, 0], out=max_T_w)
+            np.maximum(max_T_c, T[:, 1], out=max_T_c)
+            soft = (T[:, 0] >= model.soft_max_temp_windings) | (T[:, 1] >= model.soft_max_temp_case)
+            hard = (T[:, 0] >= model.abs_max_temp_windings) | (T[:, 1] >= model.abs_max_temp_case)
+            time_to_soft[soft & np.isinf(time_to_soft)] = t
+            time_to_hard[hard & np.isinf(time_to_hard)] = t
+
+            if return_trajectories:
+                T_w_traj[:, k] = T[:, 0]
+                T_c_traj[:, k] = T[:, 1]
+
+        result = {'max_T_w': max_T_w, 'max_T_c': max_T_c, 'time_to_soft_limit': time_to_soft,
+                  'time_to_hard_limit': time_to_hard, 'feasible': np.isinf(time_to_soft)}
+        if return_trajectories:
+            result.update(time=self.dt * np.arange(1, n_steps + 1), T_w=T_w_traj, T_c=T_c_traj)
+        return result
+
+def random_orders(torque_settings, n_schedules:int, seed:int = None) -> np.ndarray:
+    """(n_schedules, len(torque_settings)) random permutations of the torque settings."""
+    rng = np.random.default_rng(seed)
+    return rng.permuted(np.tile(np.asarray(torque_settings, dtype=float), (n_schedules, 1)), axis=1)
+
+if __name__ == "__main__":
+    n_schedules = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    # randomized orders of the acclimation torque settings, each held for 2 min with a 30 s rest in between
+    torque_settings = np.linspace(2.5, 30, 12)
+    orders = random_orders(torque_settings, n_schedules, seed=0)
+    schedules = np.zeros((n_schedules, 2 * len(torque_settings)))
+    schedules[:, ::2] = orders
+    durations = np.tile([120, 30], len(torque_settings))
+
+    simulator = ThermalScheduleSimulator()
+    result = simulator.simulate(schedules, durations, stride_periods=1.12, T_w0=35, T_c0=35)
+
+    worst = np.argmax(result['max_T_w'])
+    print("{} of {} schedules stay under the soft limits".format(int(result['feasible'].sum()), n_schedules))
+    print("worst order: {} (max winding {:.1f} °C, max case {:.1f} °C)".format(
+        orders[worst].round(1).tolist(), result['max_T_w'][worst], result['max_T_c'][worst]))
@@ -0,0 +1,49 @@
+# Description:
+# Transmission-ratio (TR) & motor-angle lookup tables indexed by the raw ankle encoder count.
+#
+# The ankle encoder only reports 2^14 distinct counts, so the calibrated TR and motor-angle curves are
+# evaluated once for every count when the calibration is loaded. The ankle encoder sign, the max dorsiflexion
+# offset and the minimum TR clamp are baked into the tables, and so is the torque->current gain
+# 1 / (N * efficiency * Kt). Converting a desired torque to a current is then one index and one multiply.
+
+import numpy as np
+
+import config
+
+ANK_ENC_COUNTS = 2**14
+ANK_ENC_MASK = ANK_ENC_COUNTS - 1
+MIN_TR = 10     # safety clamp to prevent current limit spikes (ideally should not be limited to 10 and should go below)
+
+def ankle_angle_for_counts(ank_enc_sign:int, max_dorsi_offset:float) -> np.ndarray:
+    """Ankle angle (deg wrt max dorsiflexion) for every raw ankle encoder count, same conversion as the GSE thread."""
+    counts = np.arange(ANK_ENC_COUNTS)
+    return (ank_enc_sign * counts * config.ENC_CLICKS_TO_DEG) - max_dorsi_offset
+
+def evaluate_curve(curve, ankle_angles:np.ndarray) -> np.ndarray:
+    """curve is either polynomial coefficients (np.polyval order) or a callable of ankle angle (deg)."""
+    if callable(curve):
+        return np.asarray(curve(ankle_angles), dtype=float)
+    return np.polyval(np.asarray(curve, dtype=float), ankle_angles)
+
+def build_lookup_tables(TR_curve, motor_angle_curve, ank_enc_sign:int, max_dorsi_offset:float, efficiency:float, Kt:float):
+    """
+    Args:
+        TR_curve: TR vs ankle angle (polynomial coefficients or callable)
+        motor_angle_curve: motor angle vs ankle angle (polynomial coefficients or callable)
+        ank_enc_sign: ankle encoder sign of the exo
+        max_dorsi_offset: max dorsiflexion angle from the TR characterization (deg)
+        efficiency: motor efficiency
+        Kt: motor torque constant (N-m/mA)
+
+    Returns:
+        TR_table: clamped transmission ratio per count
+        motor_angle_table: motor angle per count (deg)
+        current_per_torque_table: mA per N-m of ankle torque per count
+    """
+    ankle_angles = ankle_angle_for_counts(ank_enc_sign, max_dorsi_offset)
+
+    TR_table = np.maximum(evaluate_curve(TR_curve, ankle_angles), MIN_TR)
+    motor_angle_table = evaluate_curve(motor_angle_curve, ankle_angles)
+    current_per_torque_table = 1 / (TR_table * efficiency * Kt)
+
+    return TR_table, motor_angle_table, current_per_torque_table
@@ -79,3 +79,30 @@ class MovingAverageFilterPlus:
         self.size = min(self.size + 1, self.size)
         self.buffer[self.pntr] = val
         self.pntr = (self.pntr + 1) % self.size
+
+
+class RunningStats:
+    # Welford's streaming mean & variance: O(1) per sample, no sample storage
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+
+    def update(self, val):
+        self.count += 1
+        delta = val - self.mean
+        self.mean += delta / self.count
+        self.M2 += delta * (val - self.mean)
+
+    def variance(self):
+        # sample variance
+        if self.count < 2:
+            return float('inf')
+        return self.M2 / (self.count - 1)
+
+    def standard_error(self):
+        # standard error of the mean
+        return (self.variance() / self.count) ** 0.5 if self.count >= 2 else float('inf')